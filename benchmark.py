@@ -0,0 +1,395 @@
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+import tracemalloc
+import numpy as np
+import pandas as pd
+from report_validations import (
+    is_valid_number,
+    is_valid_bool,
+    is_valid_timestamp,
+    is_valid_document_no,
+    is_valid_type,
+    is_valid_blanket_order_no,
+    is_valid_vat_identifier,
+    is_valid_measure_code,
+)
+from report_generator import QualityReportGenerator
+from report_drift import DatasetDriftProfile, ProfileStore
+from categorize import clean_invoices, categorize
+from main_report import (
+    sales_invoice_line_validation_map,
+    sales_invoice_line_column_pairing_map,
+    sales_invoice_line_date_columns,
+    sales_invoice_line_unique_keys,
+    contract_line_validation_map,
+    contract_line_column_pairing_map,
+    contract_line_date_columns,
+    contract_line_unique_keys,
+)
+
+default_row_counts = (100_000, 1_000_000, 10_000_000)
+default_results_filepath = "out/benchmarks/results.json"
+default_baseline_filepath = "benchmarks/baseline.json"
+
+# max relative loss of throughput or gain of memory before failing
+default_tolerance = 0.2
+
+datasets = {
+    "sales_invoice_line": (
+        sales_invoice_line_validation_map,
+        sales_invoice_line_column_pairing_map,
+        sales_invoice_line_date_columns,
+    ),
+    "contract_line": (
+        contract_line_validation_map,
+        contract_line_column_pairing_map,
+        contract_line_date_columns,
+    ),
+}
+
+unique_keys = {
+    "sales_invoice_line": sales_invoice_line_unique_keys,
+    "contract_line": contract_line_unique_keys,
+}
+
+checks = (
+    "completeness",
+    "uniqueness",
+    "validity",
+    "consistency",
+    "timeliness",
+    "profile",
+    "key_uniqueness",
+    "drift",
+)
+
+# ----------------------------------------------------------------------------
+# synthetic data
+# ----------------------------------------------------------------------------
+
+_valid_choices = {
+    is_valid_type: ["Resource", "G/L Account"],
+    is_valid_vat_identifier: ["VSK24", "ENGINN VSK", "VSK11", "ENGINN"],
+    is_valid_measure_code: ["STK", "DAGUR", "KASSI", "KLST"],
+}
+
+_invalid_values = {
+    is_valid_number: "n/a",
+    is_valid_bool: "yes",
+    is_valid_timestamp: "31/12/2020",
+    is_valid_document_no: "XX0001",
+    is_valid_type: "Item",
+    is_valid_blanket_order_no: "B0001",
+    is_valid_vat_identifier: "VSK0",
+    is_valid_measure_code: "BOX",
+}
+
+
+def _generate_values(
+    rng: np.random.Generator, validator, row_count: int, customer_count: int
+) -> np.ndarray:
+    if validator is is_valid_bool:
+        return rng.random(row_count) < 0.5
+
+    if validator is is_valid_timestamp:
+        # iso timestamps between 2009 and the end of 2024, as fetched from the api
+        seconds = rng.integers(1_230_768_000, 1_735_689_600, row_count)
+        dates = seconds.astype("datetime64[s]").astype("datetime64[D]")
+        return np.char.add(np.datetime_as_string(dates), "T00:00:00Z").astype(object)
+
+    if validator is is_valid_document_no:
+        numbers = rng.integers(0, max(row_count // 10, 1), row_count)
+        return np.char.add("SR", numbers.astype(str)).astype(object)
+
+    if validator is is_valid_blanket_order_no:
+        numbers = rng.integers(0, 1000, row_count)
+        return np.char.add("S", numbers.astype(str)).astype(object)
+
+    if validator in _valid_choices:
+        return rng.choice(np.array(_valid_choices[validator], dtype=object), row_count)
+
+    if validator is is_valid_number:
+        return rng.integers(0, customer_count, row_count).astype(float)
+
+    return rng.integers(0, 1000, row_count).astype(float)
+
+
+def generate_dataset(
+    name: str,
+    row_count: int,
+    null_rate: float = 0.05,
+    invalid_rate: float = 0.01,
+    duplicate_rate: float = 0.01,
+    seed: int = 0,
+) -> pd.DataFrame:
+    """
+    generates a dataset with the columns of the validation and pairing maps of
+    the named report, where every value is null with null_rate, invalid with
+    invalid_rate, and every row repeats an earlier row with duplicate_rate.
+    """
+    validation_map, column_pairing_map, date_columns = datasets[name]
+    rng = np.random.default_rng(seed)
+    customer_count = max(row_count // 50, 1)
+
+    column_names = list(validation_map.keys())
+    for column_name, pair_name in column_pairing_map.items():
+        for paired_name in (column_name, pair_name):
+            if paired_name not in column_names:
+                column_names.append(paired_name)
+
+    # every duplicated row takes the values of a random earlier row
+    row_index = np.arange(row_count)
+    if duplicate_rate > 0:
+        duplicate_mask = rng.random(row_count) < duplicate_rate
+        duplicate_mask[0] = False
+        duplicate_index = np.flatnonzero(duplicate_mask)
+        row_index[duplicate_index] = rng.integers(0, duplicate_index)
+
+    columns = dict()
+    for column_name in column_names:
+        validator = validation_map.get(column_name)
+        values = _generate_values(rng, validator, row_count, customer_count)
+
+        invalid_value = _invalid_values.get(validator)
+        if invalid_value is not None and invalid_rate > 0:
+            values = values.astype(object)
+            values[rng.random(row_count) < invalid_rate] = invalid_value
+
+        if null_rate > 0:
+            if values.dtype.kind in "bi":
+                values = values.astype(object)
+            values[rng.random(row_count) < null_rate] = None
+
+        columns[column_name] = values[row_index]
+
+    return pd.DataFrame(columns).infer_objects()
+
+
+# ----------------------------------------------------------------------------
+# measuring
+# ----------------------------------------------------------------------------
+
+
+def _measure(run, row_count: int, repeat_count: int = 1) -> dict:
+    """
+    times the best of repeat_count untraced runs, then traces the peak memory
+    of one more run, since tracemalloc slows python allocations down.
+    """
+    wall_times = list()
+    for _ in range(repeat_count):
+        start_wall_time = time.perf_counter()
+        run()
+        wall_times.append(time.perf_counter() - start_wall_time)
+
+    tracemalloc.start()
+    try:
+        run()
+        peak_memory = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    wall_time = min(wall_times)
+    return {
+        "wall_time": round(wall_time, 6),
+        "throughput": round(row_count / wall_time, 2) if wall_time else None,
+        "peak_memory": peak_memory,
+    }
+
+
+def _run_check(
+    df: pd.DataFrame, name: str, check: str, profile_store: ProfileStore = None
+):
+    validation_map, column_pairing_map, date_columns = datasets[name]
+
+    report_generator = QualityReportGenerator()
+    report_generator.set_report_name(name)
+    report_generator.set_dataframe(df)
+    report_generator.set_validation_map(map=validation_map)
+    report_generator.set_column_pairing_map(column_pairing_map)
+    report_generator.set_date_columns(date_columns)
+    report_generator.set_unique_keys(unique_keys[name])
+    # every run compares with the same baseline
+    report_generator.set_profile_store(profile_store, update_baseline=False)
+
+    getattr(report_generator, f"check_{check}")()
+
+
+def run_benchmarks(
+    row_counts=default_row_counts,
+    null_rate: float = 0.05,
+    invalid_rate: float = 0.01,
+    duplicate_rate: float = 0.01,
+    seed: int = 0,
+    repeat_count: int = 1,
+) -> dict:
+    """
+    runs every check on both datasets and the categorization on the sales
+    invoice lines, at every row count, returns the results by benchmark key.
+    the drift is checked against a baseline profile of the same dataset.
+    """
+    results = dict()
+
+    with tempfile.TemporaryDirectory() as profile_directory:
+        profile_store = ProfileStore(profile_directory)
+
+        for row_count in row_counts:
+            for name in datasets:
+                df = generate_dataset(
+                    name,
+                    row_count,
+                    null_rate=null_rate,
+                    invalid_rate=invalid_rate,
+                    duplicate_rate=duplicate_rate,
+                    seed=seed,
+                )
+
+                baseline = DatasetDriftProfile()
+                baseline.add(df)
+                profile_store.save(name, baseline)
+
+                for check in checks:
+                    key = f"{name}.{check}.{row_count}"
+                    results[key] = _measure(
+                        lambda: _run_check(df, name, check, profile_store),
+                        row_count,
+                        repeat_count,
+                    )
+                    print(f"info: {key} {results[key]}")
+
+                if name == "sales_invoice_line":
+                    key = f"{name}.categorize.{row_count}"
+                    results[key] = _measure(
+                        lambda: categorize(clean_invoices(df)), row_count, repeat_count
+                    )
+                    print(f"info: {key} {results[key]}")
+
+                del df
+
+    return results
+
+
+# ----------------------------------------------------------------------------
+# comparing
+# ----------------------------------------------------------------------------
+
+
+def compare_results(
+    results: dict, baseline: dict, tolerance: float = default_tolerance
+) -> list[str]:
+    """
+    returns the regressions of the results against the baseline, benchmarks
+    missing from the baseline are not compared.
+    """
+    regressions = list()
+
+    for key, result in results.items():
+        expected = baseline.get(key)
+        if expected is None:
+            continue
+
+        if (
+            expected.get("throughput")
+            and result["throughput"] is not None
+            and result["throughput"] < expected["throughput"] * (1 - tolerance)
+        ):
+            regressions.append(
+                f"{key}: throughput {result['throughput']} rows/s, "
+                f"baseline {expected['throughput']} rows/s"
+            )
+
+        if (
+            expected.get("peak_memory")
+            and result["peak_memory"] is not None
+            and result["peak_memory"] > expected["peak_memory"] * (1 + tolerance)
+        ):
+            regressions.append(
+                f"{key}: peak memory {result['peak_memory']} bytes, "
+                f"baseline {expected['peak_memory']} bytes"
+            )
+
+    return regressions
+
+
+def _read_json(filepath: str) -> dict | None:
+    if not os.path.exists(filepath):
+        return None
+
+    with open(filepath, mode="r", encoding="utf8") as file:
+        return json.load(file)
+
+
+def _write_json(content: dict, filepath: str):
+    dirname = os.path.dirname(filepath)
+    if dirname:
+        os.makedirs(dirname, exist_ok=True)
+
+    with open(filepath, mode="w", encoding="utf8") as file:
+        json.dump(content, file, indent=4)
+
+
+def main(args: list[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="benchmarks the quality reports")
+    parser.add_argument("--rows", type=int, nargs="+", default=list(default_row_counts))
+    parser.add_argument("--null-rate", type=float, default=0.05)
+    parser.add_argument("--invalid-rate", type=float, default=0.01)
+    parser.add_argument("--duplicate-rate", type=float, default=0.01)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--results", default=default_results_filepath)
+    parser.add_argument("--baseline", default=default_baseline_filepath)
+    parser.add_argument("--tolerance", type=float, default=default_tolerance)
+    parser.add_argument(
+        "--update-baseline",
+        action="store_true",
+        help="stores the results as the new baseline instead of comparing",
+    )
+    args = parser.parse_args(args)
+
+    results = run_benchmarks(
+        row_counts=args.rows,
+        null_rate=args.null_rate,
+        invalid_rate=args.invalid_rate,
+        duplicate_rate=args.duplicate_rate,
+        seed=args.seed,
+        repeat_count=args.repeat,
+    )
+
+    _write_json(
+        {
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "numpy": np.__version__,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "results": results,
+        },
+        args.results,
+    )
+
+    if args.update_baseline:
+        _write_json(results, args.baseline)
+        print(f"info: baseline saved to {args.baseline}")
+        return 0
+
+    # a gate without a baseline would pass whatever the results
+    baseline = _read_json(args.baseline)
+    if baseline is None:
+        print(
+            f"error: no baseline at {args.baseline},"
+            " store one with --update-baseline"
+        )
+        return 1
+
+    regressions = compare_results(results, baseline, tolerance=args.tolerance)
+    for regression in regressions:
+        print(f"error: regression {regression}")
+
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -5,6 +5,8 @@ import pandas as pd
 sales_invoice_filepath = "out/datasets/sales_invoice_line.csv"
 output_filepath = "out/reports/revenue.csv"
 
+invoice_columns = ["Sell_to_Customer_No", "Shipment_Date", "Amount_Including_VAT"]
+
 # max number of difference in days to still consider recurring
 recurring_days_thresold = 5
 
@@ -18,39 +20,50 @@ reoccurring_max_period_count = 3  # 3 years in our case
 # reading
 # ----------------------------------------------------------------------------
 
-df = pd.read_csv(sales_invoice_filepath)
-df = df[["Sell_to_Customer_No", "Shipment_Date", "Amount_Including_VAT"]]
-
-df = df.rename(
-    columns={
-        "Sell_to_Customer_No": "customer_id",
-        "Shipment_Date": "invoice_date",
-        "Amount_Including_VAT": "amount",
-    }
-)
 
-previous_count = len(df)
-df = df.dropna()
+def read_invoices(filepath: str) -> pd.DataFrame:
+    df = pd.read_csv(filepath, usecols=invoice_columns)
+    return clean_invoices(df)
 
-dropped_count = len(df) - previous_count
-if dropped_count > 0:
-    print(f"info: dropped {dropped_count} null values...")
 
 # ----------------------------------------------------------------------------
 # cleaning
 # ----------------------------------------------------------------------------
-df["customer_id"] = (
-    pd.to_numeric(df["customer_id"], errors="coerce").dropna().astype(int)
-)
-df["invoice_date"] = pd.to_datetime(df["invoice_date"], errors="coerce")
-df["amount"] = pd.to_numeric(df["amount"], errors="coerce")
 
-previous_count = len(df)
-df = df.dropna()
 
-dropped_count = len(df) - previous_count
-if dropped_count > 0:
-    print(f"info: dropped {dropped_count} null values after converting types...")
+def clean_invoices(df: pd.DataFrame) -> pd.DataFrame:
+    df = df[invoice_columns]
+
+    df = df.rename(
+        columns={
+            "Sell_to_Customer_No": "customer_id",
+            "Shipment_Date": "invoice_date",
+            "Amount_Including_VAT": "amount",
+        }
+    )
+
+    previous_count = len(df)
+    df = df.dropna()
+
+    dropped_count = len(df) - previous_count
+    if dropped_count > 0:
+        print(f"info: dropped {dropped_count} null values...")
+
+    df["customer_id"] = (
+        pd.to_numeric(df["customer_id"], errors="coerce").dropna().astype(int)
+    )
+    df["invoice_date"] = pd.to_datetime(df["invoice_date"], errors="coerce")
+    df["amount"] = pd.to_numeric(df["amount"], errors="coerce")
+
+    previous_count = len(df)
+    df = df.dropna()
+
+    dropped_count = len(df) - previous_count
+    if dropped_count > 0:
+        print(f"info: dropped {dropped_count} null values after converting types...")
+
+    return df
+
 
 # ----------------------------------------------------------------------------
 # processing
@@ -76,78 +89,175 @@ def get_month_name(month: int) -> str | None:
     }.get(month)
 
 
-def get_next_smallest(values: list, value: any, count: int) -> list:
+def get_categories(aggregates: pd.DataFrame) -> pd.Series:
+    """
+    categorizes the years of the customers from the invoice count and the min
+    and max number of days between consecutive invoices of every year, the
+    aggregates must be sorted by customer and year.
     """
-    returns a list or next elements with max size of count.
+    recurring = (
+        aggregates["max_interval"] - aggregates["min_interval"]
+        <= recurring_days_thresold
+    )
+
+    # invoice counts of the next years of the same customer
+    invoice_counts = aggregates.groupby("customer_id", sort=False)["invoice_count"]
+    next_invoice_counts = pd.concat(
+        [
+            invoice_counts.shift(-period)
+            for period in range(1, reoccurring_max_period_count + 1)
+        ],
+        axis=1,
+    )
+    reoccurring = (
+        next_invoice_counts.max(axis=1) - next_invoice_counts.min(axis=1)
+        <= reoccurring_days_thresold
+    )
+
+    categories = pd.Series("non-reoccurring", index=aggregates.index)
+    categories[reoccurring] = "reoccuring"
+    categories[recurring] = "recurring"
+    return categories
+
+
+def get_invoice_aggregates(df: pd.DataFrame) -> pd.DataFrame:
     """
-    sorted_values = sorted(values)
-    next_values = [y for y in sorted_values if y > value][:count]
-    return next_values
+    returns the invoice count, total amount and the min and max number of days
+    between consecutive invoices of every year of every customer.
+    """
+    df = df.assign(year=df["invoice_date"].dt.year)
 
+    sorted_df = df.sort_values(["customer_id", "year", "invoice_date"], kind="stable")
+    sorted_df["interval"] = (
+        sorted_df.groupby(["customer_id", "year"])["invoice_date"].diff().dt.days
+    )
 
-def get_category(records: pd.DataFrame, year_groups) -> str:
-    intervals = records["invoice_date"].sort_values().diff().dt.days[1:]
+    aggregates = sorted_df.groupby(["customer_id", "year"]).agg(
+        invoice_count=("amount", "size"),
+        min_interval=("interval", "min"),
+        max_interval=("interval", "max"),
+    )
+    # rounded to cents like the store, the order of the float additions
+    # differs and the amounts are truncated to units
+    aggregates["total_amount"] = (
+        df.groupby(["customer_id", "year"])["amount"].sum().round(2)
+    )
+    return aggregates.reset_index()
 
-    if intervals.max() - intervals.min() <= recurring_days_thresold:
-        return "recurring"
 
-    year = records.iloc[0]["year"]
-    years = year_groups.keys()
-    next_years = get_next_smallest(years, year, reoccurring_max_period_count)
-    next_year_count = len(next_years)
+def categorize_aggregates(aggregates: pd.DataFrame) -> pd.DataFrame:
+    aggregates = aggregates.sort_values(["customer_id", "year"]).reset_index(drop=True)
 
-    if next_year_count > 0:
-        next_years_invoice_counts = [len(year_groups[year]) for year in next_years]
-        next_years_min_invoice_count = min(next_years_invoice_counts)
-        next_years_max_invoice_count = max(next_years_invoice_counts)
-        next_years_max_invoice_count_diff = (
-            next_years_max_invoice_count - next_years_min_invoice_count
-        )
+    return pd.DataFrame(
+        {
+            "customer_id": aggregates["customer_id"],
+            "year": aggregates["year"].astype(int),
+            "invoice_count": aggregates["invoice_count"],
+            "total_amount": aggregates["total_amount"].astype(int),
+            "category": get_categories(aggregates),
+        }
+    )
 
-        if next_years_max_invoice_count_diff <= reoccurring_days_thresold:
-            return "reoccuring"
 
-    return "non-reoccurring"
+def categorize(df: pd.DataFrame) -> pd.DataFrame:
+    return categorize_aggregates(get_invoice_aggregates(df))
 
 
-def get_categorizations(records: pd.DataFrame) -> pd.DataFrame:
+# ----------------------------------------------------------------------------
+# store
+# ----------------------------------------------------------------------------
 
-    categorizations = list()
+invoice_table_name = "invoices"
 
-    year_groups = records.groupby("year").groups
-    for year, index in year_groups.items():
-        year_records = df.loc[index]
-        year_record_count = len(year_records)
-        year_total_amount = int(year_records["amount"].sum())
-        category = get_category(year_records, year_groups=year_groups)
+# days between an invoice and the previous one of the same customer and year,
+# rounded to seconds and floored to days like the timedelta days
+_interval_expressions = {
+    "sqlite": "cast(round((julianday(invoice_date) - julianday({previous}))"
+    " * 86400) as integer) / 86400",
+    "duckdb": "date_diff('second', {previous}, invoice_date) // 86400",
+}
 
-        categorizations.append(
-            {
-                "customer_id": customer_id,
-                "year": year,
-                "invoice_count": year_record_count,
-                "total_amount": year_total_amount,
-                "category": category,
-            }
-        )
+_year_expressions = {
+    "sqlite": "cast(strftime('%Y', invoice_date) as integer)",
+    "duckdb": "year(invoice_date)",
+}
 
-    categorizations_df = pd.DataFrame(categorizations)
-    return categorizations_df
 
+def load_invoices(store, filepath: str, table_name: str = invoice_table_name) -> bool:
+    """
+    loads the cleaned invoices of the dataset into the store, unless they were
+    already loaded from the same file.
+    """
+    return store.load_csv(
+        table_name,
+        filepath,
+        index_columns=["customer_id", "invoice_date"],
+        transform=clean_invoices,
+        usecols=invoice_columns,
+    )
 
-df["year"] = df["invoice_date"].dt.year
-customer_groups = df.groupby("customer_id").groups
 
-categorizations = list[pd.DataFrame]()
-for customer_id, index in customer_groups.items():
-    customer_records = df.loc[index]
+def get_store_aggregates(store, table_name: str = invoice_table_name) -> pd.DataFrame:
+    """
+    the invoice aggregates computed by the store, the days between
+    consecutive invoices come from a window over the invoices of each year.
+    """
+    year = _year_expressions[store.backend]
+    interval = _interval_expressions[store.backend].format(
+        previous=f"lag(invoice_date) over (partition by customer_id, {year}"
+        " order by invoice_date)"
+    )
+
+    return store.query(f"""
+        with intervals as (
+            select customer_id, {year} as year, amount, {interval} as interval
+            from "{table_name}"
+        )
+        select
+            customer_id,
+            year,
+            count(*) as invoice_count,
+            min(interval) as min_interval,
+            max(interval) as max_interval,
+            round(sum(amount), 2) as total_amount
+        from intervals
+        group by customer_id, year
+        order by customer_id, year
+        """)
+
+
+def categorize_store(store, table_name: str = invoice_table_name) -> pd.DataFrame:
+    return categorize_aggregates(get_store_aggregates(store, table_name))
+
+
+def categorize_file(
+    dataset_filepath: str = sales_invoice_filepath,
+    output_filepath: str = output_filepath,
+    store_filepath: str | None = None,
+) -> pd.DataFrame:
+    """
+    writes the categorizations of the invoices of the dataset, aggregated by a
+    store the invoices are loaded into once when a store filepath is given.
+    """
+    if store_filepath is not None:
+        from report_store import DatasetStore
 
-    customer_categorizations = get_categorizations(customer_records)
-    categorizations.append(customer_categorizations)
+        store = DatasetStore(store_filepath)
+        load_invoices(store, dataset_filepath)
+        categorizations_df = categorize_store(store)
+    else:
+        df = read_invoices(dataset_filepath)
+        categorizations_df = categorize(df)
+
+    categorizations_df.to_csv(output_filepath, index=False)
+    return categorizations_df
 
-categorizations_df = pd.concat(categorizations)
 
 # %%
 
-categorizations_df.to_csv(output_filepath, index=False)
+if __name__ == "__main__":
+    import sys
+
+    # optionally <dataset> <output> [<store>] instead of the default paths
+    categorize_file(*sys.argv[1:4])
 # %%
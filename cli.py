@@ -0,0 +1,249 @@
+import os
+import sys
+import argparse
+
+# the subcommands import their modules when they run, so the startup and the
+# help do not pay for pandas, requests or bs4
+
+
+def run_fetch(arguments: argparse.Namespace) -> int:
+    from fetch import fetch, load_settings
+
+    fetch(
+        load_settings(
+            output_folder=arguments.output_folder,
+            stream_report_type=arguments.stream_report,
+            stream_report_filepath=arguments.stream_report_filepath,
+        )
+    )
+    return 0
+
+
+def run_merge(arguments: argparse.Namespace) -> int:
+    from merge import combine_csv_files
+
+    combine_csv_files(
+        arguments.folder,
+        arguments.output,
+        subset=arguments.subset.split(",") if arguments.subset else None,
+    )
+    return 0
+
+
+def run_report(arguments: argparse.Namespace) -> int:
+    from main_report import report_functions
+
+    if arguments.report_type not in report_functions:
+        print(f"error: unknown report type {arguments.report_type}")
+        return 2
+
+    report_functions[arguments.report_type](
+        dataset_filepath=arguments.dataset,
+        report_filepath=arguments.report,
+        max_process_count=arguments.processes,
+        chunk_size=arguments.chunk_size,
+        history_filepath=arguments.history,
+        profile_directory=arguments.profiles,
+        uniqueness_error=arguments.uniqueness_error,
+        store_filepath=arguments.store,
+        sample_fraction=arguments.sample,
+        cache_directory=arguments.cache_dir,
+    )
+    print(f"info: {arguments.report_type} report saved to {arguments.report}")
+    return 0
+
+
+def run_categorize(arguments: argparse.Namespace) -> int:
+    from categorize import categorize_file
+
+    categorize_file(arguments.dataset, arguments.output, arguments.store)
+    print(f"info: categorizations saved to {arguments.output}")
+    return 0
+
+
+def run_pipeline(args: list[str]) -> int:
+    from pipeline import main
+
+    return main(args)
+
+
+def run_worker(arguments: argparse.Namespace) -> int:
+    from report_worker import DatasetCache, JobSpool, ReportWorker
+
+    worker = ReportWorker(
+        JobSpool(arguments.spool),
+        cache=DatasetCache(max_byte_count=arguments.cache_mb * 1024**2),
+        max_worker_count=arguments.workers,
+        poll_interval=arguments.poll_interval,
+    )
+    worker.run(once=arguments.once)
+    return 0
+
+
+def run_submit(arguments: argparse.Namespace) -> int:
+    from report_worker import JobSpool
+
+    job = {
+        "job_type": arguments.job_type,
+        "dataset_filepath": os.path.abspath(arguments.dataset),
+        "output_filepath": os.path.abspath(arguments.output),
+    }
+    if arguments.job_type == "report":
+        if arguments.report_type is None:
+            print("error: report jobs need a --report-type")
+            return 2
+        job["report_type"] = arguments.report_type
+        job["options"] = {
+            name: value
+            for name, value in (
+                ("history_filepath", arguments.history),
+                ("profile_directory", arguments.profiles),
+                ("uniqueness_error", arguments.uniqueness_error),
+                ("store_filepath", arguments.store),
+                ("sample_fraction", arguments.sample),
+                ("cache_directory", arguments.cache_dir),
+            )
+            if value is not None
+        }
+
+    spool = JobSpool(arguments.spool)
+    job_id = spool.submit(job)
+    print(job_id)
+
+    if not arguments.wait:
+        return 0
+
+    try:
+        state, job = spool.wait(job_id, timeout=arguments.timeout)
+    except TimeoutError as error:
+        print(f"error: {error}")
+        return 1
+    print(f"info: job {job_id} {state} in {job['wall_time']}s")
+    if job["error"] is not None:
+        print(job["error"])
+    return 0 if state == "done" else 1
+
+
+def get_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="cli.py", description="fetches, merges, reports and categorizes"
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    fetch_parser = subparsers.add_parser(
+        "fetch", help="fetch the pages, configured by the environment and .env"
+    )
+    fetch_parser.add_argument("--output-folder", default=None)
+    fetch_parser.add_argument(
+        "--stream-report", default=None, help="report type updated as pages arrive"
+    )
+    fetch_parser.add_argument(
+        "--stream-report-filepath",
+        default=None,
+        help="report of the pages before the merge, out/reports/<type>_pages.csv",
+    )
+    fetch_parser.set_defaults(function=run_fetch)
+
+    merge_parser = subparsers.add_parser("merge", help="merge the fetched pages")
+    merge_parser.add_argument("folder")
+    merge_parser.add_argument("output")
+    merge_parser.add_argument(
+        "--subset", default=None, help="comma separated columns of the duplicates"
+    )
+    merge_parser.set_defaults(function=run_merge)
+
+    report_parser = subparsers.add_parser("report", help="write a quality report")
+    report_parser.add_argument("report_type")
+    report_parser.add_argument("dataset")
+    report_parser.add_argument("report")
+    report_parser.add_argument("--processes", type=int, default=None)
+    report_parser.add_argument("--chunk-size", type=int, default=None)
+    report_parser.add_argument("--history", default=None, help="history database")
+    report_parser.add_argument(
+        "--profiles", default=None, help="profile directory for the drift check"
+    )
+    report_parser.add_argument(
+        "--uniqueness-error",
+        type=float,
+        default=None,
+        help="relative error of an estimated uniqueness, exact when not set",
+    )
+    report_parser.add_argument(
+        "--store", default=None, help="dataset store the report is computed from"
+    )
+    report_parser.add_argument(
+        "--sample",
+        type=float,
+        default=None,
+        help="fraction of the rows read for a first pass report with intervals",
+    )
+    report_parser.add_argument(
+        "--cache-dir",
+        default=None,
+        help="directory of the column results reused by the next runs",
+    )
+    report_parser.set_defaults(function=run_report)
+
+    categorize_parser = subparsers.add_parser(
+        "categorize", help="categorize the customers by year"
+    )
+    categorize_parser.add_argument("dataset")
+    categorize_parser.add_argument("output")
+    categorize_parser.add_argument("--store", default=None, help="dataset store")
+    categorize_parser.set_defaults(function=run_categorize)
+
+    worker_parser = subparsers.add_parser(
+        "worker", help="run the jobs of a spool with the datasets kept in memory"
+    )
+    worker_parser.add_argument("--spool", default="out/spool")
+    worker_parser.add_argument("--workers", type=int, default=2)
+    worker_parser.add_argument("--cache-mb", type=int, default=2048)
+    worker_parser.add_argument("--poll-interval", type=float, default=0.5)
+    worker_parser.add_argument(
+        "--once", action="store_true", help="stop once the spool is empty"
+    )
+    worker_parser.set_defaults(function=run_worker)
+
+    submit_parser = subparsers.add_parser(
+        "submit", help="queue a report or categorize job for the worker"
+    )
+    submit_parser.add_argument("job_type", choices=["report", "categorize"])
+    submit_parser.add_argument("dataset")
+    submit_parser.add_argument("output")
+    submit_parser.add_argument("--report-type", default=None)
+    submit_parser.add_argument("--history", default=None)
+    submit_parser.add_argument("--profiles", default=None)
+    submit_parser.add_argument("--uniqueness-error", type=float, default=None)
+    submit_parser.add_argument("--store", default=None, help="dataset store")
+    submit_parser.add_argument("--sample", type=float, default=None)
+    submit_parser.add_argument("--cache-dir", default=None)
+    submit_parser.add_argument("--spool", default="out/spool")
+    submit_parser.add_argument(
+        "--wait", action="store_true", help="wait for the job to finish"
+    )
+    submit_parser.add_argument(
+        "--timeout", type=float, default=None, help="seconds to wait at most"
+    )
+    submit_parser.set_defaults(function=run_submit)
+
+    # parsed by the pipeline itself, see main
+    subparsers.add_parser(
+        "pipeline", help="run the stages whose inputs changed", add_help=False
+    )
+
+    return parser
+
+
+def main(args: list[str] = None) -> int:
+    if args is None:
+        args = sys.argv[1:]
+
+    if args[:1] == ["pipeline"]:
+        return run_pipeline(args[1:])
+
+    arguments = get_parser().parse_args(args)
+    return arguments.function(arguments)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -7,13 +7,11 @@ from http import HTTPStatus
 from bs4 import BeautifulSoup
 from concurrent.futures import ThreadPoolExecutor
 
-dotenv.load_dotenv()
 
-
-def parse_int(value: str) -> int:
+def parse_int(value: str | None) -> int | None:
     try:
         return int(value)
-    except ValueError:
+    except (TypeError, ValueError):
         return None
 
 
@@ -21,34 +19,95 @@ def write_log(msg: str) -> None:
     print(f"{msg}\n", end="")
 
 
-domain = os.getenv("NTLM_DOMAIN")
-username = os.getenv("NTLM_USER")
-password = os.getenv("NTLM_PASSWORD")
-base_url = os.getenv("NAV_URL")
-max_single_fetch_count = parse_int(os.getenv("MAX_SINGLE_FETCH_COUNT")) or 5
-start_item_index = parse_int(os.getenv("START_ITEM_INDEX")) or 0
-max_item_count = parse_int(os.getenv("MAX_ITEM_COUNT")) or 1000
-max_thread_count = parse_int(os.getenv("MAX_THREAD_COUNT")) or 2
-max_try_count = parse_int(os.getenv("MAX_TRY_COUNT")) or 3
-output_folder = os.getenv("OUTPUT_FOLDER")
-
-# printing options
-
-write_log(f"domain: {domain}")
-write_log(f"username: {username}")
-write_log(f"password: {password}")
-write_log(f"base_url: {base_url}")
-write_log(f"max_single_fetch_count: {max_single_fetch_count}")
-write_log(f"start_item_index: {start_item_index}")
-write_log(f"max_item_count: {max_item_count}")
-write_log(f"max_thread_count: {max_thread_count}")
-write_log(f"max_try_count: {max_try_count}")
-write_log(f"output_folder: {output_folder}")
-
-session = requests.Session()
-session.auth = requests_ntlm.HttpNtlmAuth(
-    username=f"{domain}\\{username}", password=password
-)
+class FetchSettings:
+    domain: str | None
+    username: str | None
+    password: str | None
+    base_url: str | None
+    max_single_fetch_count: int
+    start_item_index: int
+    max_item_count: int
+    max_thread_count: int
+    max_try_count: int
+    output_folder: str | None
+
+    # the quality report of the pages is updated as they arrive when a report
+    # type is set, instead of after the merge
+    stream_report_type: str | None
+    stream_report_filepath: str | None
+    stream_report_interval: int
+
+    def __init__(self, environ=None):
+        environ = os.environ if environ is None else environ
+
+        self.domain = environ.get("NTLM_DOMAIN")
+        self.username = environ.get("NTLM_USER")
+        self.password = environ.get("NTLM_PASSWORD")
+        self.base_url = environ.get("NAV_URL")
+        self.max_single_fetch_count = (
+            parse_int(environ.get("MAX_SINGLE_FETCH_COUNT")) or 5
+        )
+        self.start_item_index = parse_int(environ.get("START_ITEM_INDEX")) or 0
+        self.max_item_count = parse_int(environ.get("MAX_ITEM_COUNT")) or 1000
+        self.max_thread_count = parse_int(environ.get("MAX_THREAD_COUNT")) or 2
+        self.max_try_count = parse_int(environ.get("MAX_TRY_COUNT")) or 3
+        self.output_folder = environ.get("OUTPUT_FOLDER")
+
+        self.stream_report_type = environ.get("STREAM_REPORT_TYPE")
+        self.stream_report_filepath = environ.get("STREAM_REPORT_FILEPATH")
+        self.stream_report_interval = (
+            parse_int(environ.get("STREAM_REPORT_INTERVAL")) or 30
+        )
+
+    def get_stream_report_filepath(self) -> str:
+        # the pages still hold the duplicates dropped by the merge, so their
+        # report is not written over the report of the merged dataset
+        return (
+            self.stream_report_filepath
+            or f"out/reports/{self.stream_report_type}_pages.csv"
+        )
+
+
+def load_settings(**overrides) -> FetchSettings:
+    """
+    settings from the environment and the .env file, the overrides which are
+    not None replace them.
+    """
+    dotenv.load_dotenv()
+
+    settings = FetchSettings()
+    for name, value in overrides.items():
+        if not hasattr(settings, name):
+            raise ValueError(f"unknown fetch setting {name}")
+        if value is not None:
+            setattr(settings, name, value)
+    return settings
+
+
+def write_settings(settings: FetchSettings) -> None:
+    write_log(f"domain: {settings.domain}")
+    write_log(f"username: {settings.username}")
+    write_log(f"password: {'***' if settings.password else None}")
+    write_log(f"base_url: {settings.base_url}")
+    write_log(f"max_single_fetch_count: {settings.max_single_fetch_count}")
+    write_log(f"start_item_index: {settings.start_item_index}")
+    write_log(f"max_item_count: {settings.max_item_count}")
+    write_log(f"max_thread_count: {settings.max_thread_count}")
+    write_log(f"max_try_count: {settings.max_try_count}")
+    write_log(f"output_folder: {settings.output_folder}")
+    write_log(f"stream_report_type: {settings.stream_report_type}")
+
+    if settings.stream_report_type:
+        write_log(f"stream_report_filepath: {settings.get_stream_report_filepath()}")
+        write_log(f"stream_report_interval: {settings.stream_report_interval}")
+
+
+def create_session(settings: FetchSettings) -> requests.Session:
+    session = requests.Session()
+    session.auth = requests_ntlm.HttpNtlmAuth(
+        username=f"{settings.domain}\\{settings.username}", password=settings.password
+    )
+    return session
 
 
 def parse_xml(xml: str) -> pd.DataFrame:
@@ -71,19 +130,26 @@ def parse_xml(xml: str) -> pd.DataFrame:
     return df
 
 
-def write_df(name: str, df: pd.DataFrame) -> None:
+def write_df(output_folder: str, name: str, df: pd.DataFrame) -> str:
 
     file_path = f"{output_folder}/{name}.csv"
 
     dir_path = os.path.dirname(file_path)
     os.makedirs(dir_path, exist_ok=True)
 
-    df.to_csv(file_path, index=False)
+    # the csv is kept to parse the page for the streaming report
+    csv_data = df.to_csv(index=False)
+    with open(file_path, mode="w", encoding="utf8", newline="") as file:
+        file.write(csv_data)
+
+    return csv_data
 
 
-def fetch_and_write(count: int, skip: int):
+def fetch_and_write(
+    session: requests.Session, settings: FetchSettings, count: int, skip: int
+) -> str | None:
 
-    url = f"{base_url}?$top={count}&$skip={skip}"
+    url = f"{settings.base_url}?$top={count}&$skip={skip}"
     response = session.get(url=url)
 
     if response.status_code != HTTPStatus.OK:
@@ -92,10 +158,26 @@ def fetch_and_write(count: int, skip: int):
     xml_data = response.text
 
     df = parse_xml(xml=xml_data)
-    write_df(name=f"sales_invoice_line_{skip}_{skip + count}", df=df)
-
-
-def task(count: int, skip: int):
+    csv_data = write_df(
+        settings.output_folder,
+        name=f"sales_invoice_line_{skip}_{skip + count}",
+        df=df,
+    )
+
+    return csv_data if len(df.index) else None
+
+
+def task(
+    session: requests.Session,
+    settings: FetchSettings,
+    count: int,
+    skip: int,
+    stream_report=None,
+) -> bool:
+    """
+    fetches and writes a page, then adds it to the stream report, returns
+    whether it succeeded.
+    """
     try_count = 0
     base_msg = f"fetching {skip}...{skip + count}"
 
@@ -103,25 +185,84 @@ def task(count: int, skip: int):
         try:
             write_log(f"{base_msg}...")
 
-            fetch_and_write(count=count, skip=skip)
+            csv_data = fetch_and_write(session, settings, count=count, skip=skip)
 
             write_log(f"{base_msg} done.")
             break
 
         except Exception as ex:
 
-            if try_count < max_try_count:
+            if try_count < settings.max_try_count:
                 try_count += 1
                 write_log(f"{base_msg}, error: {ex}, trying again...")
             else:
                 write_log(f"{base_msg}, error: {ex}")
-                break
+                return False
+
+    # outside of the retries, a page is added to the report only once
+    if stream_report is not None and csv_data is not None:
+        try:
+            stream_report.add_csv_page(csv_data, row_offset=skip)
+        except Exception as ex:
+            write_log(f"{base_msg}, report error: {ex}")
+            return False
+
+    return True
+
+
+def fetch(settings: FetchSettings) -> None:
+    """
+    fetches the pages of the items concurrently into the output folder.
+    """
+    write_settings(settings)
+
+    stream_report = None
+    if settings.stream_report_type:
+        from main_report import create_streaming_report
+
+        stream_report = create_streaming_report(
+            settings.stream_report_type,
+            report_filepath=settings.get_stream_report_filepath(),
+            interval=settings.stream_report_interval,
+        )
+
+    session = create_session(settings)
+
+    executer = ThreadPoolExecutor(max_workers=settings.max_thread_count)
+
+    futures = list()
+    for i in range(
+        settings.start_item_index,
+        settings.max_item_count,
+        settings.max_single_fetch_count,
+    ):
+        count = min(settings.max_single_fetch_count, settings.max_item_count - i)
+        futures.append(
+            executer.submit(task, session, settings, count, i, stream_report)
+        )
+
+    executer.shutdown()
+
+    failed_count = 0
+    for future in futures:
+        try:
+            if not future.result():
+                failed_count += 1
+        except Exception as ex:
+            write_log(f"error: {ex}")
+            failed_count += 1
 
+    if failed_count:
+        write_log(f"{failed_count} of {len(futures)} pages failed")
 
-executer = ThreadPoolExecutor(max_workers=max_thread_count)
+    if stream_report is not None:
+        # the report of the pages is only final when none of them is missing
+        stream_report.finish(is_complete=not failed_count)
+        if failed_count:
+            write_log("report incomplete, only the partial report was saved")
+        else:
+            write_log(f"report saved to {settings.get_stream_report_filepath()}")
 
-for i in range(start_item_index, max_item_count, max_single_fetch_count):
-    count = min(max_single_fetch_count, max_item_count - i)
-    executer.submit(task, count, i)
 
-executer.shutdown()
+if __name__ == "__main__":
+    fetch(load_settings())
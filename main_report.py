@@ -1,3 +1,4 @@
+import os
 import sys
 import pandas as pd
 from report_validations import (
@@ -14,82 +15,254 @@ from report_validations import (
 
 from report_generator import QualityReportGenerator
 from report_exporter import QualityReportExporter
+from report_chunked import generate_report_from_chunks, read_csv_chunks
+from report_schema import read_dataset
+from report_sampling import read_csv_sample
+from report_history import ReportHistory
+from report_drift import ProfileStore
+from report_batch import ReportJob, ReportJobResult, run_report_jobs
+from report_streaming import StreamingQualityReport
+from report_store import DatasetStore
+from report_cache import ColumnResultCache
+
+
+def get_key_report_filepath(report_filepath: str) -> str:
+    # the composite key uniqueness is written next to the column report
+    root, extension = os.path.splitext(report_filepath)
+    return f"{root}_keys{extension or '.csv'}"
+
+
+def get_drift_report_filepath(report_filepath: str) -> str:
+    root, extension = os.path.splitext(report_filepath)
+    return f"{root}_drift{extension or '.csv'}"
+
+
+def check_report_options(
+    chunk_size: int | None,
+    profile_directory: str | None,
+    store_filepath: str | None,
+    sample_fraction: float | None = None,
+    cache_directory: str | None = None,
+):
+    # the drift is checked on a dataframe, neither the chunks nor the store
+    # hold one. the chunks are also read as text, their profiles would drift
+    # from the typed baselines, and a sample is no baseline of the dataset
+    if profile_directory is not None and chunk_size is not None:
+        raise ValueError("the profile directory is not supported with chunk_size")
+    if profile_directory is not None and store_filepath is not None:
+        raise ValueError("the profile directory is not supported with a store")
+    if profile_directory is not None and sample_fraction is not None:
+        raise ValueError("the profile directory is not supported with a sample")
+    if chunk_size is not None and store_filepath is not None:
+        raise ValueError("chunk_size and a store are exclusive")
+    if sample_fraction is not None and (
+        chunk_size is not None or store_filepath is not None
+    ):
+        raise ValueError("a sample is only read into a dataframe")
+    # the cached results are the profiles of the columns of a dataframe
+    if cache_directory is not None and (
+        chunk_size is not None or store_filepath is not None
+    ):
+        raise ValueError("the result cache is only used with a dataframe")
+
+
+def load_report_store(
+    report_type: str, dataset_filepath: str, store_filepath: str
+) -> DatasetStore:
+    """
+    the store holding the dataset in a table named by the report type, the
+    csv file is only loaded again when it changed. the values are kept as
+    text like the chunks of the chunked reports.
+    """
+    store = DatasetStore(store_filepath)
+    store.load_csv(report_type, dataset_filepath, index_columns=[], dtype=str)
+    return store
+
 
 # ------------------------------------------------------------------------------
 # Sales Invoice Line
 # ------------------------------------------------------------------------------
 
 
-def generate_sales_invoice_line_report(df: pd.DataFrame):
+sales_invoice_line_validation_map = {
+    "Document_No": is_valid_document_no,
+    "Line_No": is_valid_number,
+    "Sell_to_Customer_No": is_valid_number,
+    "Type": is_valid_type,
+    "No": is_valid_number,
+    "Shipment_Date": is_valid_timestamp,
+    "Quantity": is_valid_number,
+    "Unit_Price": is_valid_number,
+    "Unit_Cost_LCY": is_valid_number,
+    "VAT_Percent": is_valid_number,
+    "Line_Discount_Percent": is_valid_number,
+    "Line_Discount_Amount": is_valid_number,
+    "Amount": is_valid_number,
+    "Amount_Including_VAT": is_valid_number,
+    "Allow_Invoice_Disc": is_valid_bool,
+    "Shortcut_Dimension_1_Code": is_valid_number,
+    "Shortcut_Dimension_2_Code": is_valid_number,
+    "Bill_to_Customer_No": is_valid_number,
+    "Inv_Discount_Amount": is_valid_number,
+    "Drop_Shipment": is_valid_bool,
+    "VAT_Base_Amount": is_valid_number,
+    "Unit_Cost": is_valid_number,
+    "System_Created_Entry": is_valid_bool,
+    "Line_Amount": is_valid_number,
+    "Posting_Date": is_valid_timestamp,
+    "Dimension_Set_ID": is_valid_number,
+    "Qty_per_Unit_of_Measure": is_valid_number,
+    "Quantity_Base": is_valid_number,
+    "Blanket_Order_No": is_valid_blanket_order_no,
+    "VAT_Identifier": is_valid_vat_identifier,
+}
+
+sales_invoice_line_column_pairing_map = {
+    "Type": "VAT_Difference",
+    "VAT_Identifier": "VAT_Prod_Posting_Group",
+}
+
+sales_invoice_line_date_columns = ["Shipment_Date", "Posting_Date"]
+
+sales_invoice_line_unique_keys = [["Document_No", "Line_No"]]
+
+
+def generate_sales_invoice_line_report(
+    df: pd.DataFrame,
+    max_process_count: int | None = None,
+    profile_store: ProfileStore | None = None,
+    uniqueness_error: float | None = None,
+    store: DatasetStore | None = None,
+    population_count: int | None = None,
+    result_cache: ColumnResultCache | None = None,
+):
+    # with a store holding the dataset in a table named by the report type,
+    # df can be None and the checks query the store instead. population_count
+    # is the row count of the dataset df was sampled from
     report_generator = QualityReportGenerator()
     report_generator.set_report_name("sales_invoice_line")
     report_generator.set_dataframe(df)
+    report_generator.set_population_count(population_count)
+    report_generator.set_result_cache(result_cache)
+    if store is not None:
+        report_generator.set_store(store, "sales_invoice_line")
 
-    validation_map = {
-        "Document_No": is_valid_document_no,
-        "Line_No": is_valid_number,
-        "Sell_to_Customer_No": is_valid_number,
-        "Type": is_valid_type,
-        "No": is_valid_number,
-        "Shipment_Date": is_valid_timestamp,
-        "Quantity": is_valid_number,
-        "Unit_Price": is_valid_number,
-        "Unit_Cost_LCY": is_valid_number,
-        "VAT_Percent": is_valid_number,
-        "Line_Discount_Percent": is_valid_number,
-        "Line_Discount_Amount": is_valid_number,
-        "Amount": is_valid_number,
-        "Amount_Including_VAT": is_valid_number,
-        "Allow_Invoice_Disc": is_valid_bool,
-        "Shortcut_Dimension_1_Code": is_valid_number,
-        "Shortcut_Dimension_2_Code": is_valid_number,
-        "Bill_to_Customer_No": is_valid_number,
-        "Inv_Discount_Amount": is_valid_number,
-        "Drop_Shipment": is_valid_bool,
-        "VAT_Base_Amount": is_valid_number,
-        "Unit_Cost": is_valid_number,
-        "System_Created_Entry": is_valid_bool,
-        "Line_Amount": is_valid_number,
-        "Posting_Date": is_valid_timestamp,
-        "Dimension_Set_ID": is_valid_number,
-        "Qty_per_Unit_of_Measure": is_valid_number,
-        "Quantity_Base": is_valid_number,
-        "Blanket_Order_No": is_valid_blanket_order_no,
-        "VAT_Identifier": is_valid_vat_identifier,
-    }
-
-    report_generator.set_validation_map(map=validation_map)
-
-    report_generator.set_column_pairing_map(
-        {
-            "Type": "VAT_Difference",
-            "VAT_Identifier": "VAT_Prod_Posting_Group",
-        }
-    )
+    report_generator.set_validation_map(map=sales_invoice_line_validation_map)
 
-    report_generator.check_completeness_async()
-    report_generator.check_uniqueness_async()
-    report_generator.check_validity_async()
-    report_generator.check_timeliness_async()
-    report_generator.check_consistency_async()
-    report = report_generator.generate_report()
+    report_generator.set_column_pairing_map(sales_invoice_line_column_pairing_map)
+
+    report_generator.set_date_columns(sales_invoice_line_date_columns)
 
-    return report
+    report_generator.set_unique_keys(sales_invoice_line_unique_keys)
+
+    report_generator.set_uniqueness_error(uniqueness_error)
+
+    # the fused profile checks the keys from its own encodings
+    if max_process_count is None:
+        report_generator.check_profile_async()
+    else:
+        report_generator.check_profile_parallel_async(max_process_count)
+        report_generator.check_key_uniqueness_async()
+    report_generator.check_timeliness_async()
+    if profile_store is not None:
+        report_generator.set_profile_store(profile_store)
+        report_generator.check_drift_async()
+    try:
+        return report_generator.generate_report()
+    finally:
+        report_generator.close()
 
 
 def generate_sales_invoice_line_report_from_file(
-    dataset_filepath: str, report_filepath: str
+    dataset_filepath: str,
+    report_filepath: str,
+    max_process_count: int | None = None,
+    chunk_size: int | None = None,
+    history_filepath: str | None = None,
+    profile_directory: str | None = None,
+    df: pd.DataFrame | None = None,
+    uniqueness_error: float | None = None,
+    store_filepath: str | None = None,
+    sample_fraction: float | None = None,
+    cache_directory: str | None = None,
 ):
-    sales_invoice_line_df = pd.read_csv(dataset_filepath)
-
-    sales_invoice_line_report = generate_sales_invoice_line_report(
-        df=sales_invoice_line_df
+    # df is the dataset already read by read_report_dataset, e.g. kept in
+    # memory by a worker. with store_filepath the dataset is loaded into that
+    # store, once per file, and the report is computed from it without
+    # reading the dataset into a dataframe. with sample_fraction only a random
+    # share of the rows is read, the report gets confidence intervals. with
+    # cache_directory the profiles of the unchanged columns of a previous run
+    # are read from the cache
+    check_report_options(
+        chunk_size, profile_directory, store_filepath, sample_fraction, cache_directory
     )
+    if store_filepath is not None:
+        sales_invoice_line_report = generate_sales_invoice_line_report(
+            df=None,
+            max_process_count=max_process_count,
+            uniqueness_error=uniqueness_error,
+            store=load_report_store(
+                "sales_invoice_line", dataset_filepath, store_filepath
+            ),
+        )
+    elif chunk_size is None:
+        population_count = None
+        if sample_fraction is not None:
+            df, population_count = read_csv_sample(
+                dataset_filepath,
+                sample_fraction,
+                read=read_dataset,
+                validation_map=sales_invoice_line_validation_map,
+            )
+        elif df is None:
+            df = read_dataset(
+                dataset_filepath, validation_map=sales_invoice_line_validation_map
+            )
+
+        sales_invoice_line_report = generate_sales_invoice_line_report(
+            df=df,
+            max_process_count=max_process_count,
+            profile_store=(
+                ProfileStore(profile_directory)
+                if profile_directory is not None
+                else None
+            ),
+            uniqueness_error=uniqueness_error,
+            population_count=population_count,
+            result_cache=(
+                ColumnResultCache(cache_directory)
+                if cache_directory is not None
+                else None
+            ),
+        )
+    else:
+        sales_invoice_line_report = generate_report_from_chunks(
+            name="sales_invoice_line",
+            chunks=read_csv_chunks(dataset_filepath, chunk_size),
+            validation_map=sales_invoice_line_validation_map,
+            column_pairing_map=sales_invoice_line_column_pairing_map,
+            date_columns=sales_invoice_line_date_columns,
+            uniqueness_error=uniqueness_error,
+        )
 
     report_exporter = QualityReportExporter()
     report_exporter.to_csv_file(
         report=sales_invoice_line_report, filepath=report_filepath
     )
+    if sales_invoice_line_report.key_uniqueness:
+        report_exporter.to_key_uniqueness_csv_file(
+            report=sales_invoice_line_report,
+            filepath=get_key_report_filepath(report_filepath),
+        )
+
+    if sales_invoice_line_report.drift:
+        report_exporter.to_drift_csv_file(
+            report=sales_invoice_line_report,
+            filepath=get_drift_report_filepath(report_filepath),
+        )
+
+    if history_filepath is not None:
+        ReportHistory(history_filepath).append(sales_invoice_line_report)
 
 
 # ------------------------------------------------------------------------------
@@ -97,237 +270,445 @@ def generate_sales_invoice_line_report_from_file(
 # ------------------------------------------------------------------------------
 
 
-def generate_contract_line_report(df: pd.DataFrame):
+contract_line_validation_map = {
+    "Document_No": is_valid_document_no,
+    "Line_No": is_valid_number,
+    "Sell_to_Customer_No": is_valid_number,
+    "No": is_valid_number,
+    "Quantity": is_valid_number,
+    "Outstanding_Quantity": is_valid_number,
+    "Qty_to_Invoice": is_valid_number,
+    "Qty_to_Ship": is_valid_number,
+    "Unit_Price": is_valid_number,
+    "Unit_Cost_LCY": is_valid_number,
+    "VAT_Percent": is_valid_number,
+    "Line_Discount_Percent": is_valid_number,
+    "Line_Discount_Amount": is_valid_number,
+    "Amount": is_valid_number,
+    "Amount_Including_VAT": is_valid_number,
+    "Allow_Invoice_Disc": is_valid_bool,
+    "Gross_Weight": is_valid_number,
+    "Net_Weight": is_valid_number,
+    "Units_per_Parcel": is_valid_number,
+    "Unit_Volume": is_valid_number,
+    "Appl_to_Item_Entry": is_valid_number,
+    "Shortcut_Dimension_1_Code": is_valid_number,
+    "Shortcut_Dimension_2_Code": is_valid_number,
+    "Recalculate_Invoice_Disc": is_valid_bool,
+    "Outstanding_Amount": is_valid_number,
+    "Qty_Shipped_Not_Invoiced": is_valid_number,
+    "Shipped_Not_Invoiced": is_valid_number,
+    "Quantity_Shipped": is_valid_number,
+    "Quantity_Invoiced": is_valid_number,
+    "Shipment_No": is_valid_number,
+    "Shipment_Line_No": is_valid_number,
+    "Profit_Percent": is_valid_number,
+    "Bill_to_Customer_No": is_valid_number,
+    "Inv_Discount_Amount": is_valid_number,
+    "Purchase_Order_No": is_valid_number,
+    "Drop_Shipment": is_valid_bool,
+    # "Gen_Bus_Posting_Group": null_validation,
+    # "Gen_Prod_Posting_Group": null_validation,
+    # "VAT_Calculation_Type": null_validation,
+    # "Transaction_Type": null_validation,
+    # "Transport_Method": null_validation,
+    "Attached_to_Line_No": is_valid_number,
+    # "Exit_Point": null_validation,
+    # "Area": null_validation,
+    # "Transaction_Specification": null_validation,
+    # "Tax_Category": null_validation,
+    # "Tax_Area_Code": null_validation,
+    "Tax_Liable": is_valid_bool,
+    # "Tax_Group_Code": null_validation,
+    # "VAT_Clause_Code": null_validation,
+    # "VAT_Bus_Posting_Group": null_validation,
+    "VAT_Prod_Posting_Group": is_valid_number,
+    # "Currency_Code": null_validation,
+    "Outstanding_Amount_LCY": is_valid_number,
+    "Shipped_Not_Invoiced_LCY": is_valid_number,
+    "Reserved_Quantity": is_valid_number,
+    # "Reserve": null_validation,
+    # "Blanket_Order_No": null_validation,
+    "Blanket_Order_Line_No": is_valid_number,
+    "VAT_Base_Amount": is_valid_number,
+    "Unit_Cost": is_valid_number,
+    "System_Created_Entry": is_valid_bool,
+    "Line_Amount": is_valid_number,
+    "VAT_Difference": is_valid_number,
+    "Inv_Disc_Amount_to_Invoice": is_valid_number,
+    "VAT_Identifier": is_valid_vat_identifier,
+    # "IC_Partner_Ref_Type": null_validation,
+    # "IC_Partner_Reference": null_validation,
+    "Prepayment_Percent": is_valid_number,
+    "Prepmt_Line_Amount": is_valid_number,
+    "Prepmt_Amt_Inv": is_valid_number,
+    "Prepmt_Amt_Incl_VAT": is_valid_number,
+    "Prepayment_Amount": is_valid_number,
+    "Prempt_VAT_Base_Amt": is_valid_number,
+    "Prepayment_VAT_Percent": is_valid_number,
+    "Prepmt_VAT_Calc_Type": is_valid_number,
+    # "Prepayment_VAT_Identifier": null_validation,
+    # "Prepayment_Tax_Area_Code": null_validation,
+    "Prepayment_Tax_Liable": is_valid_bool,
+    # "Prepayment_Tax_Group_Code": null_validation,
+    "Prepmt_Amt_to_Deduct": is_valid_number,
+    "Prepmt_Amt_Deducted": is_valid_number,
+    "Prepayment_Line": is_valid_bool,
+    "Prepmt_Amount_Inv_Incl_VAT": is_valid_number,
+    "Prepmt_Amount_Inv_LCY": is_valid_number,
+    "IC_Partner_Code": is_valid_number,
+    "Prepmt_VAT_Amount_Inv_LCY": is_valid_number,
+    "Prepayment_VAT_Difference": is_valid_number,
+    "Prepmt_VAT_Diff_to_Deduct": is_valid_number,
+    "Prepmt_VAT_Diff_Deducted": is_valid_number,
+    "Dimension_Set_ID": is_valid_number,
+    "Qty_to_Assemble_to_Order": is_valid_number,
+    "Qty_to_Asm_to_Order_Base": is_valid_number,
+    "ATO_Whse_Outstanding_Qty": is_valid_number,
+    "ATO_Whse_Outstd_Qty_Base": is_valid_number,
+    "Job_Task_No": is_valid_number,
+    "Job_Contract_Entry_No": is_valid_number,
+    "Posting_Date": is_valid_timestamp,
+    # "Deferral_Code": null_validation,
+    "Returns_Deferral_Start_Date": is_valid_timestamp,
+    # "Variant_Code": null_validation,
+    # "Bin_Code": null_validation,
+    "Qty_per_Unit_of_Measure": is_valid_number,
+    "Planned": is_valid_bool,
+    "Unit_of_Measure_Code": is_valid_measure_code,
+    "Quantity_Base": is_valid_number,
+    "Outstanding_Qty_Base": is_valid_number,
+    "Qty_to_Invoice_Base": is_valid_number,
+    "Qty_to_Ship_Base": is_valid_number,
+    "Qty_Shipped_Not_Invd_Base": is_valid_number,
+    "Qty_Shipped_Base": is_valid_number,
+    "Qty_Invoiced_Base": is_valid_number,
+    "Reserved_Qty_Base": is_valid_number,
+    "FA_Posting_Date": is_valid_timestamp,
+    # "Depreciation_Book_Code": null_validation,
+    "Depr_until_FA_Posting_Date": is_valid_bool,
+    # "Duplicate_in_Depreciation_Book": null_validation,
+    "Use_Duplication_List": is_valid_bool,
+    # "Responsibility_Center": null_validation,
+    "Out_of_Stock_Substitution": is_valid_bool,
+    "Substitution_Available": is_valid_bool,
+    # "Originally_Ordered_No": null_validation,
+    # "Originally_Ordered_Var_Code": null_validation,
+    # "Cross_Reference_No": null_validation,
+    # "Unit_of_Measure_Cross_Ref": null_validation,
+    # "Cross_Reference_Type": null_validation,
+    # "Cross_Reference_Type_No": null_validation,
+    # "Item_Category_Code": null_validation,
+    "Nonstock": is_valid_bool,
+    # "Purchasing_Code": null_validation,
+    # "Product_Group_Code": null_validation,
+    "Special_Order": is_valid_bool,
+    # "Special_Order_Purchase_No": null_validation,
+    "Special_Order_Purch_Line_No": is_valid_number,
+    "Whse_Outstanding_Qty": is_valid_number,
+    "Whse_Outstanding_Qty_Base": is_valid_number,
+    "Completely_Shipped": is_valid_bool,
+    "Requested_Delivery_Date": is_valid_timestamp,
+    "Promised_Delivery_Date": is_valid_timestamp,
+    # "Shipping_Time": null_validation,
+    # "Outbound_Whse_Handling_Time": null_validation,
+    "Planned_Delivery_Date": is_valid_timestamp,
+    "Planned_Shipment_Date": is_valid_timestamp,
+    # "Shipping_Agent_Code": null_validation,
+    # "Shipping_Agent_Service_Code": null_validation,
+    "Allow_Item_Charge_Assignment": is_valid_bool,
+    "Qty_to_Assign": is_valid_number,
+    "Qty_Assigned": is_valid_number,
+    "Return_Qty_to_Receive": is_valid_number,
+    "Return_Qty_to_Receive_Base": is_valid_number,
+    "Return_Qty_Rcd_Not_Invd": is_valid_number,
+    "Ret_Qty_Rcd_Not_Invd_Base": is_valid_number,
+    "Return_Rcd_Not_Invd": is_valid_number,
+    "Return_Rcd_Not_Invd_LCY": is_valid_number,
+    "Return_Qty_Received": is_valid_number,
+    "Return_Qty_Received_Base": is_valid_number,
+    "Appl_from_Item_Entry": is_valid_number,
+    # "BOM_Item_No": null_validation,
+    # "Return_Receipt_No": null_validation,
+    "Return_Receipt_Line_No": is_valid_number,
+    # "Return_Reason_Code": null_validation,
+    "Allow_Line_Disc": is_valid_bool,
+    # "Customer_Disc_Group": null_validation,
+    "Related_To_Line_No": is_valid_number,
+    # "Salesperson_Code": null_validation,
+    "Price_Not_Updated": is_valid_bool,
+    "Initial_Price": is_valid_number,
+    "Current_Price": is_valid_number,
+    "Initial_Index": is_valid_number,
+    "Contract_Line_Valid_From": is_valid_timestamp,
+    "Contract_Line_Valid_To": is_valid_timestamp,
+    # "Index_Type": null_validation,
+    "Next_Update_Date": is_valid_timestamp,
+    # "Update_Interval": null_validation,
+    "Current_Inflation_Rate": is_valid_number,
+    # "Contract_No": null_validation,
+    "Quantity_from_Job_Ledger_Entry": is_valid_bool,
+    # "Job_Filter": null_validation,
+    # "Job_Task_Filter": null_validation,
+    # "Work_Type_Filter": null_validation,
+    # "Unit_of_Measure_Filter": null_validation,
+    # "Resource_Type": null_validation,
+    "Correction_Line": is_valid_bool,
+    "Manual_Job_line": is_valid_bool,
+    # "ETag": null_validation,
+}
+
+contract_line_column_pairing_map = {
+    "Type": "VAT_Difference",
+    "VAT_Identifier": "VAT_Prod_Posting_Group",
+}
+
+contract_line_date_columns = ["Posting_Date", "FA_Posting_Date"]
+
+contract_line_unique_keys = [["Document_No", "Line_No"]]
+
+
+def generate_contract_line_report(
+    df: pd.DataFrame,
+    max_process_count: int | None = None,
+    profile_store: ProfileStore | None = None,
+    uniqueness_error: float | None = None,
+    store: DatasetStore | None = None,
+    population_count: int | None = None,
+    result_cache: ColumnResultCache | None = None,
+):
+    # with a store holding the dataset in a table named by the report type,
+    # df can be None and the checks query the store instead. population_count
+    # is the row count of the dataset df was sampled from
     report_generator = QualityReportGenerator()
     report_generator.set_report_name("contract_line")
     report_generator.set_dataframe(df)
+    report_generator.set_population_count(population_count)
+    report_generator.set_result_cache(result_cache)
+    if store is not None:
+        report_generator.set_store(store, "contract_line")
 
-    validation_map = {
-        "Document_No": is_valid_document_no,
-        "Line_No": is_valid_number,
-        "Sell_to_Customer_No": is_valid_number,
-        "No": is_valid_number,
-        "Quantity": is_valid_number,
-        "Outstanding_Quantity": is_valid_number,
-        "Qty_to_Invoice": is_valid_number,
-        "Qty_to_Ship": is_valid_number,
-        "Unit_Price": is_valid_number,
-        "Unit_Cost_LCY": is_valid_number,
-        "VAT_Percent": is_valid_number,
-        "Line_Discount_Percent": is_valid_number,
-        "Line_Discount_Amount": is_valid_number,
-        "Amount": is_valid_number,
-        "Amount_Including_VAT": is_valid_number,
-        "Allow_Invoice_Disc": is_valid_bool,
-        "Gross_Weight": is_valid_number,
-        "Net_Weight": is_valid_number,
-        "Units_per_Parcel": is_valid_number,
-        "Unit_Volume": is_valid_number,
-        "Appl_to_Item_Entry": is_valid_number,
-        "Shortcut_Dimension_1_Code": is_valid_number,
-        "Shortcut_Dimension_2_Code": is_valid_number,
-        "Recalculate_Invoice_Disc": is_valid_bool,
-        "Outstanding_Amount": is_valid_number,
-        "Qty_Shipped_Not_Invoiced": is_valid_number,
-        "Shipped_Not_Invoiced": is_valid_number,
-        "Quantity_Shipped": is_valid_number,
-        "Quantity_Invoiced": is_valid_number,
-        "Shipment_No": is_valid_number,
-        "Shipment_Line_No": is_valid_number,
-        "Profit_Percent": is_valid_number,
-        "Bill_to_Customer_No": is_valid_number,
-        "Inv_Discount_Amount": is_valid_number,
-        "Purchase_Order_No": is_valid_number,
-        "Drop_Shipment": is_valid_bool,
-        # "Gen_Bus_Posting_Group": null_validation,
-        # "Gen_Prod_Posting_Group": null_validation,
-        # "VAT_Calculation_Type": null_validation,
-        # "Transaction_Type": null_validation,
-        # "Transport_Method": null_validation,
-        "Attached_to_Line_No": is_valid_number,
-        # "Exit_Point": null_validation,
-        # "Area": null_validation,
-        # "Transaction_Specification": null_validation,
-        # "Tax_Category": null_validation,
-        # "Tax_Area_Code": null_validation,
-        "Tax_Liable": is_valid_bool,
-        # "Tax_Group_Code": null_validation,
-        # "VAT_Clause_Code": null_validation,
-        # "VAT_Bus_Posting_Group": null_validation,
-        "VAT_Prod_Posting_Group": is_valid_number,
-        # "Currency_Code": null_validation,
-        "Outstanding_Amount_LCY": is_valid_number,
-        "Shipped_Not_Invoiced_LCY": is_valid_number,
-        "Reserved_Quantity": is_valid_number,
-        # "Reserve": null_validation,
-        # "Blanket_Order_No": null_validation,
-        "Blanket_Order_Line_No": is_valid_number,
-        "VAT_Base_Amount": is_valid_number,
-        "Unit_Cost": is_valid_number,
-        "System_Created_Entry": is_valid_bool,
-        "Line_Amount": is_valid_number,
-        "VAT_Difference": is_valid_number,
-        "Inv_Disc_Amount_to_Invoice": is_valid_number,
-        "VAT_Identifier": is_valid_vat_identifier,
-        # "IC_Partner_Ref_Type": null_validation,
-        # "IC_Partner_Reference": null_validation,
-        "Prepayment_Percent": is_valid_number,
-        "Prepmt_Line_Amount": is_valid_number,
-        "Prepmt_Amt_Inv": is_valid_number,
-        "Prepmt_Amt_Incl_VAT": is_valid_number,
-        "Prepayment_Amount": is_valid_number,
-        "Prempt_VAT_Base_Amt": is_valid_number,
-        "Prepayment_VAT_Percent": is_valid_number,
-        "Prepmt_VAT_Calc_Type": is_valid_number,
-        # "Prepayment_VAT_Identifier": null_validation,
-        # "Prepayment_Tax_Area_Code": null_validation,
-        "Prepayment_Tax_Liable": is_valid_bool,
-        # "Prepayment_Tax_Group_Code": null_validation,
-        "Prepmt_Amt_to_Deduct": is_valid_number,
-        "Prepmt_Amt_Deducted": is_valid_number,
-        "Prepayment_Line": is_valid_bool,
-        "Prepmt_Amount_Inv_Incl_VAT": is_valid_number,
-        "Prepmt_Amount_Inv_LCY": is_valid_number,
-        "IC_Partner_Code": is_valid_number,
-        "Prepmt_VAT_Amount_Inv_LCY": is_valid_number,
-        "Prepayment_VAT_Difference": is_valid_number,
-        "Prepmt_VAT_Diff_to_Deduct": is_valid_number,
-        "Prepmt_VAT_Diff_Deducted": is_valid_number,
-        "Dimension_Set_ID": is_valid_number,
-        "Qty_to_Assemble_to_Order": is_valid_number,
-        "Qty_to_Asm_to_Order_Base": is_valid_number,
-        "ATO_Whse_Outstanding_Qty": is_valid_number,
-        "ATO_Whse_Outstd_Qty_Base": is_valid_number,
-        "Job_Task_No": is_valid_number,
-        "Job_Contract_Entry_No": is_valid_number,
-        "Posting_Date": is_valid_timestamp,
-        # "Deferral_Code": null_validation,
-        "Returns_Deferral_Start_Date": is_valid_timestamp,
-        # "Variant_Code": null_validation,
-        # "Bin_Code": null_validation,
-        "Qty_per_Unit_of_Measure": is_valid_number,
-        "Planned": is_valid_bool,
-        "Unit_of_Measure_Code": is_valid_measure_code,
-        "Quantity_Base": is_valid_number,
-        "Outstanding_Qty_Base": is_valid_number,
-        "Qty_to_Invoice_Base": is_valid_number,
-        "Qty_to_Ship_Base": is_valid_number,
-        "Qty_Shipped_Not_Invd_Base": is_valid_number,
-        "Qty_Shipped_Base": is_valid_number,
-        "Qty_Invoiced_Base": is_valid_number,
-        "Reserved_Qty_Base": is_valid_number,
-        "FA_Posting_Date": is_valid_timestamp,
-        # "Depreciation_Book_Code": null_validation,
-        "Depr_until_FA_Posting_Date": is_valid_bool,
-        # "Duplicate_in_Depreciation_Book": null_validation,
-        "Use_Duplication_List": is_valid_bool,
-        # "Responsibility_Center": null_validation,
-        "Out_of_Stock_Substitution": is_valid_bool,
-        "Substitution_Available": is_valid_bool,
-        # "Originally_Ordered_No": null_validation,
-        # "Originally_Ordered_Var_Code": null_validation,
-        # "Cross_Reference_No": null_validation,
-        # "Unit_of_Measure_Cross_Ref": null_validation,
-        # "Cross_Reference_Type": null_validation,
-        # "Cross_Reference_Type_No": null_validation,
-        # "Item_Category_Code": null_validation,
-        "Nonstock": is_valid_bool,
-        # "Purchasing_Code": null_validation,
-        # "Product_Group_Code": null_validation,
-        "Special_Order": is_valid_bool,
-        # "Special_Order_Purchase_No": null_validation,
-        "Special_Order_Purch_Line_No": is_valid_number,
-        "Whse_Outstanding_Qty": is_valid_number,
-        "Whse_Outstanding_Qty_Base": is_valid_number,
-        "Completely_Shipped": is_valid_bool,
-        "Requested_Delivery_Date": is_valid_timestamp,
-        "Promised_Delivery_Date": is_valid_timestamp,
-        # "Shipping_Time": null_validation,
-        # "Outbound_Whse_Handling_Time": null_validation,
-        "Planned_Delivery_Date": is_valid_timestamp,
-        "Planned_Shipment_Date": is_valid_timestamp,
-        # "Shipping_Agent_Code": null_validation,
-        # "Shipping_Agent_Service_Code": null_validation,
-        "Allow_Item_Charge_Assignment": is_valid_bool,
-        "Qty_to_Assign": is_valid_number,
-        "Qty_Assigned": is_valid_number,
-        "Return_Qty_to_Receive": is_valid_number,
-        "Return_Qty_to_Receive_Base": is_valid_number,
-        "Return_Qty_Rcd_Not_Invd": is_valid_number,
-        "Ret_Qty_Rcd_Not_Invd_Base": is_valid_number,
-        "Return_Rcd_Not_Invd": is_valid_number,
-        "Return_Rcd_Not_Invd_LCY": is_valid_number,
-        "Return_Qty_Received": is_valid_number,
-        "Return_Qty_Received_Base": is_valid_number,
-        "Appl_from_Item_Entry": is_valid_number,
-        # "BOM_Item_No": null_validation,
-        # "Return_Receipt_No": null_validation,
-        "Return_Receipt_Line_No": is_valid_number,
-        # "Return_Reason_Code": null_validation,
-        "Allow_Line_Disc": is_valid_bool,
-        # "Customer_Disc_Group": null_validation,
-        "Related_To_Line_No": is_valid_number,
-        # "Salesperson_Code": null_validation,
-        "Price_Not_Updated": is_valid_bool,
-        "Initial_Price": is_valid_number,
-        "Current_Price": is_valid_number,
-        "Initial_Index": is_valid_number,
-        "Contract_Line_Valid_From": is_valid_timestamp,
-        "Contract_Line_Valid_To": is_valid_timestamp,
-        # "Index_Type": null_validation,
-        "Next_Update_Date": is_valid_timestamp,
-        # "Update_Interval": null_validation,
-        "Current_Inflation_Rate": is_valid_number,
-        # "Contract_No": null_validation,
-        "Quantity_from_Job_Ledger_Entry": is_valid_bool,
-        # "Job_Filter": null_validation,
-        # "Job_Task_Filter": null_validation,
-        # "Work_Type_Filter": null_validation,
-        # "Unit_of_Measure_Filter": null_validation,
-        # "Resource_Type": null_validation,
-        "Correction_Line": is_valid_bool,
-        "Manual_Job_line": is_valid_bool,
-        # "ETag": null_validation,
-    }
-
-    report_generator.set_validation_map(map=validation_map)
-
-    report_generator.set_column_pairing_map(
-        {
-            "Type": "VAT_Difference",
-            "VAT_Identifier": "VAT_Prod_Posting_Group",
-        }
-    )
+    report_generator.set_validation_map(map=contract_line_validation_map)
 
-    report_generator.check_completeness_async()
-    report_generator.check_uniqueness_async()
-    report_generator.check_validity_async()
-    report_generator.check_timeliness_async()
-    report_generator.check_consistency_async()
-    report = report_generator.generate_report()
+    report_generator.set_column_pairing_map(contract_line_column_pairing_map)
 
-    return report
+    report_generator.set_date_columns(contract_line_date_columns)
+
+    report_generator.set_unique_keys(contract_line_unique_keys)
+
+    report_generator.set_uniqueness_error(uniqueness_error)
+
+    # the fused profile checks the keys from its own encodings
+    if max_process_count is None:
+        report_generator.check_profile_async()
+    else:
+        report_generator.check_profile_parallel_async(max_process_count)
+        report_generator.check_key_uniqueness_async()
+    report_generator.check_timeliness_async()
+    if profile_store is not None:
+        report_generator.set_profile_store(profile_store)
+        report_generator.check_drift_async()
+    try:
+        return report_generator.generate_report()
+    finally:
+        report_generator.close()
 
 
 def generate_contract_line_report_from_file(
-    dataset_filepath: str, report_filepath: str
+    dataset_filepath: str,
+    report_filepath: str,
+    max_process_count: int | None = None,
+    chunk_size: int | None = None,
+    history_filepath: str | None = None,
+    profile_directory: str | None = None,
+    df: pd.DataFrame | None = None,
+    uniqueness_error: float | None = None,
+    store_filepath: str | None = None,
+    sample_fraction: float | None = None,
+    cache_directory: str | None = None,
 ):
-    contract_line_df = pd.read_csv(dataset_filepath)
+    # df is the dataset already read by read_report_dataset, e.g. kept in
+    # memory by a worker. with store_filepath the dataset is loaded into that
+    # store, once per file, and the report is computed from it without
+    # reading the dataset into a dataframe. with sample_fraction only a random
+    # share of the rows is read, the report gets confidence intervals. with
+    # cache_directory the profiles of the unchanged columns of a previous run
+    # are read from the cache
+    check_report_options(
+        chunk_size, profile_directory, store_filepath, sample_fraction, cache_directory
+    )
+    if store_filepath is not None:
+        contract_line_report = generate_contract_line_report(
+            df=None,
+            max_process_count=max_process_count,
+            uniqueness_error=uniqueness_error,
+            store=load_report_store("contract_line", dataset_filepath, store_filepath),
+        )
+    elif chunk_size is None:
+        population_count = None
+        if sample_fraction is not None:
+            df, population_count = read_csv_sample(
+                dataset_filepath,
+                sample_fraction,
+                read=read_dataset,
+                validation_map=contract_line_validation_map,
+            )
+        elif df is None:
+            df = read_dataset(
+                dataset_filepath, validation_map=contract_line_validation_map
+            )
 
-    contract_line_report = generate_contract_line_report(df=contract_line_df)
+        contract_line_report = generate_contract_line_report(
+            df=df,
+            max_process_count=max_process_count,
+            profile_store=(
+                ProfileStore(profile_directory)
+                if profile_directory is not None
+                else None
+            ),
+            uniqueness_error=uniqueness_error,
+            population_count=population_count,
+            result_cache=(
+                ColumnResultCache(cache_directory)
+                if cache_directory is not None
+                else None
+            ),
+        )
+    else:
+        contract_line_report = generate_report_from_chunks(
+            name="contract_line",
+            chunks=read_csv_chunks(dataset_filepath, chunk_size),
+            validation_map=contract_line_validation_map,
+            column_pairing_map=contract_line_column_pairing_map,
+            date_columns=contract_line_date_columns,
+            uniqueness_error=uniqueness_error,
+        )
 
     report_exporter = QualityReportExporter()
     report_exporter.to_csv_file(report=contract_line_report, filepath=report_filepath)
+    if contract_line_report.key_uniqueness:
+        report_exporter.to_key_uniqueness_csv_file(
+            report=contract_line_report,
+            filepath=get_key_report_filepath(report_filepath),
+        )
+
+    if contract_line_report.drift:
+        report_exporter.to_drift_csv_file(
+            report=contract_line_report,
+            filepath=get_drift_report_filepath(report_filepath),
+        )
+
+    if history_filepath is not None:
+        ReportHistory(history_filepath).append(contract_line_report)
 
 
 # ------------------------------------------------------------------------------
 # Generate Reports
 # ------------------------------------------------------------------------------
 
-dataset_path = sys.argv[1]
-report_path = sys.argv[2]
+report_functions = {
+    "sales_invoice_line": generate_sales_invoice_line_report_from_file,
+    "contract_line": generate_contract_line_report_from_file,
+}
 
-generate_contract_line_report_from_file(
-    dataset_filepath=dataset_path,
-    report_filepath=report_path,
-)
+# validation map, column pairing map and date columns of every report type
+report_settings = {
+    "sales_invoice_line": (
+        sales_invoice_line_validation_map,
+        sales_invoice_line_column_pairing_map,
+        sales_invoice_line_date_columns,
+    ),
+    "contract_line": (
+        contract_line_validation_map,
+        contract_line_column_pairing_map,
+        contract_line_date_columns,
+    ),
+}
+
+
+def read_report_dataset(report_type: str, dataset_filepath: str) -> pd.DataFrame:
+    if report_type not in report_settings:
+        raise ValueError(f"unknown report type {report_type}")
+
+    validation_map, _, _ = report_settings[report_type]
+    return read_dataset(dataset_filepath, validation_map=validation_map)
+
+
+def create_streaming_report(
+    report_type: str, report_filepath: str, interval: float = 30
+) -> StreamingQualityReport:
+    if report_type not in report_settings:
+        raise ValueError(f"unknown report type {report_type}")
+
+    validation_map, column_pairing_map, date_columns = report_settings[report_type]
+    return StreamingQualityReport(
+        name=report_type,
+        report_filepath=report_filepath,
+        validation_map=validation_map,
+        column_pairing_map=column_pairing_map,
+        date_columns=date_columns,
+        interval=interval,
+    )
+
+
+def generate_reports(
+    jobs: list[ReportJob],
+    max_worker_count: int | None = None,
+    use_processes: bool = True,
+) -> list[ReportJobResult]:
+    # the checks are bound by the gil, the reports of a batch only run at the
+    # same time in processes of their own
+    results = run_report_jobs(
+        jobs,
+        report_functions=report_functions,
+        max_worker_count=max_worker_count,
+        use_processes=use_processes,
+    )
+
+    for result in results:
+        if result.error is None:
+            print(
+                f"info: {result.job.report_type} report saved to "
+                f"{result.job.report_filepath} in {result.wall_time}s"
+            )
+        else:
+            print(
+                f"error: {result.job.report_type} report of "
+                f"{result.job.dataset_filepath} failed\n{result.error}"
+            )
+
+    return results
+
+
+if __name__ == "__main__":
+    # either <dataset> <report> for a contract line report, or any number of
+    # <report type> <dataset> <report> triples generated concurrently
+    if len(sys.argv) == 3:
+        dataset_path = sys.argv[1]
+        report_path = sys.argv[2]
+
+        generate_contract_line_report_from_file(
+            dataset_filepath=dataset_path,
+            report_filepath=report_path,
+        )
+    else:
+        arguments = sys.argv[1:]
+        if not arguments or len(arguments) % 3:
+            print(
+                "usage: main_report.py <dataset> <report>\n"
+                "       main_report.py (<report type> <dataset> <report>)..."
+            )
+            sys.exit(2)
+
+        jobs = [
+            ReportJob(
+                report_type=arguments[index],
+                dataset_filepath=arguments[index + 1],
+                report_filepath=arguments[index + 2],
+            )
+            for index in range(0, len(arguments), 3)
+        ]
+
+        results = generate_reports(jobs)
+        if any(result.error is not None for result in results):
+            sys.exit(1)
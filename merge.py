@@ -3,7 +3,11 @@ import pandas as pd
 import sys
 
 
-def combine_csv_files(folder_path, output_csv):
+def combine_csv_files(folder_path, output_csv, subset=None):
+    """
+    combines the csv files of the folder, dropping the duplicated rows, or the
+    rows duplicating the values of the subset columns, e.g. a composite key.
+    """
     csv_files = [f for f in os.listdir(folder_path) if f[-4::1] == ".csv"]
     dataframes = []
 
@@ -16,12 +20,14 @@ def combine_csv_files(folder_path, output_csv):
         dataframes.append(df)
 
     combined_df = pd.concat(dataframes, ignore_index=True)
-    combined_df = combined_df.drop_duplicates()
+    combined_df = combined_df.drop_duplicates(subset=subset)
     combined_df.to_csv(output_csv, index=False)
 
     print(f"combined csv saved to {output_csv}")
 
 
-folder_path = sys.argv[1]
-output_csv = sys.argv[2]
-combine_csv_files(folder_path, output_csv)
+if __name__ == "__main__":
+    folder_path = sys.argv[1]
+    output_csv = sys.argv[2]
+    subset = sys.argv[3].split(",") if len(sys.argv) > 3 else None
+    combine_csv_files(folder_path, output_csv, subset=subset)
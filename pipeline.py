@@ -0,0 +1,578 @@
+import os
+import sys
+import json
+import shutil
+import hashlib
+import argparse
+import threading
+import traceback
+from glob import glob
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+# bumped whenever the computation of the stage keys changes
+_pipeline_version = "1"
+
+_chunk_size = 1024 * 1024
+
+# the sources of the stages are next to this module
+_directory = os.path.dirname(os.path.abspath(__file__))
+
+
+def _normalize_path(path: str) -> str:
+    return os.path.normpath(os.path.abspath(path))
+
+
+def _is_within(path: str, parent: str) -> bool:
+    return path == parent or path.startswith(parent + os.sep)
+
+
+class FileHasher:
+    """
+    content hashes of files, remembered by size and modification time in a
+    json file so the unchanged files are not read again on the next run.
+    """
+
+    _filepath: str
+    _hashes: dict[str, list]
+    _lock: threading.Lock
+
+    def __init__(self, filepath: str):
+        self._filepath = filepath
+        self._lock = threading.Lock()
+
+        try:
+            with open(filepath, mode="r", encoding="utf8") as file:
+                self._hashes = json.load(file)
+        except (OSError, ValueError):
+            self._hashes = dict()
+
+    def get_file_hash(self, filepath: str) -> str:
+        filepath = _normalize_path(filepath)
+        stat = os.stat(filepath)
+        signature = [stat.st_size, stat.st_mtime_ns]
+
+        with self._lock:
+            entry = self._hashes.get(filepath)
+        if entry is not None and entry[:2] == signature:
+            return entry[2]
+
+        digest = hashlib.blake2b(digest_size=20)
+        with open(filepath, mode="rb") as file:
+            while chunk := file.read(_chunk_size):
+                digest.update(chunk)
+        file_hash = digest.hexdigest()
+
+        with self._lock:
+            self._hashes[filepath] = [*signature, file_hash]
+        return file_hash
+
+    def get_hash(self, path: str) -> str:
+        """
+        hash of a file, or of the names and contents of all the files of a
+        directory, or a fixed hash for a missing path.
+        """
+        if os.path.isfile(path):
+            return self.get_file_hash(path)
+
+        digest = hashlib.blake2b(digest_size=20)
+        if not os.path.isdir(path):
+            digest.update(b"missing")
+            return digest.hexdigest()
+
+        for filepath in sorted(glob(os.path.join(path, "**", "*"), recursive=True)):
+            if not os.path.isfile(filepath):
+                continue
+            digest.update(os.path.relpath(filepath, path).encode("utf8"))
+            digest.update(b"\0")
+            digest.update(self.get_file_hash(filepath).encode("utf8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def save(self):
+        with self._lock:
+            hashes = dict(self._hashes)
+
+        dirname = os.path.dirname(self._filepath)
+        if dirname:
+            os.makedirs(dirname, exist_ok=True)
+
+        temp_filepath = f"{self._filepath}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_filepath, mode="w", encoding="utf8") as file:
+            json.dump(hashes, file)
+        os.replace(temp_filepath, self._filepath)
+
+
+class ArtifactCache:
+    """
+    content addressed store of the stage outputs in a directory, objects are
+    the output files by their hash and manifests map the key of a stage run
+    to the hashes of the outputs it wrote.
+    """
+
+    _directory: str
+
+    def __init__(self, directory: str):
+        self._directory = directory
+
+        os.makedirs(os.path.join(directory, "objects"), exist_ok=True)
+        os.makedirs(os.path.join(directory, "manifests"), exist_ok=True)
+
+    def _get_object_filepath(self, file_hash: str) -> str:
+        return os.path.join(self._directory, "objects", file_hash[:2], file_hash)
+
+    def _get_manifest_filepath(self, key: str) -> str:
+        return os.path.join(self._directory, "manifests", f"{key}.json")
+
+    def get_manifest(self, key: str) -> dict[str, str] | None:
+        try:
+            with open(self._get_manifest_filepath(key), encoding="utf8") as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return None
+
+    def put(self, key: str, outputs: dict[str, str]):
+        """
+        stores the output files by their hashes, then the manifest of the key.
+        """
+        for filepath, file_hash in outputs.items():
+            object_filepath = self._get_object_filepath(file_hash)
+            if os.path.exists(object_filepath):
+                continue
+
+            # the objects are read only copies, never links of the outputs,
+            # which the stages and the scripts may rewrite in place
+            os.makedirs(os.path.dirname(object_filepath), exist_ok=True)
+            temp_filepath = (
+                f"{object_filepath}.{os.getpid()}.{threading.get_ident()}.tmp"
+            )
+            shutil.copyfile(filepath, temp_filepath)
+            os.chmod(temp_filepath, 0o444)
+            os.replace(temp_filepath, object_filepath)
+
+        manifest_filepath = self._get_manifest_filepath(key)
+        temp_filepath = f"{manifest_filepath}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_filepath, mode="w", encoding="utf8") as file:
+            json.dump(outputs, file, indent=2)
+        os.replace(temp_filepath, manifest_filepath)
+
+    def has_objects(self, manifest: dict[str, str]) -> bool:
+        return all(
+            os.path.exists(self._get_object_filepath(file_hash))
+            for file_hash in manifest.values()
+        )
+
+    def restore(self, filepath: str, file_hash: str) -> bool:
+        """
+        copies the object back to the output, false when the content of the
+        object does not match its hash anymore, the object is then removed.
+        """
+        dirname = os.path.dirname(filepath)
+        if dirname:
+            os.makedirs(dirname, exist_ok=True)
+
+        object_filepath = self._get_object_filepath(file_hash)
+        temp_filepath = f"{filepath}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+        digest = hashlib.blake2b(digest_size=20)
+        with open(object_filepath, mode="rb") as source:
+            with open(temp_filepath, mode="wb") as target:
+                while chunk := source.read(_chunk_size):
+                    digest.update(chunk)
+                    target.write(chunk)
+
+        if digest.hexdigest() != file_hash:
+            os.remove(temp_filepath)
+            os.chmod(object_filepath, 0o644)
+            os.remove(object_filepath)
+            return False
+
+        os.replace(temp_filepath, filepath)
+        return True
+
+
+class Stage:
+    """
+    one step of the pipeline, run calls function with the params and must
+    write all the outputs. the stage is skipped when its inputs, params and
+    sources hash to the key of a previous run, volatile stages always run.
+    """
+
+    name: str
+    function: any
+    params: dict
+    inputs: list[str]
+    outputs: list[str]
+    sources: list[str]
+    volatile: bool
+
+    def __init__(
+        self,
+        name: str,
+        function,
+        params: dict = None,
+        inputs: list[str] = None,
+        outputs: list[str] = None,
+        sources: list[str] = None,
+        volatile: bool = False,
+    ):
+        self.name = name
+        self.function = function
+        self.params = params or dict()
+        self.inputs = inputs or list()
+        self.outputs = outputs or list()
+        self.sources = sources or list()
+        self.volatile = volatile
+
+    def run(self):
+        self.function(**self.params)
+
+
+class StageResult:
+    stage: Stage
+    status: str
+    key: str | None
+    error: str | None
+
+    def __init__(self, stage: Stage):
+        self.stage = stage
+        self.status = "pending"
+        self.key = None
+        self.error = None
+
+
+# the stages run in process, their modules are imported when they first run
+
+
+def run_fetch(output_folder: str):
+    from fetch import fetch, load_settings
+
+    fetch(load_settings(output_folder=output_folder))
+
+
+def run_merge(folder_path: str, output_csv: str, subset: list[str] = None):
+    from merge import combine_csv_files
+
+    combine_csv_files(folder_path, output_csv, subset=subset)
+
+
+def run_report(report_type: str, dataset_filepath: str, report_filepath: str):
+    from main_report import report_functions
+
+    report_functions[report_type](
+        dataset_filepath=dataset_filepath, report_filepath=report_filepath
+    )
+
+
+def run_categorize(dataset_filepath: str, output_filepath: str):
+    from categorize import categorize_file
+
+    categorize_file(dataset_filepath, output_filepath)
+
+
+class Pipeline:
+    """
+    runs the stages in the order of their dependencies, a stage depends on the
+    stages writing its inputs, the independent stages run concurrently.
+    """
+
+    stages: list[Stage]
+    _hasher: FileHasher
+    _cache: ArtifactCache
+    _max_worker_count: int | None
+
+    def __init__(
+        self,
+        stages: list[Stage],
+        cache_directory: str = "out/pipeline",
+        max_worker_count: int = None,
+    ):
+        names = [stage.name for stage in stages]
+        if len(set(names)) != len(names):
+            raise ValueError(f"duplicated stage names in {names}")
+
+        self.stages = stages
+        self._hasher = FileHasher(os.path.join(cache_directory, "hashes.json"))
+        self._cache = ArtifactCache(cache_directory)
+        self._max_worker_count = max_worker_count
+
+    def get_dependencies(self) -> dict[str, set[str]]:
+        outputs = {
+            stage.name: [_normalize_path(output) for output in stage.outputs]
+            for stage in self.stages
+        }
+
+        dependencies = dict[str, set[str]]()
+        for stage in self.stages:
+            dependencies[stage.name] = {
+                name
+                for name, stage_outputs in outputs.items()
+                if name != stage.name
+                for input_path in stage.inputs
+                for output in stage_outputs
+                if _is_within(_normalize_path(input_path), output)
+                or _is_within(output, _normalize_path(input_path))
+            }
+
+        self._check_cycles(dependencies)
+        return dependencies
+
+    def _check_cycles(self, dependencies: dict[str, set[str]]):
+        remaining = {name: set(names) for name, names in dependencies.items()}
+        while remaining:
+            ready = [name for name, names in remaining.items() if not names]
+            if not ready:
+                raise ValueError(f"cyclic dependencies between {sorted(remaining)}")
+            for name in ready:
+                del remaining[name]
+            for names in remaining.values():
+                names.difference_update(ready)
+
+    def get_key(self, stage: Stage) -> str:
+        function = stage.function
+        key = hashlib.blake2b(digest_size=20)
+        for part in (
+            _pipeline_version,
+            stage.name,
+            f"{function.__module__}.{getattr(function, '__qualname__', function)}",
+            json.dumps(stage.params, sort_keys=True, default=str),
+            json.dumps(stage.outputs),
+            *(self._hasher.get_hash(source) for source in stage.sources),
+            *(self._hasher.get_hash(input_path) for input_path in stage.inputs),
+        ):
+            key.update(part.encode("utf8"))
+            key.update(b"\0")
+        return key.hexdigest()
+
+    def _is_cached(self, key: str) -> bool:
+        """
+        brings the outputs back to the ones of the run of the key, restoring
+        the changed ones from the cache, false when any of them is missing or
+        corrupted.
+        """
+        manifest = self._cache.get_manifest(key)
+        if manifest is None or not self._cache.has_objects(manifest):
+            return False
+
+        for filepath, file_hash in manifest.items():
+            if (
+                os.path.isfile(filepath)
+                and self._hasher.get_hash(filepath) == file_hash
+            ):
+                continue
+            if not self._cache.restore(filepath, file_hash):
+                return False
+        return True
+
+    def _run_stage(self, stage: Stage, force: bool) -> StageResult:
+        result = StageResult(stage)
+
+        try:
+            if not stage.volatile:
+                result.key = self.get_key(stage)
+                if not force and self._is_cached(result.key):
+                    result.status = "cached"
+                    return result
+
+                # outputs may share their file with a cached object
+                for output in stage.outputs:
+                    if os.path.isfile(output):
+                        os.remove(output)
+
+            for output in stage.outputs:
+                dirname = os.path.dirname(output)
+                if dirname:
+                    os.makedirs(dirname, exist_ok=True)
+
+            stage.run()
+
+            if not stage.volatile:
+                self._cache.put(
+                    result.key,
+                    {
+                        output: self._hasher.get_hash(output)
+                        for output in stage.outputs
+                        if os.path.isfile(output)
+                    },
+                )
+            result.status = "done"
+
+        except Exception:
+            result.status = "failed"
+            result.error = traceback.format_exc()
+
+        return result
+
+    def run(
+        self, stage_names: list[str] = None, force_names: list[str] = None
+    ) -> list[StageResult]:
+        """
+        runs the given stages, all by default, each one once its dependencies
+        are done, the stages depending on a failed one are not run.
+        """
+        dependencies = self.get_dependencies()
+        stages = {
+            stage.name: stage
+            for stage in self.stages
+            if stage_names is None or stage.name in stage_names
+        }
+        force_names = set(force_names or list())
+
+        results = {name: StageResult(stage) for name, stage in stages.items()}
+        waiting = {name: dependencies[name].intersection(stages) for name in stages}
+        running = dict()
+
+        with ThreadPoolExecutor(max_workers=self._max_worker_count) as executor:
+            while waiting or running:
+                for name in [name for name, names in waiting.items() if not names]:
+                    del waiting[name]
+                    task = executor.submit(
+                        self._run_stage, stages[name], name in force_names
+                    )
+                    running[task] = name
+
+                done_tasks, _ = wait(running, return_when=FIRST_COMPLETED)
+                for task in done_tasks:
+                    name = running.pop(task)
+                    results[name] = result = task.result()
+                    print(f"info: stage {name} {result.status}")
+
+                    if result.status == "failed":
+                        print(f"error: stage {name} failed\n{result.error}")
+                        self._skip_dependents(name, waiting, results)
+                    else:
+                        for names in waiting.values():
+                            names.discard(name)
+
+        self._hasher.save()
+        return [results[name] for name in stages]
+
+    def _skip_dependents(self, name: str, waiting: dict, results: dict):
+        failed_names = [name]
+        while failed_names:
+            failed_name = failed_names.pop()
+            for dependent, names in list(waiting.items()):
+                if failed_name in names:
+                    del waiting[dependent]
+                    results[dependent].status = "skipped"
+                    print(f"info: stage {dependent} skipped")
+                    failed_names.append(dependent)
+
+
+# ------------------------------------------------------------------------------
+# Default Pipeline
+# ------------------------------------------------------------------------------
+
+default_paths = {
+    "pages": os.getenv("OUTPUT_FOLDER") or "out/pages",
+    "dataset": "out/datasets/sales_invoice_line.csv",
+    "report": "out/reports/sales_invoice_line.csv",
+    "key_report": "out/reports/sales_invoice_line_keys.csv",
+    "revenue": "out/reports/revenue.csv",
+}
+
+_report_sources = [
+    os.path.join(_directory, "main_report.py"),
+    *sorted(glob(os.path.join(_directory, "report*.py"))),
+]
+
+
+def get_default_stages(
+    paths: dict[str, str] = None, merge_subset: list[str] = None
+) -> list[Stage]:
+    """
+    fetch writes the pages, merge combines them into the dataset, and the
+    report and the categorization both read the dataset.
+    """
+    paths = {**default_paths, **(paths or dict())}
+
+    return [
+        Stage(
+            name="fetch",
+            function=run_fetch,
+            params={"output_folder": paths["pages"]},
+            outputs=[paths["pages"]],
+            volatile=True,
+        ),
+        Stage(
+            name="merge",
+            function=run_merge,
+            params={
+                "folder_path": paths["pages"],
+                "output_csv": paths["dataset"],
+                "subset": merge_subset,
+            },
+            inputs=[paths["pages"]],
+            outputs=[paths["dataset"]],
+            sources=[os.path.join(_directory, "merge.py")],
+        ),
+        Stage(
+            name="report",
+            function=run_report,
+            params={
+                "report_type": "sales_invoice_line",
+                "dataset_filepath": paths["dataset"],
+                "report_filepath": paths["report"],
+            },
+            inputs=[paths["dataset"]],
+            outputs=[paths["report"], paths["key_report"]],
+            sources=_report_sources,
+        ),
+        Stage(
+            name="categorize",
+            function=run_categorize,
+            params={
+                "dataset_filepath": paths["dataset"],
+                "output_filepath": paths["revenue"],
+            },
+            inputs=[paths["dataset"]],
+            outputs=[paths["revenue"]],
+            sources=[
+                os.path.join(_directory, "categorize.py"),
+                os.path.join(_directory, "report_store.py"),
+            ],
+        ),
+    ]
+
+
+def main(args: list[str] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="runs the fetch, merge, report and categorize stages, "
+        "skipping the ones whose inputs did not change"
+    )
+    parser.add_argument("stages", nargs="*", help="stages to run, all by default")
+    parser.add_argument("--no-fetch", action="store_true", help="use the pages")
+    parser.add_argument("--force", nargs="*", default=list(), help="stages to rerun")
+    parser.add_argument("--pages", default=default_paths["pages"])
+    parser.add_argument("--dataset", default=default_paths["dataset"])
+    parser.add_argument("--cache", default="out/pipeline")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument(
+        "--merge-subset", default=None, help="comma separated key columns"
+    )
+    arguments = parser.parse_args(args)
+
+    stages = get_default_stages(
+        paths={"pages": arguments.pages, "dataset": arguments.dataset},
+        merge_subset=(
+            arguments.merge_subset.split(",") if arguments.merge_subset else None
+        ),
+    )
+
+    stage_names = arguments.stages or [stage.name for stage in stages]
+    if arguments.no_fetch and "fetch" in stage_names:
+        stage_names.remove("fetch")
+
+    unknown_names = set(stage_names + arguments.force) - {s.name for s in stages}
+    if unknown_names:
+        parser.error(f"unknown stages {sorted(unknown_names)}")
+
+    pipeline = Pipeline(
+        stages, cache_directory=arguments.cache, max_worker_count=arguments.workers
+    )
+    results = pipeline.run(stage_names=stage_names, force_names=arguments.force)
+
+    return 1 if any(result.status in ("failed", "skipped") for result in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
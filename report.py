@@ -1,64 +1,196 @@
 class QualityReport:
 
     class Completeness:
+        __slots__ = (
+            "total_count",
+            "value_count",
+            "null_count",
+            "score",
+            "score_interval",
+        )
+
         total_count: int
         value_count: int
         null_count: int
         score: float
+        score_interval: list[float] | None
 
         def __init__(self):
             self.total_count = 0
             self.value_count = 0
             self.null_count = 0
             self.score = 0
+            self.score_interval = None
 
     class Uniqueness:
+        __slots__ = (
+            "total_count",
+            "unique_count",
+            "duplicate_count",
+            "score",
+            "is_estimate",
+        )
+
         total_count: int
         unique_count: int
         duplicate_count: int
         score: float
+        is_estimate: bool
 
         def __init__(self):
             self.total_count = 0
             self.unique_count = 0
             self.duplicate_count = 0
             self.score = 0
+            self.is_estimate = False
 
     class Validity:
+        __slots__ = (
+            "total_count",
+            "valid_count",
+            "invalid_count",
+            "score",
+            "score_interval",
+        )
+
         total_count: int
         valid_count: int
         invalid_count: int
         score: float
+        score_interval: list[float] | None
 
         def __init__(self):
             self.total_count = 0
             self.valid_count = 0
             self.invalid_count = 0
             self.score = 0
+            self.score_interval = None
 
     class Timeliness:
+        __slots__ = (
+            "total_count",
+            "valid_count",
+            "invalid_count",
+            "future_count",
+            "out_of_window_count",
+            "latest",
+            "freshness_days",
+            "score",
+        )
+
         total_count: int
         valid_count: int
         invalid_count: int
+        future_count: int
+        out_of_window_count: int
+        latest: str | None
+        freshness_days: float | None
         score: float
 
         def __init__(self):
             self.total_count = 0
             self.valid_count = 0
             self.invalid_count = 0
+            self.future_count = 0
+            self.out_of_window_count = 0
+            self.latest = None
+            self.freshness_days = None
             self.score = 0
 
     class Consistency:
+        __slots__ = (
+            "total_count",
+            "consistent_count",
+            "inconsistent_count",
+            "score",
+            "score_interval",
+        )
+
         total_count: int
         consistent_count: int
         inconsistent_count: int
         score: float
+        score_interval: list[float] | None
 
         def __init__(self):
             self.total_count = 0
             self.consistent_count = 0
             self.inconsistent_count = 0
             self.score = 0
+            self.score_interval = None
+
+    class KeyUniqueness:
+        __slots__ = (
+            "key_columns",
+            "total_count",
+            "unique_count",
+            "duplicate_count",
+            "duplicate_key_count",
+            "top_duplicates",
+            "score",
+        )
+
+        key_columns: list[str]
+        total_count: int
+        unique_count: int
+        duplicate_count: int
+        duplicate_key_count: int
+        top_duplicates: list[dict]
+        score: float
+
+        def __init__(self):
+            self.key_columns = list()
+            self.total_count = 0
+            self.unique_count = 0
+            self.duplicate_count = 0
+            self.duplicate_key_count = 0
+            self.top_duplicates = list()
+            self.score = 0
+
+    class Drift:
+        __slots__ = (
+            "baseline_null_ratio",
+            "null_ratio",
+            "top_distance",
+            "new_values",
+            "quantile_shift",
+            "is_drifted",
+            "reasons",
+        )
+
+        baseline_null_ratio: float | None
+        null_ratio: float | None
+        top_distance: float | None
+        new_values: list[str]
+        quantile_shift: float | None
+        is_drifted: bool
+        reasons: list[str]
+
+        def __init__(self):
+            self.baseline_null_ratio = None
+            self.null_ratio = None
+            self.top_distance = None
+            self.new_values = list()
+            self.quantile_shift = None
+            self.is_drifted = False
+            self.reasons = list()
+
+    __slots__ = (
+        "name",
+        "completeness",
+        "uniqueness",
+        "validity",
+        "timeliness",
+        "consistency",
+        "completeness_columns",
+        "uniqueness_columns",
+        "validity_columns",
+        "timeliness_columns",
+        "consistency_columns",
+        "key_uniqueness",
+        "timings",
+        "drift",
+    )
 
     name: str
     completeness: Completeness
@@ -69,7 +201,11 @@ class QualityReport:
     completeness_columns: dict[str, Completeness]
     uniqueness_columns: dict[str, Uniqueness]
     validity_columns: dict[str, Validity]
+    timeliness_columns: dict[str, Timeliness]
     consistency_columns: dict[str, Consistency]
+    key_uniqueness: dict[str, KeyUniqueness]
+    timings: list
+    drift: dict[str, Drift]
 
     def __init__(self):
         self.name = ""
@@ -83,3 +219,6 @@ class QualityReport:
         self.validity_columns = dict[str, QualityReport.Validity]()
         self.timeliness_columns = dict[str, QualityReport.Timeliness]()
         self.consistency_columns = dict[str, QualityReport.Consistency]()
+        self.key_uniqueness = dict[str, QualityReport.KeyUniqueness]()
+        self.timings = list()
+        self.drift = dict[str, QualityReport.Drift]()
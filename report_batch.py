@@ -0,0 +1,90 @@
+import time
+import traceback
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+
+
+class ReportJob:
+    report_type: str
+    dataset_filepath: str
+    report_filepath: str
+    options: dict
+
+    def __init__(
+        self,
+        report_type: str,
+        dataset_filepath: str,
+        report_filepath: str,
+        options: dict = None,
+    ):
+        self.report_type = report_type
+        self.dataset_filepath = dataset_filepath
+        self.report_filepath = report_filepath
+        self.options = options or dict()
+
+
+class ReportJobResult:
+    job: ReportJob
+    wall_time: float
+    error: str | None
+
+    def __init__(self, job: ReportJob):
+        self.job = job
+        self.wall_time = 0
+        self.error = None
+
+
+def run_report_job(report_function, job: ReportJob) -> ReportJobResult:
+    """
+    runs one job and catches its error, so a failing job does not stop the
+    others of its batch.
+    """
+    result = ReportJobResult(job)
+
+    start_time = time.perf_counter()
+    try:
+        report_function(
+            dataset_filepath=job.dataset_filepath,
+            report_filepath=job.report_filepath,
+            **job.options,
+        )
+    except Exception:
+        result.error = traceback.format_exc()
+    result.wall_time = round(time.perf_counter() - start_time, 6)
+
+    return result
+
+
+def run_report_jobs(
+    jobs: list[ReportJob],
+    report_functions: dict[str, any],
+    max_worker_count: int = None,
+    use_processes: bool = False,
+    executor: Executor = None,
+) -> list[ReportJobResult]:
+    """
+    runs the jobs concurrently on a shared pool, each one with a generator of
+    its own writing its own report, and returns their results in job order.
+
+    report_functions maps the report types to functions taking the dataset
+    and report filepaths and the options of the job, they must be picklable
+    when the jobs run in processes.
+    """
+    for job in jobs:
+        if job.report_type not in report_functions:
+            raise ValueError(f"unknown report type {job.report_type}")
+
+    owns_executor = executor is None
+    if owns_executor:
+        executor_type = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+        executor = executor_type(max_workers=max_worker_count)
+
+    try:
+        tasks = [
+            executor.submit(run_report_job, report_functions[job.report_type], job)
+            for job in jobs
+        ]
+        return [task.result() for task in tasks]
+
+    finally:
+        if owns_executor:
+            executor.shutdown()
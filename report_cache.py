@@ -0,0 +1,161 @@
+import os
+import types
+import pickle
+import hashlib
+import threading
+import pandas as pd
+
+# bumped whenever the computation of the cached metrics changes
+_cache_version = "5"
+
+
+def get_column_fingerprint(column_df: pd.Series) -> str:
+    hashes = pd.util.hash_pandas_object(column_df, index=False).to_numpy()
+
+    fingerprint = hashlib.blake2b(digest_size=16)
+    fingerprint.update(str(column_df.dtype).encode("utf8"))
+    fingerprint.update(hashes.tobytes())
+    return fingerprint.hexdigest()
+
+
+def _get_code_names(code: types.CodeType) -> set[str]:
+    names = set(code.co_names)
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            names |= _get_code_names(const)
+    return names
+
+
+def get_validator_identity(validator, _seen: set | None = None) -> str:
+    if validator is None:
+        return "none"
+
+    name = f"{validator.__module__}.{getattr(validator, '__qualname__', validator)}"
+
+    # editing the body of a validator invalidates its cached results
+    code = getattr(validator, "__code__", None)
+    if code is None:
+        return name
+
+    identity = hashlib.blake2b(digest_size=16)
+    identity.update(code.co_code)
+    identity.update(repr(code.co_consts).encode("utf8"))
+
+    # so does changing a global it reads, e.g. start_date, or a function it
+    # calls, modules and classes are only known by their name
+    seen = _seen if _seen is not None else {validator}
+    module_globals = getattr(validator, "__globals__", dict())
+    for global_name in sorted(_get_code_names(code)):
+        if global_name not in module_globals:
+            continue
+
+        value = module_globals[global_name]
+        if isinstance(value, types.FunctionType):
+            if value in seen:
+                continue
+            seen.add(value)
+            part = get_validator_identity(value, seen)
+        elif isinstance(value, (types.ModuleType, type, types.BuiltinFunctionType)):
+            continue
+        else:
+            part = repr(value)
+
+        identity.update(f"{global_name}={part}".encode("utf8"))
+        identity.update(b"\0")
+
+    return f"{name}:{identity.hexdigest()}"
+
+
+def get_cache_key(
+    column_fingerprint: str,
+    check_type: str,
+    validator=None,
+    pair_fingerprint: str | None = None,
+) -> str:
+    key = hashlib.blake2b(digest_size=20)
+    for part in (
+        _cache_version,
+        column_fingerprint,
+        check_type,
+        get_validator_identity(validator),
+        pair_fingerprint or "none",
+    ):
+        key.update(part.encode("utf8"))
+        key.update(b"\0")
+    return key.hexdigest()
+
+
+class ColumnResultCache:
+    """
+    persistent cache of per column check results in a directory, evicting the
+    least recently used entries past max_entry_count or max_byte_count.
+    """
+
+    _directory: str
+    _max_entry_count: int
+    _max_byte_count: int
+    _lock: threading.Lock
+
+    def __init__(
+        self,
+        directory: str,
+        max_entry_count: int = 100_000,
+        max_byte_count: int = 256 * 1024 * 1024,
+    ):
+        self._directory = directory
+        self._max_entry_count = max_entry_count
+        self._max_byte_count = max_byte_count
+        self._lock = threading.Lock()
+
+        os.makedirs(directory, exist_ok=True)
+
+    def get(self, key: str):
+        filepath = self._get_filepath(key)
+
+        with self._lock:
+            try:
+                with open(filepath, mode="rb") as file:
+                    result = pickle.load(file)
+            except (OSError, pickle.UnpicklingError, EOFError):
+                return None
+
+            # the modification time keeps track of the last use
+            os.utime(filepath)
+
+        return result
+
+    def put(self, key: str, result):
+        filepath = self._get_filepath(key)
+        temp_filepath = f"{filepath}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+        with self._lock:
+            with open(temp_filepath, mode="wb") as file:
+                pickle.dump(result, file, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_filepath, filepath)
+
+    def evict(self):
+        with self._lock:
+            entries = list()
+            for filename in os.listdir(self._directory):
+                if not filename.endswith(".pkl"):
+                    continue
+
+                stat = os.stat(os.path.join(self._directory, filename))
+                entries.append((stat.st_mtime, stat.st_size, filename))
+
+            entries.sort(reverse=True)
+
+            entry_count = 0
+            byte_count = 0
+            for _, size, filename in entries:
+                entry_count += 1
+                byte_count += size
+
+                if (
+                    entry_count > self._max_entry_count
+                    or byte_count > self._max_byte_count
+                ):
+                    os.remove(os.path.join(self._directory, filename))
+
+    def _get_filepath(self, key: str) -> str:
+        return os.path.join(self._directory, f"{key}.pkl")
@@ -0,0 +1,500 @@
+import os
+import shutil
+import tempfile
+import numpy as np
+import pandas as pd
+from report import QualityReport
+from report_profiler import (
+    ColumnProfile,
+    EncodedColumn,
+    consolidate_metrics,
+    consolidate_timeliness,
+    encode_column,
+    get_score,
+    get_timeliness,
+    get_validity,
+    merge_timeliness,
+)
+from report_sketches import HyperLogLog, hash_values
+from report_validations import parse_dates, start_date, end_date
+
+_null_hash = np.uint64(np.iinfo(np.uint64).max)
+
+
+def hash_rows(encoded: EncodedColumn) -> np.ndarray:
+    hashes = np.append(hash_values(encoded.uniques), _null_hash)
+    return hashes[encoded.codes]
+
+
+class SpillingHashSet:
+    """
+    exact set of 64 bit hashes, kept in memory up to max_memory_count hashes
+    and spilled to disk in buckets by the leading bits of the hash beyond it.
+    """
+
+    _memory: list[np.ndarray]
+    _memory_count: int
+    _max_memory_count: int
+    _bucket_bits: int
+    _spill_directory: str | None
+    _directory: str | None
+
+    def __init__(
+        self,
+        max_memory_count: int = 1_000_000,
+        spill_directory: str | None = None,
+        bucket_bits: int = 6,
+    ):
+        self._memory = list()
+        self._memory_count = 0
+        self._max_memory_count = max_memory_count
+        self._bucket_bits = bucket_bits
+        self._spill_directory = spill_directory
+        self._directory = None
+
+    def add(self, hashes: np.ndarray):
+        self._memory.append(np.asarray(hashes, dtype=np.uint64))
+        self._memory_count += len(hashes)
+
+        if self._memory_count > self._max_memory_count:
+            self._compact()
+
+            # spilling when deduplicating does not free enough of the memory
+            if self._memory_count > self._max_memory_count // 2:
+                self._spill()
+
+    def merge(self, other: "SpillingHashSet"):
+        for hashes in other._memory:
+            self.add(hashes)
+
+        for bucket in other._get_spilled_buckets():
+            source_filepath = other._get_bucket_filepath(bucket)
+            with open(source_filepath, mode="rb") as source:
+                with open(self._get_bucket_filepath(bucket), mode="ab") as target:
+                    shutil.copyfileobj(source, target)
+
+    def count(self) -> int:
+        memory_hashes = self._get_memory_hashes()
+
+        if self._directory is None:
+            return int(len(memory_hashes))
+
+        buckets = memory_hashes >> np.uint64(64 - self._bucket_bits)
+        count = 0
+        for bucket in range(2**self._bucket_bits):
+            hashes = memory_hashes[buckets == bucket]
+
+            filepath = self._get_bucket_filepath(bucket)
+            if os.path.exists(filepath):
+                hashes = np.concatenate(
+                    [hashes, np.fromfile(filepath, dtype=np.uint64)]
+                )
+
+            count += int(len(np.unique(hashes)))
+
+        return count
+
+    def close(self):
+        if self._directory is not None:
+            shutil.rmtree(self._directory, ignore_errors=True)
+            self._directory = None
+
+    def _get_memory_hashes(self) -> np.ndarray:
+        if not self._memory:
+            return np.empty(0, dtype=np.uint64)
+        return np.unique(np.concatenate(self._memory))
+
+    def _compact(self):
+        hashes = self._get_memory_hashes()
+        self._memory = [hashes]
+        self._memory_count = len(hashes)
+
+    def _spill(self):
+        hashes = self._get_memory_hashes()
+        buckets = hashes >> np.uint64(64 - self._bucket_bits)
+
+        # hashes are sorted, so every bucket is a contiguous slice
+        bucket_starts = np.searchsorted(buckets, np.arange(2**self._bucket_bits))
+        bucket_ends = np.append(bucket_starts[1:], len(hashes))
+        for bucket, (start, end) in enumerate(zip(bucket_starts, bucket_ends)):
+            if start == end:
+                continue
+            with open(self._get_bucket_filepath(bucket), mode="ab") as file:
+                hashes[start:end].tofile(file)
+
+        self._memory = list()
+        self._memory_count = 0
+
+    def _get_spilled_buckets(self) -> list[int]:
+        if self._directory is None:
+            return []
+        return [
+            bucket
+            for bucket in range(2**self._bucket_bits)
+            if os.path.exists(self._get_bucket_filepath(bucket))
+        ]
+
+    def _get_bucket_filepath(self, bucket: int) -> str:
+        if self._directory is None:
+            if self._spill_directory is not None:
+                os.makedirs(self._spill_directory, exist_ok=True)
+            self._directory = tempfile.mkdtemp(
+                prefix="uniqueness_", dir=self._spill_directory
+            )
+        return os.path.join(self._directory, f"bucket_{bucket}.bin")
+
+
+class ColumnState:
+    """
+    mergeable partial metrics of one column over the chunks seen so far.
+    """
+
+    total_count: int
+    null_count: int
+    valid_count: int
+    distinct_hashes: any
+    is_distinct_estimate: bool
+    pairs: pd.DataFrame | None
+    timeliness: QualityReport.Timeliness | None
+
+    def __init__(
+        self,
+        max_memory_count: int,
+        spill_directory: str | None,
+        uniqueness_error: float | None = None,
+    ):
+        self.total_count = 0
+        self.null_count = 0
+        self.valid_count = 0
+        self.is_distinct_estimate = uniqueness_error is not None
+        if uniqueness_error is None:
+            self.distinct_hashes = SpillingHashSet(
+                max_memory_count=max_memory_count, spill_directory=spill_directory
+            )
+        else:
+            self.distinct_hashes = HyperLogLog(
+                precision=HyperLogLog.get_precision(uniqueness_error)
+            )
+        self.pairs = None
+        self.timeliness = None
+
+    def update(
+        self,
+        encoded: EncodedColumn,
+        validator,
+        pair: EncodedColumn | None,
+        row_offset: int,
+    ):
+        self.total_count += encoded.total_count
+        self.null_count += encoded.null_count
+        self.valid_count += get_validity(encoded, validator).valid_count
+
+        present_uniques = encoded.uniques[encoded.value_counts > 0]
+        self.distinct_hashes.add(hash_values(present_uniques))
+
+        if pair is not None:
+            self._update_pairs(encoded, pair, row_offset)
+
+    def update_timeliness(self, timeliness: QualityReport.Timeliness):
+        if self.timeliness is None:
+            self.timeliness = timeliness
+        else:
+            self.timeliness = merge_timeliness([self.timeliness, timeliness])
+
+    def merge(self, other: "ColumnState"):
+        self.total_count += other.total_count
+        self.null_count += other.null_count
+        self.valid_count += other.valid_count
+        self.distinct_hashes.merge(other.distinct_hashes)
+
+        if other.pairs is not None:
+            self._merge_pairs(other.pairs)
+
+        if other.timeliness is not None:
+            self.update_timeliness(other.timeliness)
+
+    def _update_pairs(self, encoded: EncodedColumn, pair: EncodedColumn, row_offset):
+        present = encoded.codes >= 0
+        chunk_pairs = pd.DataFrame(
+            {
+                "key": hash_rows(encoded)[present],
+                "pair": hash_rows(pair)[present],
+                "count": 1,
+                "first_position": np.flatnonzero(present) + row_offset,
+            }
+        )
+        self._merge_pairs(chunk_pairs)
+
+    def _merge_pairs(self, pairs: pd.DataFrame):
+        # a first seen map of the pairs, the earliest paired value of every
+        # value is the consistent one regardless of the order of the merges
+        if self.pairs is not None:
+            pairs = pd.concat([self.pairs, pairs], ignore_index=True)
+
+        self.pairs = pairs.groupby(["key", "pair"], as_index=False, sort=False).agg(
+            count=("count", "sum"), first_position=("first_position", "min")
+        )
+
+    def get_profile(self) -> ColumnProfile:
+        value_count = self.total_count - self.null_count
+        distinct_count = min(self.distinct_hashes.count(), value_count)
+        distinct_count += 1 if self.null_count else 0
+
+        consistent_count = value_count
+        if self.pairs is not None and len(self.pairs):
+            first_pairs = self.pairs.loc[
+                self.pairs.groupby("key")["first_position"].idxmin()
+            ]
+            consistent_count = int(first_pairs["count"].sum())
+
+        profile = ColumnProfile()
+
+        profile.completeness.total_count = self.total_count
+        profile.completeness.null_count = self.null_count
+        profile.completeness.value_count = value_count
+        profile.completeness.score = get_score(value_count, self.total_count)
+
+        profile.uniqueness.total_count = self.total_count
+        profile.uniqueness.unique_count = distinct_count
+        profile.uniqueness.duplicate_count = self.total_count - distinct_count
+        profile.uniqueness.score = get_score(distinct_count, self.total_count)
+        profile.uniqueness.is_estimate = self.is_distinct_estimate
+
+        profile.validity.total_count = self.total_count
+        profile.validity.valid_count = self.valid_count
+        profile.validity.invalid_count = self.total_count - self.valid_count
+        profile.validity.score = get_score(self.valid_count, self.total_count)
+
+        profile.consistency.total_count = value_count
+        profile.consistency.consistent_count = consistent_count
+        profile.consistency.inconsistent_count = value_count - consistent_count
+        profile.consistency.score = get_score(consistent_count, value_count)
+
+        return profile
+
+    def close(self):
+        self.distinct_hashes.close()
+
+
+class ChunkedQualityReportGenerator:
+    """
+    builds the quality report from row chunks, holding only one chunk and the
+    mergeable partial state of each column at a time.
+    """
+
+    report_name: str
+
+    _validation_map: dict[str, any]
+    _column_pairing_map: dict[str, str]
+    _column_states: dict[str, ColumnState]
+    _row_count: int
+    _max_memory_hash_count: int
+    _spill_directory: str | None
+    _uniqueness_error: float | None
+    _date_columns: list
+    _start_date: pd.Timestamp
+    _end_date: pd.Timestamp
+    _reference_time: pd.Timestamp
+
+    def __init__(
+        self,
+        max_memory_hash_count: int = 1_000_000,
+        spill_directory: str = None,
+        uniqueness_error: float = None,
+    ):
+        self.report_name = ""
+        self._validation_map = dict()
+        self._column_pairing_map = dict()
+        self._column_states = dict()
+        self._row_count = 0
+        self._max_memory_hash_count = max_memory_hash_count
+        self._spill_directory = spill_directory
+        self._uniqueness_error = uniqueness_error
+        self._date_columns = list()
+        self._start_date = pd.Timestamp(start_date)
+        self._end_date = pd.Timestamp(end_date)
+
+        # fixed for all the chunks, so the partial freshness can be merged
+        self._reference_time = pd.Timestamp.now(tz="UTC").tz_localize(None)
+
+    def set_report_name(self, name: str):
+        self.report_name = name
+
+    def set_validation_map(self, map: dict[str, any]):
+        self._validation_map = map
+
+    def get_validation_map(self):
+        return self._validation_map
+
+    def set_column_pairing_map(self, map: dict[str, str]):
+        self._column_pairing_map = map
+
+    def get_column_pairing_map(self):
+        return self._column_pairing_map
+
+    def set_date_columns(self, columns: list):
+        self._date_columns = columns
+
+    def get_date_columns(self) -> list:
+        return self._date_columns
+
+    def set_timeframe(self, start_date: str, end_date: str):
+        self._start_date = pd.Timestamp(start_date)
+        self._end_date = pd.Timestamp(end_date)
+
+    def set_reference_time(self, reference_time: str):
+        self._reference_time = pd.Timestamp(reference_time)
+
+    def _create_column_state(self) -> ColumnState:
+        return ColumnState(
+            max_memory_count=self._max_memory_hash_count,
+            spill_directory=self._spill_directory,
+            uniqueness_error=self._uniqueness_error,
+        )
+
+    def set_row_offset(self, row_offset: int):
+        # position of the first row of the next chunk in the whole dataset,
+        # for partial generators whose chunks are not read from the start
+        self._row_count = row_offset
+
+    def add_chunk(self, df: pd.DataFrame):
+        column_pairing_map = self._column_pairing_map
+
+        paired_names = set(column_pairing_map.values())
+        encoded_pairs = {
+            column_name: encode_column(df[column_name])
+            for column_name in paired_names
+            if column_name in df
+        }
+
+        for column_name in df:
+            encoded = encoded_pairs.get(column_name)
+            if encoded is None:
+                encoded = encode_column(df[column_name])
+
+            pair_name = column_pairing_map.get(column_name)
+            pair = encoded_pairs.get(pair_name)
+
+            column_state = self._column_states.get(column_name)
+            if column_state is None:
+                column_state = self._create_column_state()
+                self._column_states[column_name] = column_state
+
+            column_state.update(
+                encoded=encoded,
+                validator=self._validation_map.get(column_name),
+                pair=pair,
+                row_offset=self._row_count,
+            )
+
+            if column_name in self._date_columns:
+                column_state.update_timeliness(
+                    get_timeliness(
+                        dates=parse_dates(df[column_name]),
+                        value_count=encoded.value_count,
+                        start_date=self._start_date,
+                        end_date=self._end_date,
+                        reference_time=self._reference_time,
+                    )
+                )
+
+        self._row_count += len(df.index)
+
+    def add_chunks(self, chunks):
+        for chunk in chunks:
+            self.add_chunk(chunk)
+
+    def merge(self, other: "ChunkedQualityReportGenerator"):
+        for column_name, other_state in other._column_states.items():
+            column_state = self._column_states.get(column_name)
+            if column_state is None:
+                column_state = self._create_column_state()
+                self._column_states[column_name] = column_state
+
+            column_state.merge(other_state)
+
+        self._row_count = max(self._row_count, other._row_count)
+
+    def generate_report(self) -> QualityReport:
+        profiles = {
+            column_name: column_state.get_profile()
+            for column_name, column_state in self._column_states.items()
+        }
+
+        report = QualityReport()
+        report.name = self.report_name
+        report.completeness_columns = {
+            column_name: profile.completeness
+            for column_name, profile in profiles.items()
+        }
+        report.uniqueness_columns = {
+            column_name: profile.uniqueness for column_name, profile in profiles.items()
+        }
+        report.validity_columns = {
+            column_name: profile.validity for column_name, profile in profiles.items()
+        }
+        report.consistency_columns = {
+            column_name: profile.consistency
+            for column_name, profile in profiles.items()
+        }
+        report.completeness = consolidate_metrics(
+            QualityReport.Completeness, report.completeness_columns
+        )
+        report.uniqueness = consolidate_metrics(
+            QualityReport.Uniqueness, report.uniqueness_columns
+        )
+        report.uniqueness.is_estimate = self._uniqueness_error is not None
+        report.validity = consolidate_metrics(
+            QualityReport.Validity, report.validity_columns
+        )
+        report.consistency = consolidate_metrics(
+            QualityReport.Consistency, report.consistency_columns
+        )
+        report.timeliness_columns = {
+            column_name: column_state.timeliness
+            for column_name, column_state in self._column_states.items()
+            if column_state.timeliness is not None
+        }
+        report.timeliness = consolidate_timeliness(report.timeliness_columns)
+
+        return report
+
+    def close(self):
+        for column_state in self._column_states.values():
+            column_state.close()
+
+
+def read_csv_chunks(filepath: str, chunk_size: int, **kwargs):
+    """
+    reads the chunks of a csv file with every column as text, the dtypes
+    inferred for each chunk on its own can differ between the chunks, which
+    would hash the same value differently, e.g. 1 and "1".
+    """
+    return pd.read_csv(filepath, chunksize=chunk_size, dtype=str, **kwargs)
+
+
+def generate_report_from_chunks(
+    name: str,
+    chunks,
+    validation_map: dict[str, any],
+    column_pairing_map: dict[str, str],
+    max_memory_hash_count: int = 1_000_000,
+    spill_directory: str = None,
+    uniqueness_error: float = None,
+    date_columns: list = None,
+) -> QualityReport:
+    report_generator = ChunkedQualityReportGenerator(
+        max_memory_hash_count=max_memory_hash_count,
+        spill_directory=spill_directory,
+        uniqueness_error=uniqueness_error,
+    )
+    report_generator.set_report_name(name)
+    report_generator.set_validation_map(validation_map)
+    report_generator.set_column_pairing_map(column_pairing_map)
+    report_generator.set_date_columns(date_columns or [])
+
+    try:
+        report_generator.add_chunks(chunks)
+        return report_generator.generate_report()
+    finally:
+        report_generator.close()
@@ -0,0 +1,229 @@
+import os
+import json
+import numpy as np
+import pandas as pd
+from report import QualityReport
+from report_instrumentation import TimingRecord
+
+# families of metrics with a dataset level metric and one metric per column
+_families = {
+    "completeness": QualityReport.Completeness,
+    "uniqueness": QualityReport.Uniqueness,
+    "validity": QualityReport.Validity,
+    "consistency": QualityReport.Consistency,
+    "timeliness": QualityReport.Timeliness,
+}
+
+# the other fields are counts
+_field_kinds = {
+    "score": "number",
+    "score_interval": "interval",
+    "is_estimate": "bool",
+    "latest": "text",
+    "freshness_days": "number",
+    "key_columns": "json",
+    "top_duplicates": "json",
+    "check": "text",
+    "column": "text",
+    "wall_time": "number",
+    "cpu_time": "number",
+    "peak_memory": "number",
+    "baseline_null_ratio": "number",
+    "null_ratio": "number",
+    "top_distance": "number",
+    "quantile_shift": "number",
+    "new_values": "json",
+    "is_drifted": "bool",
+    "reasons": "json",
+}
+
+_timing_fields = (
+    "check",
+    "column",
+    "wall_time",
+    "cpu_time",
+    "peak_memory",
+    "validator_call_count",
+)
+
+
+def _encode_field(arrays: dict, prefix: str, field: str, values: list):
+    kind = _field_kinds.get(field, "count")
+    key = f"{prefix}.{field}"
+
+    if kind == "count":
+        arrays[key] = np.array(values, dtype=np.int64)
+    elif kind == "bool":
+        arrays[key] = np.array(values, dtype=bool)
+    elif kind == "number":
+        arrays[key] = np.array(
+            [np.nan if value is None else value for value in values], dtype=np.float64
+        )
+    elif kind == "interval":
+        arrays[key] = np.array(
+            [[np.nan, np.nan] if value is None else value for value in values],
+            dtype=np.float64,
+        ).reshape(len(values), 2)
+    elif kind == "text":
+        arrays[key] = np.array(
+            ["" if value is None else value for value in values], dtype=str
+        )
+        arrays[f"{key}.is_null"] = np.array([value is None for value in values])
+    else:
+        arrays[key] = np.array(
+            [json.dumps(value, default=str) for value in values], dtype=str
+        )
+
+
+def _decode_field(arrays: dict, prefix: str, field: str) -> list:
+    kind = _field_kinds.get(field, "count")
+    key = f"{prefix}.{field}"
+    values = arrays[key]
+
+    if kind == "count":
+        return [int(value) for value in values]
+    if kind == "bool":
+        return [bool(value) for value in values]
+    if kind == "number":
+        return [None if np.isnan(value) else float(value) for value in values]
+    if kind == "interval":
+        return [
+            None if np.isnan(value[0]) else [float(value[0]), float(value[1])]
+            for value in values
+        ]
+    if kind == "text":
+        is_null = arrays[f"{key}.is_null"]
+        return [None if null else str(value) for value, null in zip(values, is_null)]
+    return [json.loads(value) for value in values]
+
+
+def _encode_objects(arrays: dict, prefix: str, objects: list, fields):
+    for field in fields:
+        _encode_field(
+            arrays, prefix, field, [getattr(metric, field) for metric in objects]
+        )
+
+
+def _decode_objects(arrays: dict, prefix: str, object_type: type, fields) -> list:
+    columns = {field: _decode_field(arrays, prefix, field) for field in fields}
+    count = len(next(iter(columns.values()))) if columns else 0
+
+    objects = list()
+    for index in range(count):
+        obj = object_type()
+        for field, values in columns.items():
+            setattr(obj, field, values[index])
+        objects.append(obj)
+    return objects
+
+
+def to_arrays(report: QualityReport) -> dict[str, np.ndarray]:
+    """
+    columnar form of the report, one array per field of every metric family,
+    where the first row is the dataset level metric and the next rows follow
+    the column names of the family.
+    """
+    arrays = {"name": np.array(report.name, dtype=str)}
+
+    for family, metric_type in _families.items():
+        column_metrics = getattr(report, f"{family}_columns")
+        arrays[f"{family}.column_name"] = np.array(list(column_metrics), dtype=str)
+        _encode_objects(
+            arrays,
+            family,
+            [getattr(report, family), *column_metrics.values()],
+            metric_type.__slots__,
+        )
+
+    arrays["key_uniqueness.key_name"] = np.array(list(report.key_uniqueness), dtype=str)
+    _encode_objects(
+        arrays,
+        "key_uniqueness",
+        list(report.key_uniqueness.values()),
+        QualityReport.KeyUniqueness.__slots__,
+    )
+
+    _encode_objects(arrays, "timings", report.timings, _timing_fields)
+
+    arrays["drift.column_name"] = np.array(list(report.drift), dtype=str)
+    _encode_objects(
+        arrays, "drift", list(report.drift.values()), QualityReport.Drift.__slots__
+    )
+
+    return arrays
+
+
+def from_arrays(arrays) -> QualityReport:
+    report = QualityReport()
+    report.name = str(arrays["name"])
+
+    for family, metric_type in _families.items():
+        metrics = _decode_objects(arrays, family, metric_type, metric_type.__slots__)
+        column_names = [str(name) for name in arrays[f"{family}.column_name"]]
+
+        setattr(report, family, metrics[0])
+        setattr(report, f"{family}_columns", dict(zip(column_names, metrics[1:])))
+
+    report.key_uniqueness = dict(
+        zip(
+            [str(name) for name in arrays["key_uniqueness.key_name"]],
+            _decode_objects(
+                arrays,
+                "key_uniqueness",
+                QualityReport.KeyUniqueness,
+                QualityReport.KeyUniqueness.__slots__,
+            ),
+        )
+    )
+
+    report.timings = _decode_objects(arrays, "timings", TimingRecord, _timing_fields)
+
+    # reports saved before the drift check have no drift arrays
+    if "drift.column_name" in arrays:
+        report.drift = dict(
+            zip(
+                [str(name) for name in arrays["drift.column_name"]],
+                _decode_objects(
+                    arrays, "drift", QualityReport.Drift, QualityReport.Drift.__slots__
+                ),
+            )
+        )
+
+    return report
+
+
+def to_frames(report: QualityReport) -> dict[str, pd.DataFrame]:
+    """
+    one table per metric family with a row per column, the dataset level
+    metric is the row with an empty column name.
+    """
+    frames = dict[str, pd.DataFrame]()
+    for family, metric_type in _families.items():
+        column_metrics = getattr(report, f"{family}_columns")
+        metrics = [getattr(report, family), *column_metrics.values()]
+
+        frame = pd.DataFrame(
+            {
+                field: [getattr(metric, field) for metric in metrics]
+                for field in metric_type.__slots__
+            }
+        )
+        frame.insert(0, "column_name", ["", *column_metrics])
+        frames[family] = frame
+
+    return frames
+
+
+def save_report(report: QualityReport, filepath: str):
+    dirname = os.path.dirname(filepath)
+    if dirname:
+        os.makedirs(dirname, exist_ok=True)
+
+    # np.savez appends the extension to other file names
+    with open(filepath, mode="wb") as file:
+        np.savez(file, **to_arrays(report))
+
+
+def load_report(filepath: str) -> QualityReport:
+    with np.load(filepath, allow_pickle=False) as arrays:
+        return from_arrays(arrays)
@@ -0,0 +1,344 @@
+import sys
+import itertools
+import numpy as np
+import pandas as pd
+from multiprocessing import shared_memory
+from concurrent.futures import ProcessPoolExecutor
+from report_parallel import to_shared_memory
+from report_profiler import EncodedColumn, combine_codes, encode_column
+
+# max size of the lhs by rhs count matrix before the counts are sorted instead
+_max_dense_size = 4_000_000
+
+
+class FunctionalDependency:
+    """
+    approximate functional dependency lhs -> rhs, the violations are the min
+    count of rows to remove for the dependency to hold exactly (g3 error).
+    """
+
+    lhs: list[str]
+    rhs: str
+    row_count: int
+    violation_count: int
+    violation_ratio: float
+
+    def __init__(self, lhs: list[str], rhs: str, violation_count: int, row_count: int):
+        self.lhs = list(lhs)
+        self.rhs = rhs
+        self.row_count = row_count
+        self.violation_count = violation_count
+        self.violation_ratio = round(violation_count / row_count, 6) if row_count else 0
+
+
+class ColumnCodes:
+    """
+    codes of a column with the statistics used to prune the candidates, the
+    codes stay in the parent process or in shared memory.
+    """
+
+    name: str
+    distinct_count: int
+    value_count: int
+    max_value_count: int
+    uniques_count: int
+    codes: np.ndarray | None
+    memory_name: str
+    dtype: str
+    length: int
+
+    def __init__(self, name: str, encoded: EncodedColumn):
+        self.name = name
+        self.distinct_count = int(np.count_nonzero(encoded.value_counts))
+        self.value_count = encoded.value_count
+        self.max_value_count = max(
+            int(encoded.value_counts.max(initial=0)), encoded.null_count
+        )
+        self.uniques_count = len(encoded.uniques)
+        self.codes = encoded.codes
+        self.memory_name = ""
+        self.dtype = encoded.codes.dtype.str
+        self.length = encoded.total_count
+
+
+def count_violations(
+    lhs_codes: np.ndarray, lhs_count: int, rhs_codes: np.ndarray, rhs_count: int
+) -> tuple[int, int]:
+    """
+    returns the g3 violations of lhs -> rhs and the count of rows with a lhs,
+    the rows with a null lhs are consistent like in get_inconsistent_mask and
+    the nulls of the rhs are one more value.
+    """
+    present = lhs_codes >= 0
+    if not present.all():
+        lhs_codes = lhs_codes[present]
+        rhs_codes = rhs_codes[present]
+
+    row_count = len(lhs_codes)
+    if not row_count:
+        return 0, 0
+
+    width = rhs_count + 1
+    keys = lhs_codes.astype(np.int64) * width + (rhs_codes + 1)
+
+    # the kept rows are the most frequent rhs value of every lhs group
+    if lhs_count * width <= _max_dense_size:
+        counts = np.bincount(keys, minlength=lhs_count * width)
+        kept_count = int(counts.reshape(lhs_count, width).max(axis=1).sum())
+    else:
+        keys = np.sort(keys)
+        starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+        key_counts = np.diff(np.r_[starts, row_count])
+        key_lhs = keys[starts] // width
+        group_starts = np.flatnonzero(np.r_[True, key_lhs[1:] != key_lhs[:-1]])
+        kept_count = int(np.maximum.reduceat(key_counts, group_starts).sum())
+
+    return row_count - kept_count, row_count
+
+
+def _can_hold(lhs: ColumnCodes, rhs: ColumnCodes, max_error: float) -> bool:
+    """
+    upper bound of the rows kept from the statistics only, every lhs value
+    keeps at most the count of the most frequent rhs value.
+    """
+    if not lhs.value_count:
+        return False
+    max_kept_count = min(lhs.distinct_count * rhs.max_value_count, lhs.value_count)
+    return 1 - max_kept_count / lhs.value_count <= max_error
+
+
+def _is_candidate_lhs(column: ColumnCodes, key_ratio: float) -> bool:
+    # constant and near key columns determine everything or nothing
+    return (
+        column.distinct_count > 1
+        and column.distinct_count < key_ratio * column.value_count
+    )
+
+
+def _find_rhs_dependencies(
+    columns: list[ColumnCodes],
+    rhs_index: int,
+    max_error: float,
+    max_lhs_size: int,
+    key_ratio: float,
+) -> list[FunctionalDependency]:
+    rhs = columns[rhs_index]
+    rhs_count = rhs.uniques_count
+
+    # constant columns are determined by any column
+    if rhs.distinct_count < 2 and rhs.value_count in (0, rhs.length):
+        return list()
+
+    lhs_columns = [
+        column
+        for index, column in enumerate(columns)
+        if index != rhs_index and _is_candidate_lhs(column, key_ratio)
+    ]
+
+    dependencies = list[FunctionalDependency]()
+    determining_names = set[str]()
+    for lhs in lhs_columns:
+        if not _can_hold(lhs, rhs, max_error):
+            continue
+
+        violation_count, row_count = count_violations(
+            lhs.codes, lhs.uniques_count, rhs.codes, rhs_count
+        )
+        if row_count and violation_count / row_count <= max_error:
+            dependencies.append(
+                FunctionalDependency([lhs.name], rhs.name, violation_count, row_count)
+            )
+            determining_names.add(lhs.name)
+
+    # the lhs sets are minimal, none of their columns determines the rhs alone
+    free_columns = [
+        column for column in lhs_columns if column.name not in determining_names
+    ]
+    for lhs_size in range(2, max_lhs_size + 1):
+        for lhs_set in itertools.combinations(free_columns, lhs_size):
+            # the partition of the set refines the partitions of its columns
+            lhs_codes, lhs_count = combine_codes(
+                [column.codes for column in lhs_set],
+                [column.uniques_count for column in lhs_set],
+            )
+            if lhs_count >= key_ratio * len(lhs_codes):
+                continue
+
+            # rows with a null in the lhs are consistent, like for one column
+            null_mask = np.logical_or.reduce([column.codes < 0 for column in lhs_set])
+            lhs_codes = np.where(null_mask, -1, lhs_codes)
+
+            violation_count, row_count = count_violations(
+                lhs_codes, lhs_count, rhs.codes, rhs_count
+            )
+            if row_count and violation_count / row_count <= max_error:
+                dependencies.append(
+                    FunctionalDependency(
+                        [column.name for column in lhs_set],
+                        rhs.name,
+                        violation_count,
+                        row_count,
+                    )
+                )
+
+    return dependencies
+
+
+def _find_shared_rhs_dependencies(
+    columns: list[ColumnCodes],
+    rhs_index: int,
+    max_error: float,
+    max_lhs_size: int,
+    key_ratio: float,
+) -> list[FunctionalDependency]:
+    memories = list[shared_memory.SharedMemory]()
+    try:
+        for column in columns:
+            memory = shared_memory.SharedMemory(name=column.memory_name)
+            memories.append(memory)
+            column.codes = np.ndarray(
+                (column.length,), dtype=column.dtype, buffer=memory.buf
+            )
+
+        return _find_rhs_dependencies(
+            columns, rhs_index, max_error, max_lhs_size, key_ratio
+        )
+
+    finally:
+        # the views on the buffers must be released before closing them
+        for column in columns:
+            column.codes = None
+        for memory in memories:
+            memory.close()
+
+
+def rank_dependencies(
+    dependencies: list[FunctionalDependency],
+) -> list[FunctionalDependency]:
+    return sorted(
+        dependencies,
+        key=lambda dependency: (
+            dependency.violation_ratio,
+            len(dependency.lhs),
+            -dependency.row_count,
+            dependency.lhs,
+            dependency.rhs,
+        ),
+    )
+
+
+def find_dependencies(
+    df: pd.DataFrame,
+    max_error: float = 0.01,
+    max_lhs_size: int = 1,
+    key_ratio: float = 0.9,
+    max_process_count: int = None,
+    column_names: list[str] = None,
+) -> list[FunctionalDependency]:
+    """
+    finds the approximate functional dependencies between the columns with at
+    most max_error violations, ranked from the most exact, lhs with up to
+    max_lhs_size columns are tried, near keys with more distinct values than
+    key_ratio of their rows are skipped since they determine every column.
+    """
+    if column_names is None:
+        column_names = list(df.columns)
+
+    columns = [
+        ColumnCodes(column_name, encode_column(df[column_name]))
+        for column_name in column_names
+    ]
+
+    if max_process_count == 1:
+        dependencies = list[FunctionalDependency]()
+        for rhs_index in range(len(columns)):
+            dependencies.extend(
+                _find_rhs_dependencies(
+                    columns, rhs_index, max_error, max_lhs_size, key_ratio
+                )
+            )
+        return rank_dependencies(dependencies)
+
+    memories = list[shared_memory.SharedMemory]()
+    try:
+        for column in columns:
+            memory = to_shared_memory(column.codes)
+            memories.append(memory)
+            column.memory_name = memory.name
+
+        # the codes are attached from shared memory instead of being pickled
+        for column in columns:
+            column.codes = None
+
+        with ProcessPoolExecutor(max_workers=max_process_count) as executor:
+            tasks = [
+                executor.submit(
+                    _find_shared_rhs_dependencies,
+                    columns,
+                    rhs_index,
+                    max_error,
+                    max_lhs_size,
+                    key_ratio,
+                )
+                for rhs_index in range(len(columns))
+            ]
+
+            dependencies = list[FunctionalDependency]()
+            for task in tasks:
+                dependencies.extend(task.result())
+
+        return rank_dependencies(dependencies)
+
+    finally:
+        for memory in memories:
+            memory.close()
+            memory.unlink()
+
+
+def to_pairing_map(
+    dependencies: list[FunctionalDependency], max_violation_ratio: float = None
+) -> dict[str, str]:
+    """
+    column pairing map of the single column dependencies, a column is paired
+    with the best ranked column it determines.
+    """
+    pairing_map = dict[str, str]()
+    for dependency in rank_dependencies(dependencies):
+        if len(dependency.lhs) != 1:
+            continue
+        if (
+            max_violation_ratio is not None
+            and dependency.violation_ratio > max_violation_ratio
+        ):
+            continue
+
+        pairing_map.setdefault(dependency.lhs[0], dependency.rhs)
+
+    return pairing_map
+
+
+def to_dataframe(dependencies: list[FunctionalDependency]) -> pd.DataFrame:
+    return pd.DataFrame(
+        [
+            {
+                "lhs": "+".join(dependency.lhs),
+                "rhs": dependency.rhs,
+                "row_count": dependency.row_count,
+                "violation_count": dependency.violation_count,
+                "violation_ratio": dependency.violation_ratio,
+            }
+            for dependency in dependencies
+        ],
+        columns=["lhs", "rhs", "row_count", "violation_count", "violation_ratio"],
+    )
+
+
+if __name__ == "__main__":
+    dataset_path = sys.argv[1]
+    output_path = sys.argv[2]
+
+    df = pd.read_csv(dataset_path)
+    dependencies = find_dependencies(df)
+    to_dataframe(dependencies).to_csv(output_path, index=False)
+
+    print(f"info: found {len(dependencies)} dependencies, saved to {output_path}")
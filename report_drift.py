@@ -0,0 +1,278 @@
+import os
+import json
+import threading
+import numpy as np
+import pandas as pd
+from report import QualityReport
+from report_sketches import QuantileSketch, TopKSketch
+
+# quantiles compared between the numeric profiles
+drift_quantiles = (0.05, 0.25, 0.5, 0.75, 0.95)
+
+# a column drifts when any of these is exceeded
+max_null_ratio_change = 0.05
+max_top_distance = 0.1
+max_quantile_shift = 0.25
+
+# frequent values missing from the baseline are reported from this share
+min_new_value_share = 0.01
+
+
+class ColumnDriftProfile:
+    """
+    compact mergeable profile of a column, its null ratio, its most frequent
+    values and the quantiles of its numbers.
+    """
+
+    total_count: int
+    null_count: int
+    top_values: TopKSketch
+    quantiles: QuantileSketch | None
+    _relative_accuracy: float
+
+    def __init__(self, top_count: int = 100, relative_accuracy: float = 0.01):
+        self.total_count = 0
+        self.null_count = 0
+        self.top_values = TopKSketch(capacity=top_count)
+        self.quantiles = None
+        self._relative_accuracy = relative_accuracy
+
+    @property
+    def null_ratio(self) -> float | None:
+        if not self.total_count:
+            return None
+        return self.null_count / self.total_count
+
+    def add(self, column_df: pd.Series):
+        self.total_count += len(column_df.index)
+        self.null_count += int(column_df.isna().sum())
+
+        # whole numbers read as floats because of the nulls of a run are
+        # summarized as the same values as when they are read as integers,
+        # when they all fit in 64 bits
+        values = column_df.dropna()
+        if (
+            values.dtype.kind == "f"
+            and (values % 1 == 0).all()
+            and (values.abs() < 2.0**63).all()
+        ):
+            values = values.astype(np.int64)
+        self.top_values.add(values)
+
+        if column_df.dtype.kind in "iuf":
+            if self.quantiles is None:
+                self.quantiles = QuantileSketch(self._relative_accuracy)
+            self.quantiles.add(values.to_numpy())
+
+    def merge(self, other: "ColumnDriftProfile"):
+        self.total_count += other.total_count
+        self.null_count += other.null_count
+        self.top_values.merge(other.top_values)
+
+        if other.quantiles is not None:
+            if self.quantiles is None:
+                self.quantiles = QuantileSketch(other.quantiles.relative_accuracy)
+            self.quantiles.merge(other.quantiles)
+
+    def to_dict(self) -> dict:
+        return {
+            "total_count": self.total_count,
+            "null_count": self.null_count,
+            "top_values": self.top_values.to_dict(),
+            "quantiles": (
+                self.quantiles.to_dict() if self.quantiles is not None else None
+            ),
+        }
+
+    @staticmethod
+    def from_dict(data: dict) -> "ColumnDriftProfile":
+        profile = ColumnDriftProfile()
+        profile.total_count = data["total_count"]
+        profile.null_count = data["null_count"]
+        profile.top_values = TopKSketch.from_dict(data["top_values"])
+        if data["quantiles"] is not None:
+            profile.quantiles = QuantileSketch.from_dict(data["quantiles"])
+        return profile
+
+
+class DatasetDriftProfile:
+    columns: dict[str, ColumnDriftProfile]
+    _top_count: int
+    _relative_accuracy: float
+
+    def __init__(self, top_count: int = 100, relative_accuracy: float = 0.01):
+        self.columns = dict()
+        self._top_count = top_count
+        self._relative_accuracy = relative_accuracy
+
+    def _get_column(self, column_name: str) -> ColumnDriftProfile:
+        profile = self.columns.get(column_name)
+        if profile is None:
+            profile = ColumnDriftProfile(self._top_count, self._relative_accuracy)
+            self.columns[column_name] = profile
+        return profile
+
+    def add(self, df: pd.DataFrame):
+        for column_name in df:
+            self._get_column(column_name).add(df[column_name])
+
+    def merge(self, other: "DatasetDriftProfile"):
+        for column_name, other_profile in other.columns.items():
+            self._get_column(column_name).merge(other_profile)
+
+    def to_dict(self) -> dict:
+        return {
+            column_name: profile.to_dict()
+            for column_name, profile in self.columns.items()
+        }
+
+    @staticmethod
+    def from_dict(data: dict) -> "DatasetDriftProfile":
+        profile = DatasetDriftProfile()
+        for column_name, column_data in data.items():
+            profile.columns[column_name] = ColumnDriftProfile.from_dict(column_data)
+        return profile
+
+
+class ProfileStore:
+    """
+    the latest profile of every dataset, one json file per dataset in a
+    directory.
+    """
+
+    _directory: str
+    _lock: threading.Lock
+
+    def __init__(self, directory: str):
+        self._directory = directory
+        self._lock = threading.Lock()
+
+        os.makedirs(directory, exist_ok=True)
+
+    def _get_filepath(self, dataset: str) -> str:
+        return os.path.join(self._directory, f"{dataset}.json")
+
+    def load(self, dataset: str) -> DatasetDriftProfile | None:
+        try:
+            with open(self._get_filepath(dataset), encoding="utf8") as file:
+                return DatasetDriftProfile.from_dict(json.load(file))
+        except OSError:
+            return None
+        except (ValueError, KeyError, TypeError) as error:
+            # a corrupt profile is no baseline, it is replaced by the next save
+            print(f"warning: unreadable profile of {dataset}, ignored: {error}")
+            return None
+
+    def save(self, dataset: str, profile: DatasetDriftProfile):
+        filepath = self._get_filepath(dataset)
+        temp_filepath = f"{filepath}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+        with self._lock:
+            with open(temp_filepath, mode="w", encoding="utf8") as file:
+                json.dump(profile.to_dict(), file)
+            os.replace(temp_filepath, filepath)
+
+
+def get_top_distance(baseline: TopKSketch, current: TopKSketch) -> float:
+    """
+    total variation distance between the shares of the frequent values, the
+    values outside of both summaries are compared as a single remainder.
+    """
+    baseline_shares = baseline.get_shares()
+    current_shares = current.get_shares()
+
+    distance = sum(
+        abs(current_shares.get(value, 0) - baseline_shares.get(value, 0))
+        for value in baseline_shares.keys() | current_shares.keys()
+    )
+    distance += abs(
+        (1 - sum(current_shares.values())) - (1 - sum(baseline_shares.values()))
+    )
+    return distance / 2
+
+
+def get_quantile_shift(baseline: QuantileSketch, current: QuantileSketch) -> float:
+    """
+    largest change of the compared quantiles, relative to the spread between
+    the outer quantiles of the baseline.
+    """
+    baseline_values = [baseline.get_quantile(q) for q in drift_quantiles]
+    current_values = [current.get_quantile(q) for q in drift_quantiles]
+    if None in baseline_values or None in current_values:
+        return 0.0
+
+    spread = baseline_values[-1] - baseline_values[0]
+    if spread <= 0:
+        spread = abs(baseline_values[len(baseline_values) // 2]) or 1.0
+
+    return max(
+        abs(current_value - baseline_value) / spread
+        for baseline_value, current_value in zip(baseline_values, current_values)
+    )
+
+
+def get_column_drift(
+    baseline: ColumnDriftProfile, current: ColumnDriftProfile
+) -> QualityReport.Drift:
+    drift = QualityReport.Drift()
+    if baseline.null_ratio is not None:
+        drift.baseline_null_ratio = round(baseline.null_ratio, 4)
+    if current.null_ratio is not None:
+        drift.null_ratio = round(current.null_ratio, 4)
+
+    if drift.baseline_null_ratio is not None and drift.null_ratio is not None:
+        null_ratio_change = abs(current.null_ratio - baseline.null_ratio)
+        if null_ratio_change > max_null_ratio_change:
+            drift.reasons.append(f"null ratio changed by {null_ratio_change:.3f}")
+
+    drift.top_distance = round(
+        get_top_distance(baseline.top_values, current.top_values), 4
+    )
+    if drift.top_distance > max_top_distance:
+        drift.reasons.append(f"frequent values moved by {drift.top_distance}")
+
+    drift.new_values = sorted(
+        value
+        for value, share in current.top_values.get_shares().items()
+        if share >= min_new_value_share and value not in baseline.top_values.counts
+    )
+    if drift.new_values:
+        drift.reasons.append(f"{len(drift.new_values)} new frequent values")
+
+    if baseline.quantiles is not None and current.quantiles is not None:
+        drift.quantile_shift = round(
+            get_quantile_shift(baseline.quantiles, current.quantiles), 4
+        )
+        if drift.quantile_shift > max_quantile_shift:
+            drift.reasons.append(f"quantiles shifted by {drift.quantile_shift}")
+
+    drift.is_drifted = len(drift.reasons) > 0
+    return drift
+
+
+def get_new_column_drift(current: ColumnDriftProfile) -> QualityReport.Drift:
+    # a column without a baseline has nothing to drift from
+    drift = QualityReport.Drift()
+    if current.null_ratio is not None:
+        drift.null_ratio = round(current.null_ratio, 4)
+    drift.reasons.append("no baseline")
+    return drift
+
+
+def get_drift(
+    baseline: DatasetDriftProfile | None, current: DatasetDriftProfile
+) -> dict[str, QualityReport.Drift]:
+    """
+    compares the profiles of the columns, in time of the size of the
+    profiles. every column of the current profile gets a drift, the columns
+    missing from the baseline, or all of them without one, are not drifted.
+    """
+    baseline_columns = baseline.columns if baseline is not None else dict()
+    return {
+        column_name: (
+            get_column_drift(baseline_columns[column_name], profile)
+            if column_name in baseline_columns
+            else get_new_column_drift(profile)
+        )
+        for column_name, profile in current.columns.items()
+    }
@@ -1,22 +1,68 @@
 from report import QualityReport
+from report_profiler import RowMasks
+from report_columnar import save_report
+import importlib.util
 import json
 import os
+import numpy as np
 import pandas as pd
 
 
+def to_dict(obj) -> dict:
+    """
+    fields of the metric objects, declared by __slots__ or held in __dict__.
+    """
+    slots = getattr(type(obj), "__slots__", None)
+    if slots is None:
+        return obj.__dict__
+    return {name: getattr(obj, name) for name in slots}
+
+
+def get_free_column_name(df: pd.DataFrame, name: str) -> str:
+    # the added columns never replace nor collide with a column of the dataset
+    free_name = name
+    index = 1
+    while free_name in df.columns:
+        free_name = f"{name}_{index}"
+        index += 1
+    return free_name
+
+
+def remove_partitions(directory: str):
+    # the partitions of a previous run would look like the current ones
+    for filename in os.listdir(directory):
+        if filename.startswith("part-") and filename.endswith((".csv", ".parquet")):
+            os.remove(os.path.join(directory, filename))
+
+
 class QualityReportExporter:
 
     def to_json(self, report: QualityReport) -> str:
-        return json.dumps(report, indent=2, default=lambda obj: obj.__dict__)
+        return json.dumps(report, indent=2, default=to_dict)
 
     def to_json_file(self, report: QualityReport, filepath: str):
         json_data = self.to_json(report)
         self._write_to_file(content=json_data, filepath=filepath)
 
+    def to_npz_file(self, report: QualityReport, filepath: str):
+        # columnar binary form, read back with report_columnar.load_report
+        save_report(report, filepath)
+
     def to_csv(self, report: QualityReport) -> str:
 
         records = []
 
+        # the time spent on each column over all the checks, when instrumented
+        column_timings = dict[str, tuple[float, int]]()
+        for timing in report.timings:
+            if timing.column is None:
+                continue
+            wall_time, validator_call_count = column_timings.get(timing.column, (0, 0))
+            column_timings[timing.column] = (
+                wall_time + timing.wall_time,
+                validator_call_count + timing.validator_call_count,
+            )
+
         column_names = report.completeness_columns.keys()
         for column_name in column_names:
             record = {
@@ -25,9 +71,39 @@ class QualityReportExporter:
                 "uniqueness": report.uniqueness_columns[column_name].score,
                 "validity": report.validity_columns[column_name].score,
                 "consistency": report.consistency_columns[column_name].score,
-                # "timeliness": report.timeliness_columns[column_name].score,
+                "timeliness": (
+                    report.timeliness_columns[column_name].score
+                    if column_name in report.timeliness_columns
+                    else None
+                ),
             }
 
+            if report.completeness.score_interval is not None:
+                for metric_name, column_metrics in (
+                    ("completeness", report.completeness_columns),
+                    ("validity", report.validity_columns),
+                    ("consistency", report.consistency_columns),
+                ):
+                    low, high = column_metrics[column_name].score_interval
+                    record[f"{metric_name}_ci_low"] = low
+                    record[f"{metric_name}_ci_high"] = high
+
+            if report.timings:
+                wall_time, validator_call_count = column_timings.get(
+                    column_name, (0, 0)
+                )
+                record["wall_time"] = round(wall_time, 6)
+                record["validator_call_count"] = validator_call_count
+
+            if report.drift:
+                drift = report.drift.get(column_name)
+                record["drifted"] = drift.is_drifted if drift is not None else None
+
+            if report.uniqueness.is_estimate:
+                record["uniqueness_estimated"] = report.uniqueness_columns[
+                    column_name
+                ].is_estimate
+
             records.append(record)
 
         df = pd.DataFrame(records)
@@ -39,6 +115,193 @@ class QualityReportExporter:
         csv_data = self.to_csv(report)
         self._write_to_file(content=csv_data, filepath=filepath)
 
+    def to_key_uniqueness_csv(self, report: QualityReport) -> str:
+        records = list()
+        for key_name, metric in report.key_uniqueness.items():
+            records.append(
+                {
+                    "key": key_name,
+                    "total_count": metric.total_count,
+                    "unique_count": metric.unique_count,
+                    "duplicate_count": metric.duplicate_count,
+                    "duplicate_key_count": metric.duplicate_key_count,
+                    "uniqueness": metric.score,
+                    "top_duplicates": json.dumps(metric.top_duplicates, default=str),
+                }
+            )
+
+        df = pd.DataFrame(
+            records,
+            columns=[
+                "key",
+                "total_count",
+                "unique_count",
+                "duplicate_count",
+                "duplicate_key_count",
+                "uniqueness",
+                "top_duplicates",
+            ],
+        )
+        csv_data = df.to_csv(index=False, lineterminator="\n")
+
+        return csv_data
+
+    def to_key_uniqueness_csv_file(self, report: QualityReport, filepath: str):
+        csv_data = self.to_key_uniqueness_csv(report)
+        self._write_to_file(content=csv_data, filepath=filepath)
+
+    def to_timing_csv(self, report: QualityReport) -> str:
+        records = [
+            {
+                "check": timing.check,
+                "column_name": timing.column,
+                "wall_time": timing.wall_time,
+                "cpu_time": timing.cpu_time,
+                "peak_memory": timing.peak_memory,
+                "validator_call_count": timing.validator_call_count,
+            }
+            for timing in report.timings
+        ]
+
+        df = pd.DataFrame(
+            records,
+            columns=[
+                "check",
+                "column_name",
+                "wall_time",
+                "cpu_time",
+                "peak_memory",
+                "validator_call_count",
+            ],
+        )
+        df = df.sort_values("wall_time", ascending=False)
+        csv_data = df.to_csv(index=False, lineterminator="\n")
+
+        return csv_data
+
+    def to_timing_csv_file(self, report: QualityReport, filepath: str):
+        csv_data = self.to_timing_csv(report)
+        self._write_to_file(content=csv_data, filepath=filepath)
+
+    def to_drift_csv(self, report: QualityReport) -> str:
+        records = [
+            {
+                "column_name": column_name,
+                "is_drifted": drift.is_drifted,
+                "baseline_null_ratio": drift.baseline_null_ratio,
+                "null_ratio": drift.null_ratio,
+                "top_distance": drift.top_distance,
+                "quantile_shift": drift.quantile_shift,
+                "new_values": " ".join(drift.new_values),
+                "reasons": "; ".join(drift.reasons),
+            }
+            for column_name, drift in report.drift.items()
+        ]
+
+        df = pd.DataFrame(
+            records,
+            columns=[
+                "column_name",
+                "is_drifted",
+                "baseline_null_ratio",
+                "null_ratio",
+                "top_distance",
+                "quantile_shift",
+                "new_values",
+                "reasons",
+            ],
+        )
+        csv_data = df.to_csv(index=False, lineterminator="\n")
+
+        return csv_data
+
+    def to_drift_csv_file(self, report: QualityReport, filepath: str):
+        csv_data = self.to_drift_csv(report)
+        self._write_to_file(content=csv_data, filepath=filepath)
+
+    def to_quarantine_files(
+        self,
+        df: pd.DataFrame,
+        row_masks: dict[str, RowMasks],
+        directory: str,
+        file_format: str = "csv",
+        mask_names: tuple = ("invalid", "inconsistent"),
+        partition_row_count: int = 1_000_000,
+    ) -> list[str]:
+        """
+        writes the rows failing any of the masks, with their row number and
+        the names of their failing columns per mask, to partition files of at
+        most partition_row_count rows, returns the paths of the partitions.
+        the partitions of a previous run in the directory are removed first.
+        """
+        if file_format == "parquet" and not (
+            importlib.util.find_spec("pyarrow")
+            or importlib.util.find_spec("fastparquet")
+        ):
+            raise ImportError("parquet quarantine files need pyarrow or fastparquet")
+
+        row_count = len(df.index)
+
+        # the packed bitmaps are combined without unpacking them
+        packed_masks = {
+            name: [
+                (column_name, getattr(masks, name))
+                for column_name, masks in row_masks.items()
+                if getattr(masks, name) is not None
+            ]
+            for name in mask_names
+        }
+        failing = np.zeros((row_count + 7) // 8, dtype=np.uint8)
+        for column_masks in packed_masks.values():
+            for _, packed in column_masks:
+                np.bitwise_or(failing, packed, out=failing)
+        positions = np.flatnonzero(np.unpackbits(failing, count=row_count))
+
+        # only the failing rows are copied
+        quarantine_df = df.take(positions)
+        quarantine_df.insert(
+            0, get_free_column_name(quarantine_df, "row_number"), positions
+        )
+
+        byte_positions = positions >> 3
+        bit_shifts = (7 - (positions & 7)).astype(np.uint8)
+        for name, column_masks in packed_masks.items():
+            column_names = [column_name for column_name, _ in column_masks]
+            bits = np.empty((len(positions), len(column_masks)), dtype=bool)
+            for index, (_, packed) in enumerate(column_masks):
+                bits[:, index] = (packed[byte_positions] >> bit_shifts) & 1
+
+            # a row of bits times the labels concatenates the failing names
+            labels = np.array(
+                [f"{column_name};" for column_name in column_names], dtype=object
+            )
+            quarantine_df[get_free_column_name(quarantine_df, f"{name}_columns")] = (
+                pd.Series(
+                    bits.dot(labels), index=quarantine_df.index, dtype=object
+                ).str.rstrip(";")
+                if column_names
+                else ""
+            )
+
+        os.makedirs(directory, exist_ok=True)
+        remove_partitions(directory)
+
+        filepaths = list[str]()
+        for index, start in enumerate(
+            range(0, len(quarantine_df.index), partition_row_count)
+        ):
+            partition_df = quarantine_df.iloc[start : start + partition_row_count]
+            filepath = os.path.join(directory, f"part-{index:05d}.{file_format}")
+
+            if file_format == "parquet":
+                partition_df.to_parquet(filepath, index=False)
+            else:
+                partition_df.to_csv(filepath, index=False, lineterminator="\n")
+
+            filepaths.append(filepath)
+
+        return filepaths
+
     def _write_to_file(self, content: str, filepath: str):
         dirname = os.path.dirname(filepath)
         os.makedirs(dirname, exist_ok=True)
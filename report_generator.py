@@ -1,40 +1,197 @@
+import numpy as np
 import pandas as pd
 from report import QualityReport
-from concurrent.futures import ThreadPoolExecutor
+from report_validations import apply_validator, parse_dates, start_date, end_date
+from report_cache import ColumnResultCache, get_cache_key, get_column_fingerprint
+from report_parallel import profile_columns_parallel
+from report_sampling import sample_dataframe, set_confidence_intervals
+from report_sketches import HyperLogLog, UniquenessSketches
+from report_profiler import (
+    ColumnProfile,
+    EncodedColumn,
+    RowMasks,
+    consolidate_metrics,
+    consolidate_timeliness,
+    encode_column,
+    get_consistency,
+    get_inconsistent_mask,
+    get_invalid_mask,
+    get_key_uniqueness,
+    get_score,
+    get_valid_mask,
+    get_validity,
+    get_timeliness,
+    profile_column,
+)
+from report_instrumentation import Instrumentation, TimingRecord
+from report_drift import DatasetDriftProfile, ProfileStore, get_drift
+from report_store import DatasetStore, get_completeness_columns, get_uniqueness_columns
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import nullcontext
+from functools import wraps
+
+
+def _instrumented(check: str):
+    def decorator(method):
+        @wraps(method)
+        def wrapper(self, *args, **kwargs):
+            instrumentation = self._instrumentation
+            if instrumentation is None:
+                return method(self, *args, **kwargs)
+
+            with instrumentation.profile(f"{self.report_name}_{check}"):
+                with instrumentation.measure(check):
+                    return method(self, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
 
 
 class QualityReportGenerator:
+    """
+    every instance holds its own state, the checks of one instance may run on
+    an executor shared with other instances, which is then left open.
+    """
 
     df: pd.DataFrame
-    report_name = ""
-    completeness_columns = dict[str, QualityReport.Completeness]()
-    uniqueness_columns = dict[str, QualityReport.Uniqueness]()
-    validity_columns = dict[str, QualityReport.Validity]()
-    consistency_columns = dict[str, QualityReport.Consistency]()
-    completeness = QualityReport.Completeness()
-    uniqueness = QualityReport.Uniqueness()
-    validity = QualityReport.Validity()
-    consistency = QualityReport.Consistency()
-    timeliness = QualityReport.Timeliness()
-
-    _validation_map = dict[str, any]()
-    _column_pairing_map = dict[str, str]()
-    _date_columns = list()
-    _completeness_task = None
-    _uniqueness_task = None
-    _validity_task = None
-    _consistency_task = None
-    _timeliness_task = None
-    _executor: ThreadPoolExecutor
-
-    def __init__(self, max_worker_count=None):
-        self._executor = ThreadPoolExecutor(max_workers=max_worker_count)
+    report_name: str
+    completeness_columns: dict[str, QualityReport.Completeness]
+    uniqueness_columns: dict[str, QualityReport.Uniqueness]
+    validity_columns: dict[str, QualityReport.Validity]
+    consistency_columns: dict[str, QualityReport.Consistency]
+    timeliness_columns: dict[str, QualityReport.Timeliness]
+    completeness: QualityReport.Completeness
+    uniqueness: QualityReport.Uniqueness
+    validity: QualityReport.Validity
+    consistency: QualityReport.Consistency
+    timeliness: QualityReport.Timeliness
+    key_uniqueness: dict[str, QualityReport.KeyUniqueness]
+    drift: dict[str, QualityReport.Drift]
+
+    _validation_map: dict[str, any]
+    _column_pairing_map: dict[str, str]
+    _date_columns: list
+    _unique_keys: list[list[str]]
+    _top_duplicate_count: int
+    _start_date: str
+    _end_date: str
+    _reference_time: str | None
+    _distinct_validation_threshold: float | None
+    _distinct_validation_sample_size: int
+    _uniqueness_error: float | None
+    uniqueness_sketches: UniquenessSketches | None
+    _population_count: int | None
+    _result_cache: ColumnResultCache | None
+    _instrumentation: Instrumentation | None
+    _keep_masks: bool
+    _store: DatasetStore | None
+    _store_table_name: str | None
+    _profile_store: ProfileStore | None
+    _update_baseline: bool
+    row_masks: dict[str, RowMasks]
+    _tasks: list[Future]
+    _executor: ThreadPoolExecutor | None
+    _max_worker_count: int | None
+    _owns_executor: bool
+
+    def __init__(
+        self, max_worker_count=None, executor: ThreadPoolExecutor | None = None
+    ):
+        self.df = None
+        self.report_name = ""
+        self.completeness_columns = dict[str, QualityReport.Completeness]()
+        self.uniqueness_columns = dict[str, QualityReport.Uniqueness]()
+        self.validity_columns = dict[str, QualityReport.Validity]()
+        self.consistency_columns = dict[str, QualityReport.Consistency]()
+        self.timeliness_columns = dict[str, QualityReport.Timeliness]()
+        self.completeness = QualityReport.Completeness()
+        self.uniqueness = QualityReport.Uniqueness()
+        self.validity = QualityReport.Validity()
+        self.consistency = QualityReport.Consistency()
+        self.timeliness = QualityReport.Timeliness()
+        self.key_uniqueness = dict[str, QualityReport.KeyUniqueness]()
+        self.drift = dict[str, QualityReport.Drift]()
+
+        self._validation_map = dict[str, any]()
+        self._column_pairing_map = dict[str, str]()
+        self._date_columns = list()
+        self._unique_keys = list()
+        self._top_duplicate_count = 10
+        self._start_date = start_date
+        self._end_date = end_date
+        self._reference_time = None
+        self._distinct_validation_threshold = 0.5
+        self._distinct_validation_sample_size = 10000
+        self._uniqueness_error = None
+        self.uniqueness_sketches = None
+        self._population_count = None
+        self._result_cache = None
+        self._instrumentation = None
+        self._keep_masks = False
+        self._store = None
+        self._store_table_name = None
+        self._profile_store = None
+        self._update_baseline = True
+        self.row_masks = dict[str, RowMasks]()
+        self._tasks = list()
+
+        # the executor is created on the first async check unless one is shared
+        self._executor = executor
+        self._max_worker_count = max_worker_count
+        self._owns_executor = executor is None
+
+    def close(self):
+        self.wait()
+        if self._owns_executor and self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def wait(self):
+        """
+        waits for the async checks, raises the first error of any of them.
+        """
+        tasks, self._tasks = self._tasks, list()
+        for task in tasks:
+            task.result()
+
+    def _submit(self, check, *args):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self._max_worker_count)
+        self._tasks.append(self._executor.submit(check, *args))
 
     def set_report_name(self, name: str):
         self.report_name = name
 
     def set_dataframe(self, df: pd.DataFrame):
         self.df = df
+        self._population_count = None
+        self.row_masks = dict[str, RowMasks]()
+
+    def sample_dataframe(
+        self,
+        fraction: float = None,
+        size: int = None,
+        stratify_column: str = None,
+        random_state: int = 0,
+    ):
+        population_count = len(self.df.index)
+        self.df = sample_dataframe(
+            self.df,
+            fraction=fraction,
+            size=size,
+            stratify_column=stratify_column,
+            random_state=random_state,
+        )
+        self._population_count = population_count
+
+    def set_population_count(self, count: int | None):
+        # row count of the dataset the dataframe was sampled from, the report
+        # gets confidence intervals when it is set
+        self._population_count = count
+
+    def get_population_count(self) -> int | None:
+        return self._population_count
 
     def set_validation_map(self, map: dict[str, any]):
         self._validation_map = map
@@ -54,8 +211,167 @@ class QualityReportGenerator:
     def get_date_columns(self) -> list:
         return self._date_columns
 
+    def set_unique_keys(self, keys: list[list[str]], top_duplicate_count: int = 10):
+        # composite keys whose combined values should identify a single row,
+        # the most duplicated top_duplicate_count keys are reported
+        self._unique_keys = keys
+        self._top_duplicate_count = top_duplicate_count
+
+    def get_unique_keys(self) -> list[list[str]]:
+        return self._unique_keys
+
+    def set_timeframe(self, start_date: str, end_date: str):
+        self._start_date = start_date
+        self._end_date = end_date
+
+    def get_timeframe(self) -> tuple[str, str]:
+        return self._start_date, self._end_date
+
+    def set_reference_time(self, reference_time: str | None):
+        # dates after the reference time are in the future, now when None
+        self._reference_time = reference_time
+
+    def get_reference_time(self) -> str | None:
+        return self._reference_time
+
+    def set_distinct_validation_threshold(self, threshold: float | None):
+        # max ratio of distinct values to rows for which the validators are run
+        # once per distinct value instead of once per row, None disables it
+        self._distinct_validation_threshold = threshold
+
+    def get_distinct_validation_threshold(self) -> float | None:
+        return self._distinct_validation_threshold
+
+    def set_uniqueness_error(self, error: float | None):
+        # relative error of the approximate uniqueness, estimated by the
+        # uniqueness and profile checks from cardinality sketches, which are
+        # kept in uniqueness_sketches, None keeps it exact
+        self._uniqueness_error = error
+
+    def get_uniqueness_error(self) -> float | None:
+        return self._uniqueness_error
+
+    def _get_uniqueness_precision(self) -> int | None:
+        if self._uniqueness_error is None:
+            return None
+        return HyperLogLog.get_precision(self._uniqueness_error)
+
+    def set_result_cache(self, cache: ColumnResultCache | None):
+        # profiles of the columns whose content did not change since a previous
+        # run are read from the cache instead of being computed again
+        self._result_cache = cache
+
+    def get_result_cache(self) -> ColumnResultCache | None:
+        return self._result_cache
+
+    def set_instrumentation(self, instrumentation: Instrumentation | None):
+        self._instrumentation = instrumentation
+
+    def get_instrumentation(self) -> Instrumentation | None:
+        return self._instrumentation
+
+    def set_keep_masks(self, keep_masks: bool):
+        # the completeness, validity, consistency and profile checks keep the
+        # bitmaps of their failing rows, for the quarantine export, the result
+        # cache is bypassed since the masks are not cached
+        self._keep_masks = keep_masks
+
+    def get_keep_masks(self) -> bool:
+        return self._keep_masks
+
+    def set_store(self, store: DatasetStore | None, table_name: str | None = None):
+        # table of the store holding the rows of the dataframe, the completeness
+        # and uniqueness checks count them with an aggregate query instead. the
+        # dataframe can then be left unset, the validity is checked on the
+        # distinct values counted by the store and the other checks read only
+        # the columns they need from it
+        self._store = store
+        self._store_table_name = table_name
+
+    def get_store(self) -> tuple[DatasetStore | None, str | None]:
+        return self._store, self._store_table_name
+
+    def set_profile_store(
+        self, profile_store: ProfileStore | None, update_baseline: bool = True
+    ):
+        # check_drift compares the columns with their profiles of the previous
+        # run stored under the report name, which are then replaced by the
+        # profiles of this run when update_baseline is set
+        self._profile_store = profile_store
+        self._update_baseline = update_baseline
+
+    def get_profile_store(self) -> ProfileStore | None:
+        return self._profile_store
+
+    def _get_store_counts(self, distinct: bool) -> pd.DataFrame | None:
+        """
+        counts of the columns of the dataframe, or of the table when no
+        dataframe is set, from the store, None when the store does not hold
+        the same rows, e.g. for a sampled dataframe.
+        """
+        if self._store is None or self._population_count is not None:
+            return None
+
+        column_names = self._get_column_names()
+        if self.df is not None and not set(column_names).issubset(
+            self._store.get_column_names(self._store_table_name)
+        ):
+            return None
+
+        # the total counts are the count(*) of the table
+        counts = self._store.get_column_counts(
+            self._store_table_name, column_names, distinct=distinct
+        )
+        if (
+            self.df is not None
+            and len(counts.index)
+            and counts["total_count"].iat[0] != len(self.df.index)
+        ):
+            return None
+        return counts
+
+    def _get_column_names(self) -> list[str]:
+        if self.df is None:
+            return self._store.get_column_names(self._store_table_name)
+        return list(self.df)
+
+    def _read_columns(self, column_names: list[str]) -> pd.DataFrame:
+        """
+        the dataframe, or the given columns of the table when no dataframe is
+        set, the columns missing from the table are left out.
+        """
+        if self.df is not None:
+            return self.df
+
+        table_column_names = self._get_column_names()
+        column_names = [name for name in column_names if name in table_column_names]
+        if not column_names:
+            return pd.DataFrame()
+        return self._store.read_table(self._store_table_name, column_names)
+
+    def get_row_masks(self) -> dict[str, RowMasks]:
+        return self.row_masks
+
+    def _get_masks(self, column_name: str) -> RowMasks:
+        return self.row_masks.setdefault(column_name, RowMasks(len(self.df.index)))
+
+    def _measure(self, check: str, column: str | None = None):
+        if self._instrumentation is None:
+            return nullcontext(TimingRecord())
+        return self._instrumentation.measure(check, column)
+
+    @_instrumented("completeness")
     def check_completeness(self):
         df = self.df
+
+        counts = None if self._keep_masks else self._get_store_counts(distinct=False)
+        if counts is not None:
+            column_metrics = get_completeness_columns(counts)
+            self.completeness = consolidate_metrics(
+                QualityReport.Completeness, column_metrics
+            )
+            self.completeness_columns = column_metrics
+            return
         total_count = len(df.index)
         null_counts = df.isnull().sum()
 
@@ -67,46 +383,51 @@ class QualityReportGenerator:
             consolidated_metrics.total_count = total_count
             consolidated_metrics.null_count = null_count
             consolidated_metrics.value_count = total_count - null_count
-
-            score = (
-                (consolidated_metrics.value_count / total_count) * 100
-                if total_count
-                else 100
+            consolidated_metrics.score = get_score(
+                consolidated_metrics.value_count, total_count
             )
-            consolidated_metrics.score = round(score, 2)
 
             column_metrics[column_name] = consolidated_metrics
 
-        # calculating consolidated metrics
-        column_metrics_values = column_metrics.values()
+            if self._keep_masks:
+                self._get_masks(column_name).set_mask(
+                    "null", df[column_name].isna().to_numpy()
+                )
 
-        consolidated_metrics = QualityReport.Completeness()
-        consolidated_metrics.total_count = sum(
-            [metrics.total_count for metrics in column_metrics_values]
-        )
-        consolidated_metrics.value_count = sum(
-            [metrics.value_count for metrics in column_metrics_values]
+        self.completeness = consolidate_metrics(
+            QualityReport.Completeness, column_metrics
         )
-        consolidated_metrics.null_count = sum(
-            [metrics.null_count for metrics in column_metrics_values]
-        )
-
-        consolidated_metrics.score = (
-            round(
-                sum([metrics.score for metrics in column_metrics_values])
-                / len(column_metrics_values),
-                2,
-            )
-            if len(column_metrics_values)
-            else 0
-        )
-
-        self.completeness = consolidated_metrics
         self.completeness_columns = column_metrics
 
+    @_instrumented("uniqueness")
     def check_uniqueness(self):
         df = self.df
 
+        # the sketches need the values, the store counts them exactly
+        if self._uniqueness_error is not None and df is not None:
+            sketches = UniquenessSketches(
+                precision=HyperLogLog.get_precision(self._uniqueness_error)
+            )
+            sketches.add(df)
+
+            column_metrics = sketches.get_uniqueness_columns()
+            self.uniqueness = consolidate_metrics(
+                QualityReport.Uniqueness, column_metrics
+            )
+            self.uniqueness.is_estimate = True
+            self.uniqueness_columns = column_metrics
+            self.uniqueness_sketches = sketches
+            return
+
+        counts = self._get_store_counts(distinct=True)
+        if counts is not None:
+            column_metrics = get_uniqueness_columns(counts)
+            self.uniqueness = consolidate_metrics(
+                QualityReport.Uniqueness, column_metrics
+            )
+            self.uniqueness_columns = column_metrics
+            return
+
         column_metrics = dict[str, QualityReport.Uniqueness]()
         for column_name in df:
             column_df = df[column_name]
@@ -118,45 +439,23 @@ class QualityReportGenerator:
             consolidated_metrics.total_count = total_count
             consolidated_metrics.unique_count = unique_count
             consolidated_metrics.duplicate_count = total_count - unique_count
-
-            score = (
-                (consolidated_metrics.unique_count / total_count) * 100
-                if total_count
-                else 100
-            )
-            consolidated_metrics.score = round(score, 2)
+            consolidated_metrics.score = get_score(unique_count, total_count)
 
             column_metrics[column_name] = consolidated_metrics
 
-        # calculating consolidated metrics
-        column_metrics_values = column_metrics.values()
-
-        consolidated_metrics = QualityReport.Uniqueness()
-        consolidated_metrics.total_count = sum(
-            [metrics.total_count for metrics in column_metrics_values]
-        )
-        consolidated_metrics.unique_count = sum(
-            [metrics.unique_count for metrics in column_metrics_values]
-        )
-        consolidated_metrics.duplicate_count = sum(
-            [metrics.duplicate_count for metrics in column_metrics_values]
-        )
-
-        consolidated_metrics.score = (
-            round(
-                sum([metrics.score for metrics in column_metrics_values])
-                / len(column_metrics_values),
-                2,
-            )
-            if len(column_metrics_values)
-            else 0
-        )
-
-        self.uniqueness = consolidated_metrics
+        self.uniqueness = consolidate_metrics(QualityReport.Uniqueness, column_metrics)
         self.uniqueness_columns = column_metrics
 
+    @_instrumented("validity")
     def check_validity(self):
         df = self.df
+        if df is None:
+            self._check_validity_from_store()
+            return
+
+        # the value counts of the completeness check are reused when it already
+        # ran, otherwise they are counted here, so the checks can run in any order
+        completeness_columns = self.completeness_columns
 
         column_metrics = dict[str, QualityReport.Validity]()
         for column_name in df:
@@ -165,151 +464,510 @@ class QualityReportGenerator:
 
             validator = self._validation_map.get(column_name)
             if validator is None:
-                metric = self.completeness_columns.get(column_name)
+                metric = completeness_columns.get(column_name)
                 if metric is None:
-                    valid_count = total_count
+                    valid_count = int(column_df.count())
                 else:
                     valid_count = metric.value_count
+            elif self._keep_masks:
+                with self._measure("validity", column_name) as record:
+                    encoded = encode_column(column_df)
+                    valid_mask = get_valid_mask(encoded, validator)
+                    valid_count = get_validity(
+                        encoded, validator, valid_mask
+                    ).valid_count
+                    record.validator_call_count = len(valid_mask)
+
+                self._get_masks(column_name).set_mask(
+                    "invalid", get_invalid_mask(encoded, valid_mask)
+                )
             else:
-                valid_count = int(column_df.apply(validator).count())
+                with self._measure("validity", column_name) as record:
+                    valid_count, record.validator_call_count = self._count_valid(
+                        column_df, validator
+                    )
 
             consolidated_metrics = QualityReport.Validity()
             consolidated_metrics.total_count = total_count
             consolidated_metrics.valid_count = valid_count
             consolidated_metrics.invalid_count = total_count - valid_count
+            consolidated_metrics.score = get_score(valid_count, total_count)
 
-            score = (
-                (consolidated_metrics.valid_count / total_count) * 100
-                if total_count
-                else 100
-            )
-            consolidated_metrics.score = round(score, 2)
+            column_metrics[column_name] = consolidated_metrics
+
+        self.validity = consolidate_metrics(QualityReport.Validity, column_metrics)
+        self.validity_columns = column_metrics
+
+    def _check_validity_from_store(self):
+        counts = self._get_store_counts(distinct=False)
+
+        column_metrics = dict[str, QualityReport.Validity]()
+        for column_name, row in counts.iterrows():
+            total_count = int(row["total_count"])
+
+            validator = self._validation_map.get(column_name)
+            if validator is None:
+                valid_count = total_count - int(row["null_count"])
+            else:
+                with self._measure("validity", column_name) as record:
+                    value_counts = self._store.get_value_counts(
+                        self._store_table_name, column_name
+                    )
+                    valid_mask = np.fromiter(
+                        (
+                            apply_validator(validator, value)
+                            for value in value_counts["value"]
+                        ),
+                        dtype=bool,
+                        count=len(value_counts.index),
+                    )
+                    valid_count = int(
+                        value_counts["count"].to_numpy()[valid_mask].sum()
+                    )
+                    record.validator_call_count = len(value_counts.index)
+
+            consolidated_metrics = QualityReport.Validity()
+            consolidated_metrics.total_count = total_count
+            consolidated_metrics.valid_count = valid_count
+            consolidated_metrics.invalid_count = total_count - valid_count
+            consolidated_metrics.score = get_score(valid_count, total_count)
 
             column_metrics[column_name] = consolidated_metrics
 
-        # calculating consolidated metrics
-        column_metrics_values = column_metrics.values()
+        self.validity = consolidate_metrics(QualityReport.Validity, column_metrics)
+        self.validity_columns = column_metrics
 
-        consolidated_metrics = QualityReport.Validity()
-        consolidated_metrics.total_count = sum(
-            [metrics.total_count for metrics in column_metrics_values]
-        )
-        consolidated_metrics.valid_count = sum(
-            [metrics.valid_count for metrics in column_metrics_values]
-        )
-        consolidated_metrics.invalid_count = sum(
-            [metrics.invalid_count for metrics in column_metrics_values]
+    def _count_valid(self, column_df: pd.Series, validator) -> tuple[int, int]:
+        """
+        returns the count of the valid values and of the validator calls.
+        """
+        if self._is_low_cardinality(column_df):
+            value_counts = column_df.value_counts(dropna=False, sort=False)
+            valid_mask = np.fromiter(
+                (apply_validator(validator, value) for value in value_counts.index),
+                dtype=bool,
+                count=len(value_counts),
+            )
+            return int(value_counts.to_numpy()[valid_mask].sum()), len(value_counts)
+
+        valid_count = int(
+            column_df.map(lambda value: apply_validator(validator, value)).sum()
         )
+        return valid_count, len(column_df.index)
 
-        consolidated_metrics.score = (
-            round(
-                sum([metrics.score for metrics in column_metrics_values])
-                / len(column_metrics_values),
-                2,
-            )
-            if len(column_metrics_values)
-            else 0
+    def _is_low_cardinality(self, column_df: pd.Series) -> bool:
+        threshold = self._distinct_validation_threshold
+        if threshold is None:
+            return False
+
+        # estimating the cardinality from the head of the column to avoid
+        # hashing the whole column when most of the values are distinct
+        sample = column_df.iloc[: self._distinct_validation_sample_size]
+        if not len(sample):
+            return False
+
+        return sample.nunique(dropna=False) / len(sample) <= threshold
+
+    @_instrumented("key_uniqueness")
+    def check_key_uniqueness(self):
+        df = self._read_columns(
+            [column_name for key in self._unique_keys for column_name in key]
         )
+        encoded_columns = dict[str, EncodedColumn]()
+
+        def get_encoded(column_name: str) -> EncodedColumn:
+            encoded = encoded_columns.get(column_name)
+            if encoded is None:
+                encoded = encode_column(df[column_name])
+                encoded_columns[column_name] = encoded
+            return encoded
+
+        self._check_key_uniqueness(get_encoded, list(df))
+
+    def _check_key_uniqueness(self, get_encoded, column_names: list[str]):
+        key_uniqueness = dict[str, QualityReport.KeyUniqueness]()
+        for key_columns in self._unique_keys:
+            if not all(column_name in column_names for column_name in key_columns):
+                continue
+
+            key_uniqueness["+".join(key_columns)] = get_key_uniqueness(
+                key_columns,
+                [get_encoded(column_name) for column_name in key_columns],
+                top_count=self._top_duplicate_count,
+            )
 
-        self.validity = consolidated_metrics
-        self.validity_columns = column_metrics
+        self.key_uniqueness = key_uniqueness
+
+    @_instrumented("drift")
+    def check_drift(self):
+        if self._profile_store is None:
+            raise ValueError("no profile store to check the drift against")
+        if self.df is None:
+            raise ValueError("the drift is checked on a dataframe, none is set")
+
+        profile = DatasetDriftProfile()
+        profile.add(self.df)
 
+        baseline = self._profile_store.load(self.report_name)
+        self.drift = get_drift(baseline, profile)
+
+        if self._update_baseline:
+            self._profile_store.save(self.report_name, profile)
+
+    @_instrumented("timeliness")
     def check_timeliness(self):
-        pass
+        df = self._read_columns(self._date_columns)
+        start_date, end_date, reference_time = self._get_timeframe()
 
-    def check_consistency(self):
+        column_metrics = dict[str, QualityReport.Timeliness]()
+        for column_name in self._date_columns:
+            if column_name not in df:
+                continue
+
+            column_df = df[column_name]
+            with self._measure("timeliness", column_name):
+                column_metrics[column_name] = get_timeliness(
+                    dates=parse_dates(column_df),
+                    value_count=int(column_df.count()),
+                    start_date=start_date,
+                    end_date=end_date,
+                    reference_time=reference_time,
+                )
+
+        self.timeliness = consolidate_timeliness(column_metrics)
+        self.timeliness_columns = column_metrics
+
+    def _get_timeframe(self) -> tuple[pd.Timestamp, pd.Timestamp, pd.Timestamp]:
+        reference_time = self._reference_time
+        if reference_time is None:
+            reference_time = pd.Timestamp.now(tz="UTC").tz_localize(None)
+
+        return (
+            pd.Timestamp(self._start_date),
+            pd.Timestamp(self._end_date),
+            pd.Timestamp(reference_time),
+        )
 
+    @_instrumented("consistency")
+    def check_consistency(self):
+        df = self.df
+        if df is None:
+            self._check_consistency_from_store()
+            return
         column_pairing_map = self._column_pairing_map
 
         column_metrics = dict[str, QualityReport.Consistency]()
+        for column_name in df:
+            encoded = encode_column(df[column_name])
 
-        for column_name in self.df.columns:
-
-            column_df = self.df[column_name].dropna()
-            total_count = int(len(column_df))
-            inconsistency_count = 0
+            pair_name = column_pairing_map.get(column_name)
+            pair = encode_column(df[pair_name]) if pair_name in df else None
 
-            if column_name not in column_pairing_map:
-                inconsistency_count = 0
+            if self._keep_masks and pair is not None:
+                inconsistent_mask = get_inconsistent_mask(encoded, pair)
+                self._get_masks(column_name).set_mask("inconsistent", inconsistent_mask)
             else:
-                temp_consistency = {}
-                pair = column_pairing_map[column_name]
-                for _, row in self.df.iterrows():
-                    if row[column_name] not in temp_consistency:
-                        temp_consistency[row[column_name]] = row[pair]
-                    elif (
-                        row[column_name] in temp_consistency
-                        and row[pair] != temp_consistency[row[column_name]]
-                    ):
-                        inconsistency_count += 1
-
-            metric = QualityReport.Consistency()
-            metric.total_count = total_count
-            metric.consistent_count = total_count - inconsistency_count
-            metric.inconsistent_count = inconsistency_count
-            metric.score = round(
-                (metric.consistent_count / total_count) * 100 if total_count else 100, 2
-            )
-
-            column_metrics[column_name] = metric
+                inconsistent_mask = None
 
-        # calculating consolidated metrics
-        column_metrics_values = column_metrics.values()
+            column_metrics[column_name] = get_consistency(
+                encoded, pair, inconsistent_mask
+            )
 
-        consolidated_metrics = QualityReport.Consistency()
-        consolidated_metrics.total_count = sum(
-            [metrics.total_count for metrics in column_metrics_values]
+        self.consistency = consolidate_metrics(
+            QualityReport.Consistency, column_metrics
         )
-        consolidated_metrics.consistent_count = sum(
-            [metrics.consistent_count for metrics in column_metrics_values]
+        self.consistency_columns = column_metrics
+
+    def _check_consistency_from_store(self):
+        counts = self._get_store_counts(distinct=False)
+
+        # only the paired columns are read, the others are consistent
+        column_pairing_map = {
+            column_name: pair_name
+            for column_name, pair_name in self._column_pairing_map.items()
+            if column_name in counts.index and pair_name in counts.index
+        }
+        df = self._read_columns(
+            list(dict.fromkeys([*column_pairing_map, *column_pairing_map.values()]))
         )
-        consolidated_metrics.inconsistent_count = sum(
-            [metrics.inconsistent_count for metrics in column_metrics_values]
+
+        column_metrics = dict[str, QualityReport.Consistency]()
+        for column_name, row in counts.iterrows():
+            pair_name = column_pairing_map.get(column_name)
+            if pair_name is not None:
+                column_metrics[column_name] = get_consistency(
+                    encode_column(df[column_name]), encode_column(df[pair_name])
+                )
+                continue
+
+            value_count = int(row["total_count"] - row["null_count"])
+
+            consolidated_metrics = QualityReport.Consistency()
+            consolidated_metrics.total_count = value_count
+            consolidated_metrics.consistent_count = value_count
+            consolidated_metrics.inconsistent_count = 0
+            consolidated_metrics.score = get_score(value_count, value_count)
+
+            column_metrics[column_name] = consolidated_metrics
+
+        self.consistency = consolidate_metrics(
+            QualityReport.Consistency, column_metrics
         )
+        self.consistency_columns = column_metrics
+
+    def _check_profile_from_store(self):
+        # the counts are pushed down to the store, the other checks read only
+        # the distinct values or the columns they need from it
+        self.check_completeness()
+        self.check_uniqueness()
+        self.check_validity()
+        self.check_consistency()
+        if self._unique_keys:
+            self.check_key_uniqueness()
+
+    @_instrumented("profile")
+    def check_profile(self):
+        """
+        fused alternative to the completeness, uniqueness, validity and
+        consistency checks, visiting and encoding each column only once, the
+        composite keys are checked from the same encodings.
+        """
+        df = self.df
+        if df is None:
+            self._check_profile_from_store()
+            return
+        column_pairing_map = self._column_pairing_map
 
-        consolidated_metrics.score = (
-            round(
-                sum([metrics.score for metrics in column_metrics_values])
-                / len(column_metrics_values),
-                2,
+        # only the encodings of the paired and key columns outlive their profile
+        paired_names = set(column_pairing_map.values())
+        for key_columns in self._unique_keys:
+            paired_names.update(key_columns)
+        encoded_columns = dict[str, EncodedColumn]()
+
+        def get_encoded(column_name: str) -> EncodedColumn:
+            encoded = encoded_columns.get(column_name)
+            if encoded is None:
+                encoded = encode_column(df[column_name])
+                if column_name in paired_names:
+                    encoded_columns[column_name] = encoded
+            return encoded
+
+        profiles, cache_keys = self._get_cached_profiles()
+        for column_name in cache_keys:
+            pair_name = column_pairing_map.get(column_name)
+
+            with self._measure("profile", column_name) as record:
+                profiles[column_name] = profile_column(
+                    encoded=get_encoded(column_name),
+                    validator=self._validation_map.get(column_name),
+                    pair=get_encoded(pair_name) if pair_name in df else None,
+                    keep_masks=self._keep_masks,
+                    uniqueness_precision=self._get_uniqueness_precision(),
+                )
+                record.validator_call_count = profiles[column_name].validator_call_count
+
+        self._put_cached_profiles(profiles, cache_keys)
+        self._set_profiles(profiles)
+
+        if self._unique_keys:
+            with self._measure("key_uniqueness"):
+                self._check_key_uniqueness(get_encoded, list(df))
+
+    @_instrumented("profile")
+    def check_profile_parallel(self, max_process_count: int = None):
+        """
+        runs the fused profile of each column in a separate process, for wide
+        dataframes where the checks are bound by the gil.
+        """
+        if self.df is None:
+            self._check_profile_from_store()
+            return
+        profiles, cache_keys = self._get_cached_profiles()
+        if cache_keys:
+            profiles.update(
+                profile_columns_parallel(
+                    df=self.df,
+                    validation_map=self._validation_map,
+                    column_pairing_map=self._column_pairing_map,
+                    max_process_count=max_process_count,
+                    column_names=list(cache_keys),
+                    keep_masks=self._keep_masks,
+                    uniqueness_precision=self._get_uniqueness_precision(),
+                )
             )
-            if len(column_metrics_values)
-            else 0
-        )
 
-        self.consistency = consolidated_metrics
-        self.consistency_columns = column_metrics
+        instrumentation = self._instrumentation
+        if instrumentation is not None:
+            for column_name in cache_keys:
+                profile = profiles[column_name]
+
+                record = TimingRecord(check="profile", column=column_name)
+                record.wall_time = profile.wall_time
+                record.cpu_time = profile.cpu_time
+                record.validator_call_count = profile.validator_call_count
+                instrumentation.add_record(record)
+
+        self._put_cached_profiles(profiles, cache_keys)
+        self._set_profiles(profiles)
+
+    def _get_cached_profiles(
+        self,
+    ) -> tuple[dict[str, ColumnProfile], dict[str, str | None]]:
+        """
+        returns the cached profiles by column, in the order of the columns, and
+        the cache keys of the columns which are not cached yet.
+        """
+        df = self.df
+        cache = None if self._keep_masks else self._result_cache
+
+        # the estimated profiles are cached apart from the exact ones
+        precision = self._get_uniqueness_precision()
+        check_type = "profile" if precision is None else f"profile:hll{precision}"
+
+        profiles = {column_name: None for column_name in df}
+        if cache is None:
+            return profiles, {column_name: None for column_name in df}
+
+        fingerprints = dict[str, str]()
+
+        def get_fingerprint(column_name: str) -> str:
+            fingerprint = fingerprints.get(column_name)
+            if fingerprint is None:
+                fingerprint = get_column_fingerprint(df[column_name])
+                fingerprints[column_name] = fingerprint
+            return fingerprint
+
+        cache_keys = dict[str, str]()
+        for column_name in df:
+            pair_name = self._column_pairing_map.get(column_name)
+
+            cache_key = get_cache_key(
+                column_fingerprint=get_fingerprint(column_name),
+                check_type=check_type,
+                validator=self._validation_map.get(column_name),
+                pair_fingerprint=(
+                    get_fingerprint(pair_name) if pair_name in df else None
+                ),
+            )
+
+            profile = cache.get(cache_key)
+            if profile is None:
+                cache_keys[column_name] = cache_key
+            else:
+                profiles[column_name] = profile
+
+        return profiles, cache_keys
+
+    def _put_cached_profiles(
+        self, profiles: dict[str, ColumnProfile], cache_keys: dict[str, str | None]
+    ):
+        cache = None if self._keep_masks else self._result_cache
+        if cache is None:
+            return
+
+        for column_name, cache_key in cache_keys.items():
+            cache.put(cache_key, profiles[column_name])
+
+        cache.evict()
+
+    def _set_profiles(self, profiles: dict[str, ColumnProfile]):
+        completeness_columns = dict[str, QualityReport.Completeness]()
+        uniqueness_columns = dict[str, QualityReport.Uniqueness]()
+        validity_columns = dict[str, QualityReport.Validity]()
+        consistency_columns = dict[str, QualityReport.Consistency]()
+
+        precision = self._get_uniqueness_precision()
+        sketches = None if precision is None else UniquenessSketches(precision)
+
+        for column_name, profile in profiles.items():
+            if profile.masks is not None:
+                self.row_masks[column_name] = profile.masks
+                profile.masks = None
+
+            if sketches is not None and profile.sketch is not None:
+                sketches.columns[column_name] = profile.sketch
+
+            completeness_columns[column_name] = profile.completeness
+            uniqueness_columns[column_name] = profile.uniqueness
+            validity_columns[column_name] = profile.validity
+            consistency_columns[column_name] = profile.consistency
+
+        self.completeness = consolidate_metrics(
+            QualityReport.Completeness, completeness_columns
+        )
+        self.uniqueness = consolidate_metrics(
+            QualityReport.Uniqueness, uniqueness_columns
+        )
+        if sketches is not None:
+            self.uniqueness.is_estimate = True
+            self.uniqueness_sketches = sketches
+        self.validity = consolidate_metrics(QualityReport.Validity, validity_columns)
+        self.consistency = consolidate_metrics(
+            QualityReport.Consistency, consistency_columns
+        )
+        self.completeness_columns = completeness_columns
+        self.uniqueness_columns = uniqueness_columns
+        self.validity_columns = validity_columns
+        self.consistency_columns = consistency_columns
 
     def check_completeness_async(self):
-        self._completeness_task = self._executor.submit(self.check_completeness)
+        self._submit(self.check_completeness)
 
     def check_uniqueness_async(self):
-        self._uniqueness_task = self._executor.submit(self.check_uniqueness)
+        self._submit(self.check_uniqueness)
 
     def check_validity_async(self):
-        self._validity_task = self._executor.submit(self.check_validity)
+        self._submit(self.check_validity)
 
     def check_consistency_async(self):
-        self._consistency_task = self._executor.submit(self.check_consistency)
+        self._submit(self.check_consistency)
+
+    def check_profile_async(self):
+        self._submit(self.check_profile)
+
+    def check_profile_parallel_async(self, max_process_count: int = None):
+        self._submit(self.check_profile_parallel, max_process_count)
+
+    def check_key_uniqueness_async(self):
+        self._submit(self.check_key_uniqueness)
+
+    def check_drift_async(self):
+        self._submit(self.check_drift)
 
     def check_timeliness_async(self):
-        self._timeliness_task = self._executor.submit(self.check_timeliness)
+        self._submit(self.check_timeliness)
 
     def generate_report(self):
-        name = self.report_name or self.df.Name
-
-        self._executor.shutdown()
+        self.wait()
 
         report = QualityReport()
-        report.name = name
+        report.name = self.report_name
         report.completeness_columns = self.completeness_columns
         report.validity_columns = self.validity_columns
         report.uniqueness_columns = self.uniqueness_columns
         report.consistency_columns = self.consistency_columns
+        report.timeliness_columns = self.timeliness_columns
+        report.key_uniqueness = self.key_uniqueness
+        report.drift = self.drift
+
+        if self._instrumentation is not None:
+            report.timings = self._instrumentation.get_records()
         report.completeness = self.completeness
         report.validity = self.validity
         report.uniqueness = self.uniqueness
         report.consistency = self.consistency
         report.timeliness = self.timeliness
 
+        if self._population_count is not None:
+            set_confidence_intervals(
+                report,
+                sample_row_count=len(self.df.index),
+                population_count=self._population_count,
+            )
+
+            # the distinct values of a sample are not the ones of the dataset
+            report.uniqueness.is_estimate = True
+            for metric in report.uniqueness_columns.values():
+                metric.is_estimate = True
+
         return report
@@ -0,0 +1,202 @@
+import os
+import sqlite3
+import pandas as pd
+from contextlib import closing
+from datetime import datetime, timezone
+from report import QualityReport
+
+# column name of the dataset level metrics
+dataset_column = "*"
+
+_schema = """
+create table if not exists runs (
+    run_id integer primary key autoincrement,
+    dataset text not null,
+    run_timestamp text not null
+);
+create index if not exists runs_dataset on runs (dataset, run_timestamp);
+
+create table if not exists metrics (
+    run_id integer not null references runs (run_id),
+    dataset text not null,
+    run_timestamp text not null,
+    column_name text not null,
+    metric text not null,
+    score real,
+    total_count integer,
+    failing_count integer
+);
+create index if not exists metrics_series
+    on metrics (dataset, column_name, metric, run_timestamp);
+create index if not exists metrics_run on metrics (run_id);
+"""
+
+# count field of the rows failing each metric
+_failing_fields = {
+    "completeness": "null_count",
+    "uniqueness": "duplicate_count",
+    "validity": "invalid_count",
+    "consistency": "inconsistent_count",
+    "timeliness": "invalid_count",
+    "key_uniqueness": "duplicate_count",
+}
+
+
+def _get_metric_rows(report: QualityReport) -> list[tuple]:
+    rows = list()
+
+    def add_row(column_name: str, metric_name: str, metric):
+        rows.append(
+            (
+                column_name,
+                metric_name,
+                metric.score,
+                metric.total_count,
+                getattr(metric, _failing_fields[metric_name]),
+            )
+        )
+
+    for metric_name in ("completeness", "uniqueness", "validity", "consistency"):
+        add_row(dataset_column, metric_name, getattr(report, metric_name))
+        for column_name, metric in getattr(report, f"{metric_name}_columns").items():
+            add_row(column_name, metric_name, metric)
+
+    if report.timeliness_columns:
+        add_row(dataset_column, "timeliness", report.timeliness)
+        for column_name, metric in report.timeliness_columns.items():
+            add_row(column_name, "timeliness", metric)
+
+    for key_name, metric in report.key_uniqueness.items():
+        add_row(key_name, "key_uniqueness", metric)
+
+    return rows
+
+
+class ReportHistory:
+    """
+    append only store of the metrics of every report run in sqlite, indexed
+    for the time series of a column and the deltas between runs.
+    """
+
+    _filepath: str
+
+    def __init__(self, filepath: str):
+        self._filepath = filepath
+
+        dirname = os.path.dirname(filepath)
+        if dirname:
+            os.makedirs(dirname, exist_ok=True)
+
+        with closing(self._connect()) as connection:
+            # readers are not blocked by the run being written
+            connection.execute("pragma journal_mode = wal")
+            connection.executescript(_schema)
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self._filepath, timeout=30)
+
+    def append(self, report: QualityReport, run_timestamp: str = None) -> int:
+        """
+        writes all the metrics of the report in one transaction, returns the
+        id of the run.
+        """
+        if run_timestamp is None:
+            run_timestamp = datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+        rows = _get_metric_rows(report)
+
+        with closing(self._connect()) as connection, connection:
+            cursor = connection.execute(
+                "insert into runs (dataset, run_timestamp) values (?, ?)",
+                (report.name, run_timestamp),
+            )
+            run_id = cursor.lastrowid
+
+            connection.executemany(
+                "insert into metrics values (?, ?, ?, ?, ?, ?, ?, ?)",
+                [(run_id, report.name, run_timestamp, *row) for row in rows],
+            )
+
+        return run_id
+
+    def _query(self, sql: str, parameters: tuple) -> pd.DataFrame:
+        with closing(self._connect()) as connection:
+            return pd.read_sql_query(sql, connection, params=parameters)
+
+    def get_runs(self, dataset: str) -> pd.DataFrame:
+        return self._query(
+            "select run_id, run_timestamp from runs"
+            " where dataset = ? order by run_timestamp, run_id",
+            (dataset,),
+        )
+
+    def get_column_series(
+        self,
+        dataset: str,
+        column_name: str,
+        metric: str,
+        start: str = None,
+        end: str = None,
+    ) -> pd.DataFrame:
+        """
+        returns the metric of the column over the runs between the start and
+        end timestamps, the dataset level metric for the dataset_column.
+        """
+        conditions = ["dataset = ?", "column_name = ?", "metric = ?"]
+        parameters = [dataset, column_name, metric]
+        if start is not None:
+            conditions.append("run_timestamp >= ?")
+            parameters.append(start)
+        if end is not None:
+            conditions.append("run_timestamp <= ?")
+            parameters.append(end)
+
+        return self._query(
+            "select run_id, run_timestamp, score, total_count, failing_count"
+            f" from metrics where {' and '.join(conditions)}"
+            " order by run_timestamp, run_id",
+            tuple(parameters),
+        )
+
+    def get_dataset_series(
+        self, dataset: str, metric: str, start: str = None, end: str = None
+    ) -> pd.DataFrame:
+        return self.get_column_series(dataset, dataset_column, metric, start, end)
+
+    def get_run_deltas(
+        self, dataset: str, run_id: int = None, previous_run_id: int = None
+    ) -> pd.DataFrame:
+        """
+        returns the change of every metric between a run, the latest by
+        default, and a previous run, the one just before it by default.
+        """
+        runs = self.get_runs(dataset)
+        run_ids = runs["run_id"].tolist()
+        if run_id is None:
+            if not run_ids:
+                raise ValueError(f"no runs of {dataset}")
+            run_id = run_ids[-1]
+        for known_run_id in (run_id, previous_run_id):
+            if known_run_id is not None and known_run_id not in run_ids:
+                raise ValueError(f"unknown run {known_run_id} of {dataset}")
+        if previous_run_id is None:
+            index = run_ids.index(run_id)
+            if index == 0:
+                raise ValueError(f"no run of {dataset} before {run_id}")
+            previous_run_id = run_ids[index - 1]
+
+        deltas = self._query(
+            "select current.column_name, current.metric,"
+            " previous.score as previous_score, current.score,"
+            " current.score - previous.score as delta,"
+            " previous.failing_count as previous_failing_count,"
+            " current.failing_count"
+            " from metrics as current"
+            " left join metrics as previous"
+            " on previous.run_id = ? and previous.column_name = current.column_name"
+            " and previous.metric = current.metric"
+            " where current.run_id = ?",
+            (previous_run_id, run_id),
+        )
+        deltas["delta"] = deltas["delta"].round(2)
+        return deltas
@@ -0,0 +1,181 @@
+import os
+import sys
+import time
+import cProfile
+import threading
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+
+
+class TimingRecord:
+    check: str
+    column: str | None
+    wall_time: float
+    cpu_time: float
+    peak_memory: int | None
+    validator_call_count: int
+
+    def __init__(self, check: str = "", column: str | None = None):
+        self.check = check
+        self.column = column
+        self.wall_time = 0
+        self.cpu_time = 0
+        self.peak_memory = None
+        self.validator_call_count = 0
+
+
+class Instrumentation:
+    """
+    collects the wall time, cpu time, peak memory and validator calls of the
+    checks and their columns, with optional cprofile dumps per check.
+
+    the peak memory is traced by tracemalloc, which slows the checks down and
+    cannot tell apart the allocations of threads, so the measures tracing it
+    run one thread at a time.
+    """
+
+    _records: list[TimingRecord]
+    _lock: threading.Lock
+    _trace_memory: bool
+    _profile_directory: str | None
+    _memory_lock: threading.RLock
+    _memory_frames: threading.local
+
+    def __init__(self, trace_memory: bool = False, profile_directory: str = None):
+        self._records = list()
+        self._lock = threading.Lock()
+        self._trace_memory = trace_memory
+        self._profile_directory = profile_directory
+        self._memory_lock = threading.RLock()
+        self._memory_frames = threading.local()
+
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    @contextmanager
+    def measure(self, check: str, column: str | None = None):
+        record = TimingRecord(check=check, column=column)
+
+        if not self._trace_memory:
+            try:
+                with self._measure_time(record):
+                    yield record
+            finally:
+                self.add_record(record)
+            return
+
+        with self._memory_lock:
+            frames = self._get_memory_frames()
+
+            # the peak is reset for this measure, the peaks reached so far by
+            # the enclosing measures are kept in their frames
+            current_memory, peak_memory = tracemalloc.get_traced_memory()
+            for frame in frames:
+                frame[1] = max(frame[1], peak_memory)
+            tracemalloc.reset_peak()
+
+            frame = [current_memory, current_memory]
+            frames.append(frame)
+            try:
+                with self._measure_time(record):
+                    yield record
+            finally:
+                frames.pop()
+                peak_memory = max(frame[1], tracemalloc.get_traced_memory()[1])
+                record.peak_memory = peak_memory - frame[0]
+                self.add_record(record)
+
+    def _get_memory_frames(self) -> list[list[int]]:
+        # start memory and peak memory of the open measures of the thread
+        frames = getattr(self._memory_frames, "frames", None)
+        if frames is None:
+            frames = list()
+            self._memory_frames.frames = frames
+        return frames
+
+    @contextmanager
+    def _measure_time(self, record: TimingRecord):
+        start_wall_time = time.perf_counter()
+        start_cpu_time = time.thread_time()
+        try:
+            yield
+        finally:
+            record.wall_time = round(time.perf_counter() - start_wall_time, 6)
+            record.cpu_time = round(time.thread_time() - start_cpu_time, 6)
+
+    @contextmanager
+    def profile(self, name: str):
+        if self._profile_directory is None:
+            yield
+            return
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            os.makedirs(self._profile_directory, exist_ok=True)
+            profiler.dump_stats(os.path.join(self._profile_directory, f"{name}.prof"))
+
+    def add_record(self, record: TimingRecord):
+        with self._lock:
+            self._records.append(record)
+
+    def get_records(self) -> list[TimingRecord]:
+        with self._lock:
+            return list(self._records)
+
+
+class StackSampler:
+    """
+    sampling profiler, records the stacks of all the threads at a fixed
+    interval and writes them in the collapsed format of flame graphs.
+    """
+
+    _interval: float
+    _stacks: Counter
+    _thread: threading.Thread | None
+    _stop_event: threading.Event
+
+    def __init__(self, interval: float = 0.005):
+        self._interval = interval
+        self._stacks = Counter()
+        self._thread = None
+        self._stop_event = threading.Event()
+
+    def start(self):
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def write_collapsed(self, filepath: str):
+        dirname = os.path.dirname(filepath)
+        if dirname:
+            os.makedirs(dirname, exist_ok=True)
+
+        with open(filepath, mode="w", encoding="utf8") as file:
+            for stack, count in self._stacks.most_common():
+                file.write(f"{stack} {count}\n")
+
+    def _sample(self):
+        sampler_id = threading.get_ident()
+        while not self._stop_event.wait(self._interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == sampler_id:
+                    continue
+
+                stack = list()
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                    frame = frame.f_back
+
+                self._stacks[";".join(reversed(stack))] += 1
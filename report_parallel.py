@@ -0,0 +1,444 @@
+import os
+import math
+import time
+import numpy as np
+import pandas as pd
+from multiprocessing import resource_tracker, shared_memory
+from concurrent.futures import ProcessPoolExecutor
+from report_profiler import ColumnProfile, EncodedColumn, encode_column, profile_column
+
+# the object columns are encoded in slices of at least this many rows, fewer
+# rows do not pay for the tasks
+min_slice_row_count = 50_000
+
+
+class SharedStrings:
+    """
+    picklable handle to text values packed in shared memory, the character
+    offsets of the values, their null flags and their utf8 bytes.
+    """
+
+    memory_name: str
+    length: int
+    byte_count: int
+
+    def __init__(self):
+        self.memory_name = ""
+        self.length = 0
+        self.byte_count = 0
+
+
+class SharedColumn:
+    """
+    picklable handle to a column buffer placed in shared memory, either the raw
+    values of a numpy backed column or the codes of a column encoded upfront.
+    """
+
+    name: str
+    memory_name: str
+    dtype: str
+    length: int
+    is_encoded: bool
+    uniques: any
+    shared_uniques: SharedStrings | None
+    null_value: any
+
+    def __init__(self):
+        self.name = ""
+        self.memory_name = ""
+        self.dtype = ""
+        self.length = 0
+        self.is_encoded = False
+        self.uniques = None
+        self.shared_uniques = None
+        self.null_value = np.nan
+
+
+def _is_shareable(column_df: pd.Series) -> bool:
+    return isinstance(column_df.dtype, np.dtype) and column_df.dtype.kind in "biufmM"
+
+
+def _is_text(column_df: pd.Series) -> bool:
+    return column_df.dtype == object and pd.api.types.infer_dtype(
+        column_df, skipna=True
+    ) in ("string", "empty")
+
+
+def to_shared_memory(values: np.ndarray) -> shared_memory.SharedMemory:
+    memory = shared_memory.SharedMemory(create=True, size=max(values.nbytes, 1))
+    buffer = np.ndarray(values.shape, dtype=values.dtype, buffer=memory.buf)
+    buffer[:] = values
+    del buffer
+    return memory
+
+
+def share_column(
+    name: str, column_df: pd.Series
+) -> tuple[shared_memory.SharedMemory, SharedColumn]:
+    """
+    places the raw values of a numpy backed column in shared memory.
+    """
+    column = SharedColumn()
+    column.name = name
+    column.length = len(column_df)
+
+    values = column_df.to_numpy()
+    column.dtype = values.dtype.str
+    memory = to_shared_memory(values)
+    column.memory_name = memory.name
+    return memory, column
+
+
+def pack_strings(
+    values: np.ndarray, nulls: np.ndarray
+) -> tuple[shared_memory.SharedMemory, SharedStrings]:
+    texts = np.where(nulls, "", values)
+    offsets = np.zeros(len(texts) + 1, dtype=np.int64)
+    np.cumsum(
+        np.fromiter(map(len, texts), dtype=np.int64, count=len(texts)),
+        out=offsets[1:],
+    )
+    data = "".join(texts).encode("utf8", errors="surrogatepass")
+
+    strings = SharedStrings()
+    strings.length = len(texts)
+    strings.byte_count = len(data)
+
+    data_start = offsets.nbytes + len(nulls)
+    memory = shared_memory.SharedMemory(
+        create=True, size=max(data_start + len(data), 1)
+    )
+    memory.buf[: offsets.nbytes] = offsets.tobytes()
+    memory.buf[offsets.nbytes : data_start] = nulls.astype(np.uint8).tobytes()
+    memory.buf[data_start : data_start + len(data)] = data
+    strings.memory_name = memory.name
+    return memory, strings
+
+
+def unpack_strings(
+    strings: SharedStrings, memory: shared_memory.SharedMemory, null_value=None
+) -> np.ndarray:
+    offsets_end = (strings.length + 1) * 8
+    data_start = offsets_end + strings.length
+
+    offsets = np.frombuffer(bytes(memory.buf[:offsets_end]), dtype=np.int64)
+    nulls = np.frombuffer(bytes(memory.buf[offsets_end:data_start]), dtype=bool)
+    text = bytes(memory.buf[data_start : data_start + strings.byte_count]).decode(
+        "utf8", errors="surrogatepass"
+    )
+
+    values = np.empty(strings.length, dtype=object)
+    values[:] = [
+        text[start:end]
+        for start, end in zip(offsets[:-1].tolist(), offsets[1:].tolist())
+    ]
+    values[nulls] = null_value
+    return values
+
+
+def get_slice_bounds(row_count: int, slice_count: int) -> list[tuple[int, int]]:
+    slice_row_count = max(math.ceil(row_count / slice_count), min_slice_row_count)
+    return [
+        (start, min(start + slice_row_count, row_count))
+        for start in range(0, max(row_count, 1), slice_row_count)
+    ]
+
+
+def share_encoded_slices(
+    name: str, slices: list[EncodedColumn]
+) -> tuple[shared_memory.SharedMemory, SharedColumn]:
+    """
+    merges the encodings of the consecutive row slices of a column into the
+    codes of the whole column in shared memory, the values are numbered in
+    the order of their first row like when the column is encoded at once.
+    """
+    slice_uniques = [pd.Series(encoded.uniques) for encoded in slices]
+    mapping, uniques = pd.factorize(pd.concat(slice_uniques, ignore_index=True))
+
+    codes = np.empty(
+        sum(encoded.total_count for encoded in slices),
+        dtype=np.int32 if len(uniques) < np.iinfo(np.int32).max else np.int64,
+    )
+    start = 0
+    mapping_start = 0
+    for encoded in slices:
+        slice_mapping = np.append(
+            mapping[mapping_start : mapping_start + len(encoded.uniques)], -1
+        )
+        codes[start : start + encoded.total_count] = slice_mapping[encoded.codes]
+        start += encoded.total_count
+        mapping_start += len(encoded.uniques)
+
+    column = SharedColumn()
+    column.name = name
+    column.length = len(codes)
+    column.dtype = codes.dtype.str
+    column.is_encoded = True
+    column.uniques = uniques
+    column.null_value = next(
+        (encoded.null_value for encoded in slices if encoded.null_count), np.nan
+    )
+
+    memory = to_shared_memory(codes)
+    column.memory_name = memory.name
+    return memory, column
+
+
+def _encode_shared_slice(
+    strings: SharedStrings, codes_column: SharedColumn, start: int
+) -> np.ndarray:
+    """
+    encodes a row slice of a text column packed in shared memory, its codes
+    are written at start in the shared codes of the column and its distinct
+    values are returned.
+    """
+    strings_memory = shared_memory.SharedMemory(name=strings.memory_name)
+    codes_memory = shared_memory.SharedMemory(name=codes_column.memory_name)
+    try:
+        values = unpack_strings(strings, strings_memory)
+        slice_codes, uniques = pd.factorize(values, use_na_sentinel=True)
+
+        codes = np.ndarray(
+            (codes_column.length,), dtype=codes_column.dtype, buffer=codes_memory.buf
+        )
+        codes[start : start + len(slice_codes)] = slice_codes
+        del codes
+
+        return uniques
+    finally:
+        strings_memory.close()
+        codes_memory.close()
+
+
+def submit_text_slices(
+    executor: ProcessPoolExecutor,
+    name: str,
+    column_df: pd.Series,
+    slice_count: int,
+) -> tuple[SharedColumn, shared_memory.SharedMemory, list, list]:
+    """
+    packs the row slices of a text column in shared memory and submits their
+    encodings, which write their codes in the shared codes of the column.
+    """
+    nulls = column_df.isna().to_numpy()
+    values = column_df.to_numpy()
+
+    column = SharedColumn()
+    column.name = name
+    column.length = len(values)
+    column.dtype = np.dtype(
+        np.int32 if column.length < np.iinfo(np.int32).max else np.int64
+    ).str
+    column.is_encoded = True
+    if nulls.any():
+        column.null_value = column_df.iat[int(np.argmax(nulls))]
+
+    codes_memory = shared_memory.SharedMemory(
+        create=True, size=max(column.length * np.dtype(column.dtype).itemsize, 1)
+    )
+    column.memory_name = codes_memory.name
+
+    slice_memories = list[shared_memory.SharedMemory]()
+    slices = list()
+    for start, end in get_slice_bounds(column.length, slice_count):
+        memory, strings = pack_strings(values[start:end], nulls[start:end])
+        slice_memories.append(memory)
+        slices.append(
+            (start, end, executor.submit(_encode_shared_slice, strings, column, start))
+        )
+
+    return column, codes_memory, slice_memories, slices
+
+
+def merge_text_slices(
+    column: SharedColumn, codes_memory: shared_memory.SharedMemory, slices: list
+) -> shared_memory.SharedMemory:
+    """
+    numbers the values of the encoded slices in the order of their first row,
+    like when the column is encoded at once, by remapping the shared codes in
+    place, and packs the distinct values in shared memory.
+    """
+    slice_uniques = [task.result() for _, _, task in slices]
+    mapping, uniques = pd.factorize(np.concatenate(slice_uniques))
+
+    codes = np.ndarray((column.length,), dtype=column.dtype, buffer=codes_memory.buf)
+    mapping_start = 0
+    for (start, end, _), uniques_of_slice in zip(slices, slice_uniques):
+        slice_mapping = np.append(
+            mapping[mapping_start : mapping_start + len(uniques_of_slice)], -1
+        ).astype(codes.dtype)
+        codes[start:end] = slice_mapping[codes[start:end]]
+        mapping_start += len(uniques_of_slice)
+    del codes
+
+    memory, column.shared_uniques = pack_strings(
+        uniques, np.zeros(len(uniques), dtype=bool)
+    )
+    return memory
+
+
+def _load_column(column: SharedColumn, memories: dict):
+    values = np.ndarray(
+        (column.length,), dtype=column.dtype, buffer=memories[column.memory_name].buf
+    )
+
+    if column.is_encoded:
+        uniques = column.uniques
+        if column.shared_uniques is not None:
+            uniques = unpack_strings(
+                column.shared_uniques, memories[column.shared_uniques.memory_name]
+            )
+        return EncodedColumn(
+            codes=values, uniques=uniques, null_value=column.null_value
+        )
+
+    return encode_column(pd.Series(values, copy=False))
+
+
+def _profile_attached(
+    memories: dict,
+    column: SharedColumn,
+    validator,
+    pair: SharedColumn | None,
+    keep_masks: bool,
+    uniqueness_precision: int | None,
+) -> ColumnProfile:
+    encoded = _load_column(column, memories)
+    encoded_pair = None if pair is None else _load_column(pair, memories)
+    return profile_column(
+        encoded=encoded,
+        validator=validator,
+        pair=encoded_pair,
+        keep_masks=keep_masks,
+        uniqueness_precision=uniqueness_precision,
+    )
+
+
+def _profile_shared_column(
+    column: SharedColumn,
+    validator,
+    pair: SharedColumn | None,
+    keep_masks: bool,
+    uniqueness_precision: int | None,
+) -> ColumnProfile:
+    memories = dict[str, shared_memory.SharedMemory]()
+    try:
+        for shared in (column, pair):
+            if shared is None:
+                continue
+            memory_names = [shared.memory_name]
+            if shared.shared_uniques is not None:
+                memory_names.append(shared.shared_uniques.memory_name)
+            for memory_name in memory_names:
+                if memory_name not in memories:
+                    memories[memory_name] = shared_memory.SharedMemory(name=memory_name)
+
+        start_wall_time = time.perf_counter()
+        start_cpu_time = time.process_time()
+
+        # the views on the buffers are released when this call returns
+        profile = _profile_attached(
+            memories, column, validator, pair, keep_masks, uniqueness_precision
+        )
+
+        profile.wall_time = round(time.perf_counter() - start_wall_time, 6)
+        profile.cpu_time = round(time.process_time() - start_cpu_time, 6)
+        return profile
+
+    finally:
+        for memory in memories.values():
+            memory.close()
+
+
+def profile_columns_parallel(
+    df: pd.DataFrame,
+    validation_map: dict[str, any],
+    column_pairing_map: dict[str, str],
+    max_process_count: int = None,
+    column_names: list[str] = None,
+    keep_masks: bool = False,
+    uniqueness_precision: int | None = None,
+) -> dict[str, ColumnProfile]:
+    """
+    profiles the columns of the dataframe, all of them by default, in a process
+    pool, the column buffers are passed to the workers through shared memory.
+    """
+    if column_names is None:
+        column_names = list(df.columns)
+
+    shared_names = list(column_names)
+    for column_name in column_names:
+        pair_name = column_pairing_map.get(column_name)
+        if pair_name in df and pair_name not in shared_names:
+            shared_names.append(pair_name)
+
+    memories = list[shared_memory.SharedMemory]()
+    shared_columns = dict[str, SharedColumn]()
+
+    # the workers attaching the buffers must share the tracker of this
+    # process, one of their own would unlink the buffers when they exit
+    resource_tracker.ensure_running()
+
+    try:
+        with ProcessPoolExecutor(max_workers=max_process_count) as executor:
+            # the text columns are packed in shared memory by row slices, which
+            # are encoded in the workers and merged here. the other object and
+            # extension columns cannot be packed, their row slices and their
+            # distinct values are pickled to the workers
+            slice_count = max_process_count or os.cpu_count() or 1
+            text_slices = dict[str, tuple]()
+            slice_tasks = dict[str, list]()
+            for column_name in shared_names:
+                column_df = df[column_name]
+                if _is_shareable(column_df):
+                    memory, shared_column = share_column(column_name, column_df)
+                    memories.append(memory)
+                    shared_columns[column_name] = shared_column
+                    continue
+
+                if _is_text(column_df):
+                    shared_column, codes_memory, slice_memories, slices = (
+                        submit_text_slices(
+                            executor, column_name, column_df, slice_count
+                        )
+                    )
+                    memories.append(codes_memory)
+                    memories.extend(slice_memories)
+                    text_slices[column_name] = (shared_column, codes_memory, slices)
+                    continue
+
+                slice_tasks[column_name] = [
+                    executor.submit(encode_column, column_df.iloc[start:end])
+                    for start, end in get_slice_bounds(len(column_df), slice_count)
+                ]
+
+            for name, (shared_column, codes_memory, slices) in text_slices.items():
+                memories.append(merge_text_slices(shared_column, codes_memory, slices))
+                shared_columns[name] = shared_column
+
+            for column_name, tasks in slice_tasks.items():
+                memory, shared_column = share_encoded_slices(
+                    column_name, [task.result() for task in tasks]
+                )
+                memories.append(memory)
+                shared_columns[column_name] = shared_column
+
+            tasks = dict()
+            for column_name in column_names:
+                shared_column = shared_columns[column_name]
+                pair_name = column_pairing_map.get(column_name)
+                tasks[column_name] = executor.submit(
+                    _profile_shared_column,
+                    shared_column,
+                    validation_map.get(column_name),
+                    shared_columns.get(pair_name),
+                    keep_masks,
+                    uniqueness_precision,
+                )
+
+            return {column_name: task.result() for column_name, task in tasks.items()}
+
+    finally:
+        for memory in memories:
+            memory.close()
+            memory.unlink()
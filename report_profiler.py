@@ -0,0 +1,440 @@
+import numpy as np
+import pandas as pd
+from report import QualityReport
+from report_validations import apply_validator
+
+
+class EncodedColumn:
+    """
+    dictionary encoded column, shared by all the metrics of a column so the
+    values are hashed only once.
+    """
+
+    codes: np.ndarray
+    uniques: any
+    value_counts: np.ndarray
+    total_count: int
+    null_count: int
+    null_value: any
+
+    def __init__(self, codes: np.ndarray, uniques, null_value=np.nan):
+        self.codes = codes
+        self.uniques = uniques
+        self.total_count = int(len(codes))
+
+        non_null_codes = codes[codes >= 0]
+        self.null_count = self.total_count - int(len(non_null_codes))
+        self.value_counts = np.bincount(non_null_codes, minlength=len(uniques))
+        self.null_value = null_value
+
+    @property
+    def value_count(self) -> int:
+        return self.total_count - self.null_count
+
+    @property
+    def distinct_count(self) -> int:
+        # nulls are counted as one distinct value, like pd.Series.duplicated,
+        # uniques without rows can come from categoricals encoded upfront
+        return int(np.count_nonzero(self.value_counts)) + (1 if self.null_count else 0)
+
+
+class RowMasks:
+    """
+    bitmaps of the failing rows of a column, one bit per row, packed to an
+    eighth of the memory of a boolean array, None when no row fails.
+    """
+
+    row_count: int
+    null: np.ndarray | None
+    invalid: np.ndarray | None
+    inconsistent: np.ndarray | None
+
+    def __init__(self, row_count: int):
+        self.row_count = row_count
+        self.null = None
+        self.invalid = None
+        self.inconsistent = None
+
+    def set_mask(self, name: str, mask: np.ndarray):
+        setattr(self, name, np.packbits(mask) if mask.any() else None)
+
+    def get_mask(self, name: str) -> np.ndarray | None:
+        packed = getattr(self, name)
+        if packed is None:
+            return None
+        return np.unpackbits(packed, count=self.row_count).astype(bool)
+
+
+class ColumnProfile:
+    completeness: QualityReport.Completeness
+    uniqueness: QualityReport.Uniqueness
+    validity: QualityReport.Validity
+    consistency: QualityReport.Consistency
+    validator_call_count: int
+    wall_time: float | None
+    cpu_time: float | None
+    masks: RowMasks | None
+    sketch: any
+
+    def __init__(self):
+        self.completeness = QualityReport.Completeness()
+        self.uniqueness = QualityReport.Uniqueness()
+        self.validity = QualityReport.Validity()
+        self.consistency = QualityReport.Consistency()
+        self.validator_call_count = 0
+        self.wall_time = None
+        self.cpu_time = None
+        self.masks = None
+        self.sketch = None
+
+
+_count_fields = {
+    QualityReport.Completeness: ("total_count", "value_count", "null_count"),
+    QualityReport.Uniqueness: ("total_count", "unique_count", "duplicate_count"),
+    QualityReport.Validity: ("total_count", "valid_count", "invalid_count"),
+    QualityReport.Timeliness: (
+        "total_count",
+        "valid_count",
+        "invalid_count",
+        "future_count",
+        "out_of_window_count",
+    ),
+    QualityReport.Consistency: (
+        "total_count",
+        "consistent_count",
+        "inconsistent_count",
+    ),
+}
+
+
+def encode_column(column_df: pd.Series) -> EncodedColumn:
+    codes, uniques = pd.factorize(column_df, use_na_sentinel=True)
+
+    # halving the memory of the codes, they are kept around for pairings
+    if len(uniques) < np.iinfo(np.int32).max:
+        codes = codes.astype(np.int32, copy=False)
+
+    null_positions = np.flatnonzero(codes < 0)
+    null_value = column_df.iloc[null_positions[0]] if len(null_positions) else np.nan
+
+    return EncodedColumn(codes=codes, uniques=uniques, null_value=null_value)
+
+
+def get_score(count: int, total_count: int) -> float:
+    return round((count / total_count) * 100 if total_count else 100, 2)
+
+
+def get_completeness(encoded: EncodedColumn) -> QualityReport.Completeness:
+    metric = QualityReport.Completeness()
+    metric.total_count = encoded.total_count
+    metric.null_count = encoded.null_count
+    metric.value_count = encoded.value_count
+    metric.score = get_score(metric.value_count, metric.total_count)
+    return metric
+
+
+def get_uniqueness(encoded: EncodedColumn) -> QualityReport.Uniqueness:
+    metric = QualityReport.Uniqueness()
+    metric.total_count = encoded.total_count
+    metric.unique_count = encoded.distinct_count
+    metric.duplicate_count = metric.total_count - metric.unique_count
+    metric.score = get_score(metric.unique_count, metric.total_count)
+    return metric
+
+
+def get_valid_mask(encoded: EncodedColumn, validator) -> np.ndarray:
+    """
+    returns the validity of every distinct value, the validity of the nulls is
+    stored at the last position so the mask can be indexed with the codes.
+    """
+    valid_mask = np.fromiter(
+        (apply_validator(validator, value) for value in encoded.uniques),
+        dtype=bool,
+        count=len(encoded.uniques),
+    )
+    null_valid = apply_validator(validator, encoded.null_value)
+    return np.append(valid_mask, null_valid)
+
+
+def get_validity(
+    encoded: EncodedColumn, validator, valid_mask: np.ndarray | None = None
+) -> QualityReport.Validity:
+    if validator is None:
+        valid_count = encoded.value_count
+    else:
+        if valid_mask is None:
+            valid_mask = get_valid_mask(encoded, validator)
+        valid_count = int(encoded.value_counts[valid_mask[:-1]].sum())
+        if valid_mask[-1]:
+            valid_count += encoded.null_count
+
+    metric = QualityReport.Validity()
+    metric.total_count = encoded.total_count
+    metric.valid_count = valid_count
+    metric.invalid_count = metric.total_count - valid_count
+    metric.score = get_score(metric.valid_count, metric.total_count)
+    return metric
+
+
+def get_inconsistent_mask(encoded: EncodedColumn, pair: EncodedColumn) -> np.ndarray:
+    """
+    returns the rows whose paired value differs from the paired value of the
+    first row having the same value, rows with a null value are consistent.
+    """
+    codes = encoded.codes
+    pair_codes = pair.codes
+
+    present = codes >= 0
+    present_codes = codes[present]
+    present_pair_codes = pair_codes[present]
+
+    present_uniques, first_positions = np.unique(present_codes, return_index=True)
+    first_pair_codes = np.full(len(encoded.uniques), -1, dtype=pair_codes.dtype)
+    first_pair_codes[present_uniques] = present_pair_codes[first_positions]
+
+    inconsistent = np.zeros(len(codes), dtype=bool)
+    inconsistent[present] = present_pair_codes != first_pair_codes[present_codes]
+    return inconsistent
+
+
+def get_consistency(
+    encoded: EncodedColumn,
+    pair: EncodedColumn | None,
+    inconsistent_mask: np.ndarray | None = None,
+) -> QualityReport.Consistency:
+    total_count = encoded.value_count
+    if inconsistent_mask is None and pair is not None:
+        inconsistent_mask = get_inconsistent_mask(encoded, pair)
+    inconsistent_count = (
+        0 if inconsistent_mask is None else int(inconsistent_mask.sum())
+    )
+
+    metric = QualityReport.Consistency()
+    metric.total_count = total_count
+    metric.consistent_count = total_count - inconsistent_count
+    metric.inconsistent_count = inconsistent_count
+    metric.score = get_score(metric.consistent_count, metric.total_count)
+    return metric
+
+
+def get_timeliness(
+    dates: pd.Series,
+    value_count: int,
+    start_date: pd.Timestamp,
+    end_date: pd.Timestamp,
+    reference_time: pd.Timestamp,
+) -> QualityReport.Timeliness:
+    """
+    the values are timely when they are parsed, inside the start and end dates
+    and not after the reference time, unparsed values are not timely.
+    """
+    future = dates > reference_time
+    out_of_window = (dates < start_date) | (dates > end_date)
+    valid_count = int((dates.notna() & ~future & ~out_of_window).sum())
+
+    metric = QualityReport.Timeliness()
+    metric.total_count = value_count
+    metric.valid_count = valid_count
+    metric.invalid_count = value_count - valid_count
+    metric.future_count = int(future.sum())
+    metric.out_of_window_count = int(out_of_window.sum())
+    metric.score = get_score(valid_count, value_count)
+
+    latest = dates.max()
+    if not pd.isna(latest):
+        metric.latest = latest.isoformat()
+        metric.freshness_days = round(
+            (reference_time - latest) / pd.Timedelta(days=1), 2
+        )
+
+    return metric
+
+
+def merge_timeliness(metrics: list) -> QualityReport.Timeliness:
+    """
+    merges the timeliness of parts of the same column, e.g. chunks of rows.
+    """
+    merged = QualityReport.Timeliness()
+    for field in _count_fields[QualityReport.Timeliness]:
+        setattr(merged, field, sum([getattr(metric, field) for metric in metrics]))
+    merged.score = get_score(merged.valid_count, merged.total_count)
+    _set_latest(merged, metrics)
+    return merged
+
+
+def consolidate_timeliness(
+    column_metrics: dict[str, QualityReport.Timeliness],
+) -> QualityReport.Timeliness:
+    consolidated_metrics = consolidate_metrics(QualityReport.Timeliness, column_metrics)
+    _set_latest(consolidated_metrics, column_metrics.values())
+    return consolidated_metrics
+
+
+def _set_latest(target: QualityReport.Timeliness, metrics):
+    latest_metrics = [metric for metric in metrics if metric.latest is not None]
+    if latest_metrics:
+        latest_metric = max(latest_metrics, key=lambda metric: metric.latest)
+        target.latest = latest_metric.latest
+        target.freshness_days = latest_metric.freshness_days
+
+
+def combine_codes(
+    codes_list: list[np.ndarray], uniques_counts: list[int]
+) -> tuple[np.ndarray, int]:
+    """
+    combines the codes of several columns into the codes of their composite
+    values and returns them with the count of composite values, the nulls
+    with the code -1 are a value of their column.
+    """
+    combined = np.zeros(len(codes_list[0]), dtype=np.int64)
+    combined_count = 1
+    for codes, uniques_count in zip(codes_list, uniques_counts):
+        # shifted so the nulls get the code 0
+        value_count = uniques_count + 1
+        if combined_count * value_count >= np.iinfo(np.int64).max:
+            combined, uniques = pd.factorize(combined)
+            combined_count = len(uniques)
+
+        combined = combined * value_count + (codes + 1)
+        combined_count *= value_count
+
+    codes, uniques = pd.factorize(combined)
+    return codes.astype(np.int32, copy=False), len(uniques)
+
+
+def encode_key(columns: list[EncodedColumn]) -> EncodedColumn:
+    """
+    encodes the composite key of the columns, so keys with nulls are compared.
+    """
+    codes, uniques_count = combine_codes(
+        [column.codes for column in columns],
+        [len(column.uniques) for column in columns],
+    )
+    return EncodedColumn(codes=codes, uniques=np.arange(uniques_count))
+
+
+def get_key_uniqueness(
+    key_columns: list[str],
+    columns: list[EncodedColumn],
+    top_count: int = 10,
+) -> QualityReport.KeyUniqueness:
+    key = encode_key(columns)
+
+    metric = QualityReport.KeyUniqueness()
+    metric.key_columns = list(key_columns)
+    metric.total_count = key.total_count
+    metric.unique_count = key.distinct_count
+    metric.duplicate_count = metric.total_count - metric.unique_count
+    metric.duplicate_key_count = int(np.count_nonzero(key.value_counts > 1))
+    metric.score = get_score(metric.unique_count, metric.total_count)
+
+    top_codes = np.argsort(-key.value_counts, kind="stable")[:top_count]
+    top_codes = top_codes[key.value_counts[top_codes] > 1]
+
+    # the values of a key are read from its first row, the rows of all the
+    # top keys are found in a single pass over the codes
+    is_top = np.zeros(len(key.value_counts), dtype=bool)
+    is_top[top_codes] = True
+    top_positions = np.flatnonzero(is_top[key.codes])
+    found_codes, first_indexes = np.unique(key.codes[top_positions], return_index=True)
+    first_positions = dict(zip(found_codes, top_positions[first_indexes]))
+
+    for code in top_codes:
+        count = int(key.value_counts[code])
+        position = int(first_positions[code])
+        values = list()
+        for column in columns:
+            value_code = column.codes[position]
+            value = None if value_code < 0 else column.uniques[value_code]
+            values.append(value.item() if isinstance(value, np.generic) else value)
+
+        metric.top_duplicates.append({"key": values, "count": count})
+
+    return metric
+
+
+def get_invalid_mask(encoded: EncodedColumn, valid_mask: np.ndarray) -> np.ndarray:
+    """
+    returns the rows with an invalid value, the nulls are left to the null
+    mask even when the validator rejects them.
+    """
+    return ~valid_mask[encoded.codes] & (encoded.codes >= 0)
+
+
+def get_row_masks(
+    encoded: EncodedColumn,
+    valid_mask: np.ndarray | None = None,
+    inconsistent_mask: np.ndarray | None = None,
+) -> RowMasks:
+    """
+    expands the masks computed by the checks to the rows.
+    """
+    masks = RowMasks(encoded.total_count)
+    masks.set_mask("null", encoded.codes < 0)
+    if valid_mask is not None:
+        masks.set_mask("invalid", get_invalid_mask(encoded, valid_mask))
+    if inconsistent_mask is not None:
+        masks.set_mask("inconsistent", inconsistent_mask)
+    return masks
+
+
+def profile_column(
+    encoded: EncodedColumn,
+    validator=None,
+    pair: EncodedColumn | None = None,
+    keep_masks: bool = False,
+    uniqueness_precision: int | None = None,
+) -> ColumnProfile:
+    """
+    the uniqueness is estimated from a cardinality sketch of the given
+    precision when it is set, the sketch is kept on the profile.
+    """
+    valid_mask = None if validator is None else get_valid_mask(encoded, validator)
+    inconsistent_mask = None if pair is None else get_inconsistent_mask(encoded, pair)
+
+    profile = ColumnProfile()
+    profile.completeness = get_completeness(encoded)
+    profile.uniqueness = get_uniqueness(encoded)
+    profile.validity = get_validity(encoded, validator, valid_mask)
+    profile.consistency = get_consistency(encoded, pair, inconsistent_mask)
+
+    if uniqueness_precision is not None:
+        # imported here, the sketches import the scores of this module
+        from report_sketches import ColumnSketch
+
+        profile.sketch = ColumnSketch(precision=uniqueness_precision)
+        profile.sketch.add_encoded(encoded)
+        profile.uniqueness = profile.sketch.get_uniqueness()
+
+    if keep_masks:
+        profile.masks = get_row_masks(encoded, valid_mask, inconsistent_mask)
+
+    # once per distinct value and once for the nulls
+    if validator is not None:
+        profile.validator_call_count = len(encoded.uniques) + 1
+
+    return profile
+
+
+def consolidate_metrics(metric_type: type, column_metrics: dict):
+    column_metrics_values = column_metrics.values()
+
+    consolidated_metrics = metric_type()
+    for field in _count_fields[metric_type]:
+        setattr(
+            consolidated_metrics,
+            field,
+            sum([getattr(metrics, field) for metrics in column_metrics_values]),
+        )
+
+    consolidated_metrics.score = (
+        round(
+            sum([metrics.score for metrics in column_metrics_values])
+            / len(column_metrics_values),
+            2,
+        )
+        if len(column_metrics_values)
+        else 0
+    )
+
+    return consolidated_metrics
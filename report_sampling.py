@@ -0,0 +1,178 @@
+import math
+import statistics
+import numpy as np
+import pandas as pd
+from report import QualityReport
+
+
+def sample_dataframe(
+    df: pd.DataFrame,
+    fraction: float = None,
+    size: int = None,
+    stratify_column: str = None,
+    random_state: int = 0,
+) -> pd.DataFrame:
+    if fraction is None and size is None:
+        raise ValueError("either a fraction or a size of the sample is needed")
+
+    total_count = len(df.index)
+    if fraction is None:
+        fraction = min(size / total_count, 1) if total_count else 1
+
+    if stratify_column is None:
+        return df.sample(frac=fraction, random_state=random_state)
+
+    # proportional allocation, every stratum is sampled with the same fraction
+    return df.groupby(stratify_column, dropna=False, group_keys=False).sample(
+        frac=fraction, random_state=random_state
+    )
+
+
+def read_csv_sample(
+    filepath: str, fraction: float, random_state: int = 0, read=pd.read_csv, **kwargs
+) -> tuple[pd.DataFrame, int]:
+    """
+    reads a random fraction of the rows of a csv file without parsing the
+    skipped rows, returns the sample and the row count of the whole file.
+    read is the csv reader, given the skiprows and the kwargs.
+    """
+    if not 0 < fraction <= 1:
+        raise ValueError(f"fraction must be between 0 and 1, got {fraction}")
+
+    rng = np.random.default_rng(random_state)
+    row_count = 0
+
+    def skip_row(index: int) -> bool:
+        nonlocal rng, row_count
+        if index == 0:
+            # every read of the file, e.g. retried untyped, draws the same rows
+            rng = np.random.default_rng(random_state)
+            row_count = 0
+            return False
+
+        row_count += 1
+        return rng.random() >= fraction
+
+    df = read(filepath, skiprows=skip_row, **kwargs)
+    return df, row_count
+
+
+def get_confidence_interval(
+    count: int, sample_count: int, population_count: int, confidence: float = 0.95
+) -> list[float]:
+    """
+    wilson score interval of a proportion in percents, narrowed by the finite
+    population correction when the sample is a large part of the population.
+    """
+    if not 0 < confidence < 1:
+        raise ValueError(f"confidence must be between 0 and 1, got {confidence}")
+
+    if not sample_count:
+        return [0, 100]
+
+    z = statistics.NormalDist().inv_cdf((1 + confidence) / 2)
+    proportion = count / sample_count
+
+    correction = 1
+    if population_count > 1:
+        correction = math.sqrt(
+            max(population_count - sample_count, 0) / (population_count - 1)
+        )
+
+    denominator = 1 + z**2 / sample_count
+    center = (proportion + z**2 / (2 * sample_count)) / denominator
+    margin = (
+        z
+        * math.sqrt(
+            proportion * (1 - proportion) / sample_count + z**2 / (4 * sample_count**2)
+        )
+        / denominator
+        * correction
+    )
+
+    return [
+        round(max(center - margin, 0) * 100, 2),
+        round(min(center + margin, 1) * 100, 2),
+    ]
+
+
+def _set_intervals(
+    consolidated_metric,
+    column_metrics: dict,
+    count_field: str,
+    sample_row_count: int,
+    population_count: int,
+    confidence: float,
+):
+    for metric in column_metrics.values():
+        # the metrics measured on the non-null values only cover the same share
+        # of the population as of the sample
+        column_population_count = (
+            round(population_count * metric.total_count / sample_row_count)
+            if sample_row_count
+            else 0
+        )
+        metric.score_interval = get_confidence_interval(
+            count=getattr(metric, count_field),
+            sample_count=metric.total_count,
+            population_count=column_population_count,
+            confidence=confidence,
+        )
+
+    intervals = [metric.score_interval for metric in column_metrics.values()]
+    consolidated_metric.score_interval = (
+        [
+            round(sum([interval[0] for interval in intervals]) / len(intervals), 2),
+            round(sum([interval[1] for interval in intervals]) / len(intervals), 2),
+        ]
+        if intervals
+        else None
+    )
+
+
+def set_confidence_intervals(
+    report: QualityReport,
+    sample_row_count: int,
+    population_count: int,
+    confidence: float = 0.95,
+):
+    for consolidated_metric, column_metrics, count_field in (
+        (report.completeness, report.completeness_columns, "value_count"),
+        (report.validity, report.validity_columns, "valid_count"),
+        (report.consistency, report.consistency_columns, "consistent_count"),
+    ):
+        _set_intervals(
+            consolidated_metric,
+            column_metrics,
+            count_field,
+            sample_row_count,
+            population_count,
+            confidence,
+        )
+
+
+def needs_full_scan(
+    report: QualityReport, max_interval_width: float = 2.0, score_threshold=None
+) -> bool:
+    """
+    returns whether a sampled report is too uncertain to be relied on, when an
+    interval is wider than max_interval_width points, or when it contains the
+    score_threshold, so the full scan could fall on the other side of it.
+    """
+    for column_metrics in (
+        report.completeness_columns,
+        report.validity_columns,
+        report.consistency_columns,
+    ):
+        for metric in column_metrics.values():
+            if metric.score_interval is None:
+                continue
+
+            low, high = metric.score_interval
+            if high - low > max_interval_width:
+                return True
+
+            if score_threshold is not None and low < score_threshold <= high:
+                return True
+
+    return False
@@ -0,0 +1,128 @@
+import importlib.util
+import pandas as pd
+from report_validations import (
+    is_valid_bool,
+    is_valid_timestamp,
+    is_valid_document_no,
+    is_valid_type,
+    is_valid_blanket_order_no,
+    is_valid_vat_identifier,
+    is_valid_measure_code,
+    timestamp_pattern,
+)
+
+# arrow backed strings take a fraction of the memory of python objects, they
+# are only used when pyarrow is installed
+_string_dtype = (
+    "string[pyarrow]" if importlib.util.find_spec("pyarrow") is not None else None
+)
+
+# columns of the validators not listed here are left to the type inference,
+# the numbers are already read as numpy columns
+validator_dtypes = {
+    is_valid_type: "category",
+    is_valid_vat_identifier: "category",
+    is_valid_measure_code: "category",
+    is_valid_document_no: _string_dtype,
+    is_valid_blanket_order_no: _string_dtype,
+    is_valid_bool: "boolean",
+    is_valid_timestamp: "timestamp",
+}
+
+# converted after reading, only when no value changes its validity
+_converted_dtypes = ("boolean", "timestamp")
+
+
+def get_schema(validation_map: dict[str, any]) -> dict[str, str]:
+    schema = dict[str, str]()
+    for column_name, validator in validation_map.items():
+        dtype = validator_dtypes.get(validator)
+        if dtype is not None:
+            schema[column_name] = dtype
+    return schema
+
+
+def _to_boolean(column_df: pd.Series) -> pd.Series | None:
+    if column_df.dtype == bool:
+        return column_df.astype("boolean")
+
+    # the parser leaves every value a string when any of them is not a bool
+    if column_df.dtype != object:
+        return None
+
+    uniques = pd.unique(column_df.dropna())
+    if not all(type(value) is bool for value in uniques):
+        return None
+
+    return column_df.astype("boolean")
+
+
+def _to_timestamp(column_df: pd.Series) -> pd.Series | None:
+    if column_df.dtype != object:
+        return None
+
+    # dates repeat a lot, the distinct values are checked and parsed once
+    codes, uniques = pd.factorize(column_df, use_na_sentinel=True)
+    uniques = pd.Series(uniques, dtype=object)
+    if not uniques.map(type).eq(str).all():
+        return None
+
+    # the invalid values would become nulls
+    if not uniques.str.fullmatch(timestamp_pattern).all():
+        return None
+
+    dates = pd.to_datetime(uniques, format="ISO8601", errors="coerce", utc=True)
+    if dates.isna().any():
+        return None
+
+    dates = pd.DatetimeIndex(dates).take(codes, allow_fill=True, fill_value=pd.NaT)
+    return pd.Series(dates, index=column_df.index, name=column_df.name)
+
+
+def convert_columns(df: pd.DataFrame, schema: dict[str, str]) -> pd.DataFrame:
+    """
+    converts the boolean and timestamp columns of the schema in place, the
+    columns with a value which would not survive the conversion are kept.
+    """
+    for column_name, dtype in schema.items():
+        if dtype not in _converted_dtypes or column_name not in df:
+            continue
+
+        if dtype == "boolean":
+            column_df = _to_boolean(df[column_name])
+        else:
+            column_df = _to_timestamp(df[column_name])
+
+        if column_df is not None:
+            df[column_name] = column_df
+
+    return df
+
+
+def read_dataset(
+    filepath: str,
+    validation_map: dict[str, any],
+    usecols: list[str] = None,
+    **kwargs,
+) -> pd.DataFrame:
+    """
+    reads a dataset with the dtypes of the schema of its validation map,
+    falls back to the plain type inference when the typed read fails.
+    """
+    schema = get_schema(validation_map)
+    if usecols is not None:
+        schema = {name: dtype for name, dtype in schema.items() if name in usecols}
+
+    dtypes = {
+        column_name: dtype
+        for column_name, dtype in schema.items()
+        if dtype not in _converted_dtypes
+    }
+
+    try:
+        df = pd.read_csv(filepath, dtype=dtypes, usecols=usecols, **kwargs)
+    except (ValueError, TypeError) as error:
+        print(f"warning: typed read of {filepath} failed, reading untyped: {error}")
+        return pd.read_csv(filepath, usecols=usecols, **kwargs)
+
+    return convert_columns(df, schema)
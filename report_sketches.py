@@ -0,0 +1,439 @@
+import math
+import numpy as np
+import pandas as pd
+from report import QualityReport
+from report_profiler import EncodedColumn, get_score
+
+
+def hash_values(values) -> np.ndarray:
+    """
+    hashes non-null values so that equal values hash equally across chunks and
+    runs, even when they were parsed with different dtypes.
+    """
+    values = np.asarray(values)
+
+    # integers are hashed as 64 bit integers, distinct ids above 2 ** 53 would
+    # share a float, and whole floats in their range like the same integers
+    if values.dtype.kind == "i":
+        values = values.astype(np.int64)
+    elif values.dtype.kind == "u":
+        values = values.astype(np.uint64)
+    elif values.dtype.kind == "f":
+        values = values.astype(np.float64)
+        whole = (values % 1 == 0) & (np.abs(values) < 2.0**63)
+        if whole.all():
+            values = values.astype(np.int64)
+        elif whole.any():
+            hashes = pd.util.hash_array(values, categorize=False)
+            hashes[whole] = pd.util.hash_array(
+                values[whole].astype(np.int64), categorize=False
+            )
+            return hashes
+    elif values.dtype.kind in "mM":
+        values = values.view(np.int64)
+    else:
+        # hash_array hashes the str of the values which are not strings
+        values = values.astype(object)
+
+    return pd.util.hash_array(values, categorize=False)
+
+
+# precisions of the sketches, from 16 to 262144 registers
+min_precision = 4
+max_precision = 18
+
+
+class HyperLogLog:
+    """
+    mergeable cardinality sketch over 64 bit hashes, the relative standard
+    error of the estimate is about 1.04 / sqrt(2 ** precision).
+    """
+
+    precision: int
+    registers: np.ndarray
+
+    def __init__(self, precision: int = 14):
+        if not min_precision <= precision <= max_precision:
+            raise ValueError(
+                f"precision must be between {min_precision} and {max_precision},"
+                f" got {precision}"
+            )
+
+        self.precision = precision
+        self.registers = np.zeros(2**precision, dtype=np.uint8)
+
+    @staticmethod
+    def get_precision(error: float) -> int:
+        if not error > 0:
+            raise ValueError(f"the uniqueness error must be positive, got {error}")
+
+        # a larger error is met by the smallest sketch
+        precision = max(math.ceil(math.log2((1.04 / error) ** 2)), min_precision)
+        if precision > max_precision:
+            raise ValueError(
+                f"the uniqueness error {error} needs a precision above"
+                f" {max_precision}"
+            )
+        return precision
+
+    def add(self, hashes: np.ndarray):
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        precision = self.precision
+        remaining_bits = 64 - precision
+
+        indexes = (hashes >> np.uint64(remaining_bits)).astype(np.intp)
+        remaining = hashes & np.uint64((1 << remaining_bits) - 1)
+        ranks = remaining_bits - _get_bit_lengths(remaining) + 1
+
+        np.maximum.at(self.registers, indexes, ranks.astype(np.uint8))
+
+    def merge(self, other: "HyperLogLog"):
+        if other.precision != self.precision:
+            raise ValueError(
+                f"cannot merge sketches of precision {self.precision} "
+                f"and {other.precision}"
+            )
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def count(self) -> int:
+        register_count = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / register_count)
+        estimate = (
+            alpha
+            * register_count**2
+            / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+        )
+
+        # linear counting is more accurate while many registers are empty
+        empty_count = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * register_count and empty_count:
+            estimate = register_count * math.log(register_count / empty_count)
+
+        return int(round(estimate))
+
+    def close(self):
+        pass
+
+
+def _get_bit_lengths(values: np.ndarray) -> np.ndarray:
+    # the halves are below 2 ** 32, so their float exponents are exact
+    high = (values >> np.uint64(32)).astype(np.float64)
+    low = (values & np.uint64(0xFFFFFFFF)).astype(np.float64)
+    return np.where(high > 0, 32 + np.frexp(high)[1], np.frexp(low)[1])
+
+
+class ColumnSketch:
+    total_count: int
+    null_count: int
+    distinct: HyperLogLog
+
+    def __init__(self, precision: int = 14):
+        self.total_count = 0
+        self.null_count = 0
+        self.distinct = HyperLogLog(precision=precision)
+
+    def add(self, column_df: pd.Series):
+        non_null_df = column_df.dropna()
+        self.total_count += len(column_df.index)
+        self.null_count += len(column_df.index) - len(non_null_df.index)
+        self.distinct.add(hash_values(non_null_df.to_numpy()))
+
+    def add_encoded(self, encoded: EncodedColumn):
+        # only the distinct values of the encoding are hashed
+        self.total_count += encoded.total_count
+        self.null_count += encoded.null_count
+        self.distinct.add(
+            hash_values(np.asarray(encoded.uniques)[encoded.value_counts > 0])
+        )
+
+    def merge(self, other: "ColumnSketch"):
+        self.total_count += other.total_count
+        self.null_count += other.null_count
+        self.distinct.merge(other.distinct)
+
+    def get_uniqueness(self) -> QualityReport.Uniqueness:
+        # the estimate can exceed the value count on small columns
+        value_count = self.total_count - self.null_count
+        unique_count = min(self.distinct.count(), value_count)
+        unique_count += 1 if self.null_count else 0
+
+        metric = QualityReport.Uniqueness()
+        metric.total_count = self.total_count
+        metric.unique_count = unique_count
+        metric.duplicate_count = self.total_count - unique_count
+        metric.score = get_score(unique_count, self.total_count)
+        metric.is_estimate = True
+        return metric
+
+
+class UniquenessSketches:
+    """
+    per column uniqueness sketches of a dataset, which can be persisted and
+    merged, e.g. daily sketches into weekly uniqueness figures.
+    """
+
+    precision: int
+    columns: dict[str, ColumnSketch]
+
+    def __init__(self, precision: int = 14):
+        self.precision = precision
+        self.columns = dict()
+
+    def add(self, df: pd.DataFrame):
+        for column_name in df:
+            column_sketch = self.columns.get(column_name)
+            if column_sketch is None:
+                column_sketch = ColumnSketch(precision=self.precision)
+                self.columns[column_name] = column_sketch
+
+            column_sketch.add(df[column_name])
+
+    def merge(self, other: "UniquenessSketches"):
+        for column_name, other_sketch in other.columns.items():
+            column_sketch = self.columns.get(column_name)
+            if column_sketch is None:
+                column_sketch = ColumnSketch(precision=self.precision)
+                self.columns[column_name] = column_sketch
+
+            column_sketch.merge(other_sketch)
+
+    def get_uniqueness_columns(self) -> dict[str, QualityReport.Uniqueness]:
+        return {
+            column_name: column_sketch.get_uniqueness()
+            for column_name, column_sketch in self.columns.items()
+        }
+
+    def save(self, filepath: str):
+        column_names = list(self.columns.keys())
+        column_sketches = self.columns.values()
+
+        np.savez_compressed(
+            filepath,
+            precision=np.array(self.precision),
+            column_names=np.array(column_names, dtype=str),
+            total_counts=np.array([s.total_count for s in column_sketches]),
+            null_counts=np.array([s.null_count for s in column_sketches]),
+            registers=np.array(
+                [s.distinct.registers for s in column_sketches], dtype=np.uint8
+            ).reshape(len(column_names), 2**self.precision),
+        )
+
+    @staticmethod
+    def load(filepath: str) -> "UniquenessSketches":
+        with np.load(filepath) as data:
+            sketches = UniquenessSketches(precision=int(data["precision"]))
+
+            for index, column_name in enumerate(data["column_names"]):
+                column_sketch = ColumnSketch(precision=sketches.precision)
+                column_sketch.total_count = int(data["total_counts"][index])
+                column_sketch.null_count = int(data["null_counts"][index])
+                column_sketch.distinct.registers = data["registers"][index].copy()
+                sketches.columns[str(column_name)] = column_sketch
+
+        return sketches
+
+
+def merge_sketch_files(filepaths: list[str]) -> UniquenessSketches:
+    sketches = None
+    for filepath in filepaths:
+        file_sketches = UniquenessSketches.load(filepath)
+        if sketches is None:
+            sketches = file_sketches
+        else:
+            sketches.merge(file_sketches)
+
+    if sketches is None:
+        return UniquenessSketches()
+
+    return sketches
+
+
+class TopKSketch:
+    """
+    mergeable misra gries summary of the most frequent values, the count of
+    every value is underestimated by at most error.
+    """
+
+    capacity: int
+    counts: dict[str, int]
+    total_count: int
+    error: int
+
+    def __init__(self, capacity: int = 100):
+        self.capacity = capacity
+        self.counts = dict()
+        self.total_count = 0
+        self.error = 0
+
+    def add(self, column_df: pd.Series):
+        value_counts = column_df.dropna().astype(str).value_counts(sort=False)
+        self._add_counts(value_counts)
+
+    def merge(self, other: "TopKSketch"):
+        self.error += other.error
+        self._add_counts(pd.Series(other.counts, dtype=np.int64))
+
+    def _add_counts(self, value_counts: pd.Series):
+        self.total_count += int(value_counts.sum())
+        if self.counts:
+            value_counts = value_counts.add(
+                pd.Series(self.counts, dtype=np.int64), fill_value=0
+            )
+
+        counts = value_counts.to_numpy(dtype=np.int64)
+        if len(counts) > self.capacity:
+            # the count of the first value past the capacity is taken off all
+            # the values, which keeps the ones above it
+            threshold = int(
+                np.partition(counts, -(self.capacity + 1))[-(self.capacity + 1)]
+            )
+            value_counts = value_counts[counts > threshold] - threshold
+            self.error += threshold
+
+        self.counts = dict(zip(value_counts.index, value_counts.astype(int).tolist()))
+
+    def get_shares(self) -> dict[str, float]:
+        if not self.total_count:
+            return dict()
+        return {value: count / self.total_count for value, count in self.counts.items()}
+
+    def to_dict(self) -> dict:
+        return {
+            "capacity": self.capacity,
+            "counts": self.counts,
+            "total_count": self.total_count,
+            "error": self.error,
+        }
+
+    @staticmethod
+    def from_dict(data: dict) -> "TopKSketch":
+        sketch = TopKSketch(capacity=data["capacity"])
+        sketch.counts = dict(data["counts"])
+        sketch.total_count = data["total_count"]
+        sketch.error = data["error"]
+        return sketch
+
+
+class QuantileSketch:
+    """
+    mergeable quantile sketch of numbers in logarithmic buckets, like ddsketch,
+    every quantile is within relative_accuracy of the exact one.
+    """
+
+    relative_accuracy: float
+    positive_counts: dict[int, int]
+    negative_counts: dict[int, int]
+    zero_count: int
+    count: int
+    min_value: float | None
+    max_value: float | None
+
+    def __init__(self, relative_accuracy: float = 0.01):
+        self.relative_accuracy = relative_accuracy
+        self.positive_counts = dict()
+        self.negative_counts = dict()
+        self.zero_count = 0
+        self.count = 0
+        self.min_value = None
+        self.max_value = None
+
+    @property
+    def _gamma(self) -> float:
+        return (1 + self.relative_accuracy) / (1 - self.relative_accuracy)
+
+    def add(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        values = values[np.isfinite(values)]
+        if not len(values):
+            return
+
+        log_gamma = math.log(self._gamma)
+        for counts, magnitudes in (
+            (self.positive_counts, values[values > 0]),
+            (self.negative_counts, -values[values < 0]),
+        ):
+            indexes = np.ceil(np.log(magnitudes) / log_gamma).astype(np.int64)
+            bucket_indexes, bucket_counts = np.unique(indexes, return_counts=True)
+            for index, count in zip(bucket_indexes.tolist(), bucket_counts.tolist()):
+                counts[index] = counts.get(index, 0) + count
+
+        self.zero_count += int(np.count_nonzero(values == 0))
+        self.count += int(len(values))
+        self._update_range(float(values.min()), float(values.max()))
+
+    def merge(self, other: "QuantileSketch"):
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError(
+                f"cannot merge sketches of accuracy {self.relative_accuracy} "
+                f"and {other.relative_accuracy}"
+            )
+        for counts, other_counts in (
+            (self.positive_counts, other.positive_counts),
+            (self.negative_counts, other.negative_counts),
+        ):
+            for index, count in other_counts.items():
+                counts[index] = counts.get(index, 0) + count
+
+        self.zero_count += other.zero_count
+        self.count += other.count
+        if other.count:
+            self._update_range(other.min_value, other.max_value)
+
+    def _update_range(self, min_value: float, max_value: float):
+        if self.min_value is None or min_value < self.min_value:
+            self.min_value = min_value
+        if self.max_value is None or max_value > self.max_value:
+            self.max_value = max_value
+
+    def get_quantile(self, quantile: float) -> float | None:
+        if not self.count:
+            return None
+
+        rank = quantile * (self.count - 1)
+        gamma = self._gamma
+
+        # the buckets in increasing order of their values
+        buckets = [
+            (-2 * gamma**index / (gamma + 1), count)
+            for index, count in sorted(self.negative_counts.items(), reverse=True)
+        ]
+        if self.zero_count:
+            buckets.append((0.0, self.zero_count))
+        buckets.extend(
+            (2 * gamma**index / (gamma + 1), count)
+            for index, count in sorted(self.positive_counts.items())
+        )
+
+        cumulative_count = 0
+        for value, count in buckets:
+            cumulative_count += count
+            if cumulative_count > rank:
+                return min(max(value, self.min_value), self.max_value)
+        return self.max_value
+
+    def to_dict(self) -> dict:
+        return {
+            "relative_accuracy": self.relative_accuracy,
+            "positive_counts": self.positive_counts,
+            "negative_counts": self.negative_counts,
+            "zero_count": self.zero_count,
+            "count": self.count,
+            "min_value": self.min_value,
+            "max_value": self.max_value,
+        }
+
+    @staticmethod
+    def from_dict(data: dict) -> "QuantileSketch":
+        sketch = QuantileSketch(relative_accuracy=data["relative_accuracy"])
+        # json keys are strings
+        sketch.positive_counts = {
+            int(index): count for index, count in data["positive_counts"].items()
+        }
+        sketch.negative_counts = {
+            int(index): count for index, count in data["negative_counts"].items()
+        }
+        sketch.zero_count = data["zero_count"]
+        sketch.count = data["count"]
+        sketch.min_value = data["min_value"]
+        sketch.max_value = data["max_value"]
+        return sketch
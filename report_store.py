@@ -0,0 +1,318 @@
+import os
+import sqlite3
+import importlib
+import importlib.util
+import numpy as np
+import pandas as pd
+from contextlib import closing
+from report import QualityReport
+from report_profiler import get_score
+
+# duckdb is optional, sqlite is always available
+backends = ("sqlite", "duckdb")
+
+# indexed in sqlite and sorted by in duckdb when the dataset has them
+default_index_columns = ["Sell_to_Customer_No", "Posting_Date", "Shipment_Date"]
+
+_sources_schema = """
+create table if not exists sources (
+    table_name text primary key,
+    source text not null,
+    signature text not null
+)
+"""
+
+
+def _quote(name: str) -> str:
+    if '"' in name:
+        raise ValueError(f"invalid name {name}")
+    return f'"{name}"'
+
+
+def is_available(backend: str) -> bool:
+    if backend == "sqlite":
+        return True
+    return importlib.util.find_spec(backend) is not None
+
+
+def get_source_signature(filepath: str, kind: str = "") -> str:
+    stat = os.stat(filepath)
+    return f"{kind}:{stat.st_size}:{stat.st_mtime_ns}"
+
+
+class DatasetStore:
+    """
+    embedded database of the datasets, loaded once from their csv files and
+    queried with pushed down aggregates instead of scanning the csv again.
+    """
+
+    backend: str
+    _filepath: str
+
+    def __init__(self, filepath: str, backend: str = "sqlite"):
+        if backend not in backends:
+            raise ValueError(f"unknown backend {backend}")
+        if not is_available(backend):
+            raise ValueError(f"backend {backend} is not installed")
+
+        self.backend = backend
+        self._filepath = filepath
+
+        dirname = os.path.dirname(filepath)
+        if dirname:
+            os.makedirs(dirname, exist_ok=True)
+
+        with closing(self._connect()) as connection:
+            if backend == "sqlite":
+                connection.execute("pragma journal_mode = wal")
+            connection.execute(_sources_schema)
+            self._commit(connection)
+
+    def _connect(self):
+        if self.backend == "duckdb":
+            return importlib.import_module("duckdb").connect(self._filepath)
+        return sqlite3.connect(self._filepath, timeout=30)
+
+    def _commit(self, connection):
+        # duckdb runs every statement in its own transaction
+        if self.backend == "sqlite":
+            connection.commit()
+
+    def query(self, sql: str, parameters: tuple = ()) -> pd.DataFrame:
+        with closing(self._connect()) as connection:
+            if self.backend == "duckdb":
+                return connection.execute(sql, list(parameters)).df()
+            return pd.read_sql_query(sql, connection, params=parameters)
+
+    def has_table(self, table_name: str) -> bool:
+        return table_name in self.get_table_names()
+
+    def get_table_names(self) -> list[str]:
+        if self.backend == "duckdb":
+            sql = "select table_name as name from information_schema.tables"
+        else:
+            sql = "select name from sqlite_master where type = 'table'"
+        return self.query(sql)["name"].tolist()
+
+    def get_column_names(self, table_name: str) -> list[str]:
+        return list(self.query(f"select * from {_quote(table_name)} limit 0"))
+
+    def get_row_count(self, table_name: str) -> int:
+        return int(self.query(f"select count(*) from {_quote(table_name)}").iat[0, 0])
+
+    def is_loaded(self, table_name: str, signature: str) -> bool:
+        if not self.has_table(table_name):
+            return False
+
+        sources = self.query(
+            "select signature from sources where table_name = ?", (table_name,)
+        )
+        return len(sources.index) > 0 and sources.iat[0, 0] == signature
+
+    def load_csv(
+        self,
+        table_name: str,
+        filepath: str,
+        index_columns: list[str] = None,
+        chunk_size: int = 100_000,
+        transform=None,
+        **kwargs,
+    ) -> bool:
+        """
+        loads the csv file into the table unless it was already loaded from
+        the same file, returns whether it was loaded. transform is applied to
+        every chunk before it is written, the kwargs are passed to read_csv.
+        """
+        if index_columns is None:
+            index_columns = default_index_columns
+
+        kind = getattr(transform, "__qualname__", "") if transform else ""
+        signature = get_source_signature(filepath, kind=kind)
+        if self.is_loaded(table_name, signature):
+            return False
+
+        with closing(self._connect()) as connection:
+            connection.execute(f"drop table if exists {_quote(table_name)}")
+
+            if self.backend == "duckdb" and transform is None and not kwargs:
+                self._load_duckdb_csv(connection, table_name, filepath, index_columns)
+            else:
+                for chunk in pd.read_csv(filepath, chunksize=chunk_size, **kwargs):
+                    if transform is not None:
+                        chunk = transform(chunk)
+                    self._append(connection, table_name, chunk)
+                self._index(connection, table_name, index_columns)
+
+            connection.execute(
+                "delete from sources where table_name = ?", (table_name,)
+            )
+            connection.execute(
+                "insert into sources values (?, ?, ?)",
+                (table_name, os.path.abspath(filepath), signature),
+            )
+            self._commit(connection)
+
+        return True
+
+    def load_dataframe(
+        self, table_name: str, df: pd.DataFrame, index_columns: list[str] = None
+    ):
+        if index_columns is None:
+            index_columns = default_index_columns
+
+        with closing(self._connect()) as connection:
+            connection.execute(f"drop table if exists {_quote(table_name)}")
+            connection.execute(
+                "delete from sources where table_name = ?", (table_name,)
+            )
+            self._append(connection, table_name, df)
+            self._index(connection, table_name, index_columns)
+            self._commit(connection)
+
+    def _append(self, connection, table_name: str, df: pd.DataFrame):
+        if self.backend == "sqlite":
+            df.to_sql(table_name, connection, if_exists="append", index=False)
+            return
+
+        connection.register("chunk_df", df)
+        try:
+            if table_name in self._get_connection_tables(connection):
+                connection.execute(
+                    f"insert into {_quote(table_name)} select * from chunk_df"
+                )
+            else:
+                connection.execute(
+                    f"create table {_quote(table_name)} as select * from chunk_df"
+                )
+        finally:
+            connection.unregister("chunk_df")
+
+    def _load_duckdb_csv(
+        self, connection, table_name: str, filepath: str, index_columns: list[str]
+    ):
+        connection.execute(
+            f"create table {_quote(table_name)} as"
+            " select * from read_csv_auto(?, header = true)",
+            [filepath],
+        )
+        self._index(connection, table_name, index_columns)
+
+    def _index(self, connection, table_name: str, index_columns: list[str]):
+        if self.backend == "duckdb":
+            # the min max zone maps of a sorted table skip the row groups
+            # outside of the filtered ranges, like an index would
+            column_names = self._get_connection_columns(connection, table_name)
+            sort_columns = [name for name in index_columns if name in column_names]
+            if sort_columns:
+                connection.execute(
+                    f"create or replace table {_quote(table_name)} as"
+                    f" select * from {_quote(table_name)}"
+                    f" order by {', '.join(map(_quote, sort_columns))}"
+                )
+            return
+
+        column_names = self._get_connection_columns(connection, table_name)
+        for column_name in index_columns:
+            if column_name not in column_names:
+                continue
+            connection.execute(
+                "create index if not exists"
+                f" {_quote(f'{table_name}_{column_name}')}"
+                f" on {_quote(table_name)} ({_quote(column_name)})"
+            )
+
+    def _get_connection_tables(self, connection) -> list[str]:
+        cursor = connection.execute("select table_name from information_schema.tables")
+        return [row[0] for row in cursor.fetchall()]
+
+    def _get_connection_columns(self, connection, table_name: str) -> list[str]:
+        cursor = connection.execute(f"select * from {_quote(table_name)} limit 0")
+        return [description[0] for description in cursor.description]
+
+    def read_table(self, table_name: str, columns: list[str] = None) -> pd.DataFrame:
+        selection = ", ".join(map(_quote, columns)) if columns else "*"
+        return self.query(f"select {selection} from {_quote(table_name)}")
+
+    def get_value_counts(self, table_name: str, column_name: str) -> pd.DataFrame:
+        """
+        returns the distinct values of the column with their row counts, the
+        nulls as a single NaN value.
+        """
+        quoted = _quote(column_name)
+        counts = self.query(
+            f"select {quoted} as value, count(*) as count"
+            f" from {_quote(table_name)} group by {quoted}"
+        )
+        counts["value"] = (
+            counts["value"].astype(object).where(counts["value"].notna(), np.nan)
+        )
+        return counts
+
+    def get_column_counts(
+        self, table_name: str, columns: list[str] = None, distinct: bool = True
+    ) -> pd.DataFrame:
+        """
+        returns the total, null and distinct count of every column from a
+        single aggregate query, indexed by the column names, the distinct
+        counts are left out unless distinct is set.
+        """
+        if columns is None:
+            columns = self.get_column_names(table_name)
+
+        aggregates = ["count(*)"]
+        for column_name in columns:
+            quoted = _quote(column_name)
+            aggregates.append(f"count({quoted})")
+            aggregates.append(f"count(distinct {quoted})" if distinct else "0")
+
+        counts = self.query(
+            f"select {', '.join(aggregates)} from {_quote(table_name)}"
+        ).iloc[0]
+        counts = [int(count) for count in counts]
+
+        total_count = counts[0]
+        rows = list()
+        for index, column_name in enumerate(columns):
+            value_count = counts[1 + 2 * index]
+            null_count = total_count - value_count
+            rows.append(
+                {
+                    "column_name": column_name,
+                    "total_count": total_count,
+                    "null_count": null_count,
+                    # nulls are counted as one distinct value, like pandas
+                    "distinct_count": counts[2 + 2 * index] + (1 if null_count else 0),
+                }
+            )
+
+        return pd.DataFrame(
+            rows, columns=["column_name", "total_count", "null_count", "distinct_count"]
+        ).set_index("column_name")
+
+
+def get_completeness_columns(
+    counts: pd.DataFrame,
+) -> dict[str, QualityReport.Completeness]:
+    column_metrics = dict[str, QualityReport.Completeness]()
+    for column_name, row in counts.iterrows():
+        metrics = QualityReport.Completeness()
+        metrics.total_count = int(row["total_count"])
+        metrics.null_count = int(row["null_count"])
+        metrics.value_count = metrics.total_count - metrics.null_count
+        metrics.score = get_score(metrics.value_count, metrics.total_count)
+        column_metrics[column_name] = metrics
+    return column_metrics
+
+
+def get_uniqueness_columns(
+    counts: pd.DataFrame,
+) -> dict[str, QualityReport.Uniqueness]:
+    column_metrics = dict[str, QualityReport.Uniqueness]()
+    for column_name, row in counts.iterrows():
+        metrics = QualityReport.Uniqueness()
+        metrics.total_count = int(row["total_count"])
+        metrics.unique_count = int(row["distinct_count"])
+        metrics.duplicate_count = metrics.total_count - metrics.unique_count
+        metrics.score = get_score(metrics.unique_count, metrics.total_count)
+        column_metrics[column_name] = metrics
+    return column_metrics
@@ -0,0 +1,122 @@
+import io
+import os
+import time
+import threading
+import pandas as pd
+from report import QualityReport
+from report_chunked import ChunkedQualityReportGenerator
+from report_exporter import QualityReportExporter
+
+
+def get_partial_report_filepath(report_filepath: str) -> str:
+    root, extension = os.path.splitext(report_filepath)
+    return f"{root}.partial{extension or '.csv'}"
+
+
+def read_page(csv_data: str) -> pd.DataFrame:
+    # the values are kept as text like the chunks of the chunked reports, the
+    # types inferred from a single page would differ between the pages
+    return pd.read_csv(io.StringIO(csv_data), dtype=str)
+
+
+class StreamingQualityReport:
+    """
+    quality report of the pages of a dataset, updated as each page arrives in
+    any order from any thread. the report of the pages seen so far is written
+    to the partial report file every interval seconds, and the final report
+    once all the pages were added. the pages are reported before the merge,
+    with the duplicate rows it drops.
+    """
+
+    report_filepath: str
+    interval: float
+    page_count: int
+
+    _generator: ChunkedQualityReportGenerator
+    _exporter: QualityReportExporter
+    _lock: threading.Lock
+    _last_write_time: float
+
+    def __init__(
+        self,
+        name: str,
+        report_filepath: str,
+        validation_map: dict[str, any],
+        column_pairing_map: dict[str, str],
+        date_columns: list = None,
+        interval: float = 30,
+        uniqueness_error: float = None,
+    ):
+        self.report_filepath = report_filepath
+        self.interval = interval
+        self.page_count = 0
+
+        self._generator = ChunkedQualityReportGenerator(
+            uniqueness_error=uniqueness_error
+        )
+        self._generator.set_report_name(name)
+        self._generator.set_validation_map(validation_map)
+        self._generator.set_column_pairing_map(column_pairing_map)
+        self._generator.set_date_columns(date_columns or [])
+
+        self._exporter = QualityReportExporter()
+        self._lock = threading.Lock()
+        self._last_write_time = time.monotonic()
+
+    def add_page(self, df: pd.DataFrame, row_offset: int):
+        """
+        adds the rows of a page starting at row_offset of the dataset, the
+        offsets keep the first seen values of the consistency independent of
+        the order the pages arrive in.
+        """
+        with self._lock:
+            self._generator.set_row_offset(row_offset)
+            self._generator.add_chunk(df)
+            self.page_count += 1
+
+            if time.monotonic() - self._last_write_time < self.interval:
+                return
+            self._last_write_time = time.monotonic()
+
+            # written under the lock, an older report never replaces a newer one
+            report = self._generator.generate_report()
+            self._write(report, get_partial_report_filepath(self.report_filepath))
+
+    def add_csv_page(self, csv_data: str, row_offset: int):
+        self.add_page(read_page(csv_data), row_offset)
+
+    def get_report(self) -> QualityReport:
+        with self._lock:
+            return self._generator.generate_report()
+
+    def finish(self, is_complete: bool = True) -> QualityReport:
+        """
+        writes the final report and removes the partial one, or only updates
+        the partial one when pages are missing from the report.
+        """
+        with self._lock:
+            report = self._generator.generate_report()
+            self._generator.close()
+
+            if not is_complete:
+                self._write(report, get_partial_report_filepath(self.report_filepath))
+                return report
+
+            self._write(report, self.report_filepath)
+
+            partial_filepath = get_partial_report_filepath(self.report_filepath)
+            if os.path.exists(partial_filepath):
+                os.remove(partial_filepath)
+
+        return report
+
+    def _write(self, report: QualityReport, filepath: str):
+        dirname = os.path.dirname(filepath)
+        if dirname:
+            os.makedirs(dirname, exist_ok=True)
+
+        # readers of the live report never see a half written file
+        temp_filepath = f"{filepath}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_filepath, mode="w", encoding="utf8") as file:
+            file.write(self._exporter.to_csv(report))
+        os.replace(temp_filepath, filepath)
@@ -1,16 +1,25 @@
 import datetime
 import re
 import pandas as pd
-from datetime import datetime
+from datetime import datetime, timezone
 
 start_date = "2009-01-01"
 end_date = "3000-12-31"
+date_formats = ("%d-%m-%Y", "%Y-%m-%d")
+timestamp_pattern = r"^\d{4}-\d{2}-\d{2}T.*"
 
 
 def null_validation(value) -> bool:
     return True
 
 
+def apply_validator(validator, value) -> bool:
+    try:
+        return bool(validator(value))
+    except Exception:
+        return False
+
+
 def is_valid_email(email) -> bool:
     if pd.isna(email):
         return False
@@ -57,13 +66,17 @@ def is_valid_bool(value) -> bool:
 
 
 def is_valid_date(date) -> bool:
+    return parse_date(date) is not None
+
+
+def parse_date(date) -> datetime | None:
     date = str(date)
-    try:
-        datetime.strptime(date, "%d-%m-%Y")
-        datetime.strptime(date, "%Y-%m-%d")
-        return True
-    except:
-        return False
+    for date_format in date_formats:
+        try:
+            return datetime.strptime(date, date_format)
+        except ValueError:
+            continue
+    return None
 
 
 def convert_date(date):
@@ -75,6 +88,31 @@ def convert_date(date):
     return date
 
 
+def parse_dates(column_df: pd.Series) -> pd.Series:
+    """
+    parses a whole column of iso 8601 timestamps or dates in any of the
+    date_formats at once, the values which cannot be parsed become NaT.
+    """
+    if pd.api.types.is_datetime64_any_dtype(column_df.dtype):
+        dates = column_df
+    else:
+        values = column_df.astype("string")
+        dates = pd.to_datetime(values, format="ISO8601", errors="coerce", utc=True)
+
+        for date_format in date_formats:
+            unparsed = dates.isna() & values.notna()
+            if not unparsed.any():
+                break
+            dates[unparsed] = pd.to_datetime(
+                values[unparsed], format=date_format, errors="coerce", utc=True
+            )
+
+    if getattr(dates.dt, "tz", None) is not None:
+        dates = dates.dt.tz_convert(None)
+
+    return dates
+
+
 def is_valid_status(status) -> bool:
     status = str(status)
     return status.lower() in ("draft", "open", "paid")
@@ -94,10 +132,26 @@ def is_valid_type(value):
     return value.lower() in ["resource", "g/l account"]
 
 
+def parse_timestamp(date) -> datetime | None:
+    """
+    parses an iso 8601 timestamp or a date in any of the date_formats, like
+    parse_dates for a single value, to a naive utc datetime.
+    """
+    try:
+        timestamp = datetime.fromisoformat(str(date))
+    except ValueError:
+        return parse_date(date)
+
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+    return timestamp
+
+
 def is_valid_timeframe(date) -> bool:
-    return convert_date(end_date) >= convert_date(date) and convert_date(
-        date
-    ) >= convert_date(start_date)
+    date = parse_timestamp(date)
+    if date is None:
+        return False
+    return parse_date(start_date) <= date <= parse_date(end_date)
 
 
 def is_valid_contact(name) -> bool:
@@ -105,9 +159,12 @@ def is_valid_contact(name) -> bool:
 
 
 def is_valid_timestamp(date) -> bool:
+    # timestamps parsed while loading were validated as text beforehand
+    if isinstance(date, datetime):
+        return not pd.isna(date)
+
     date = str(date)
-    pattern = r"^\d{4}-\d{2}-\d{2}T.*"
-    return re.fullmatch(pattern, date) is not None
+    return re.fullmatch(timestamp_pattern, date) is not None
 
 
 def is_valid_blanket_order_no(value):
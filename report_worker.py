@@ -0,0 +1,377 @@
+import os
+import json
+import time
+import uuid
+import socket
+import threading
+import traceback
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+
+# a job moves between these directories of the spool by atomic renames, so
+# every job is claimed by a single worker
+spool_states = ("incoming", "running", "done", "failed")
+
+job_types = ("report", "categorize")
+
+
+def get_job_owner() -> dict:
+    return {"host": socket.gethostname(), "pid": os.getpid()}
+
+
+def is_stopped_owner(owner: dict | None) -> bool:
+    """
+    whether the worker process owning a job is known to be stopped, only the
+    processes of this host can be checked.
+    """
+    if owner is None or owner.get("host") != socket.gethostname():
+        return False
+
+    try:
+        os.kill(owner["pid"], 0)
+    except ProcessLookupError:
+        return True
+    except PermissionError:
+        return False
+    return False
+
+
+class DatasetCache:
+    """
+    datasets kept in memory, keyed by their file, its size and modification
+    time and how they were read, evicting the least recently used ones past
+    max_byte_count of deep memory usage.
+    """
+
+    max_byte_count: int
+    byte_count: int
+    hit_count: int
+    miss_count: int
+
+    _entries: OrderedDict
+    _lock: threading.Lock
+    _key_locks: dict[tuple, threading.Lock]
+
+    def __init__(self, max_byte_count: int = 2 * 1024**3):
+        self.max_byte_count = max_byte_count
+        self.byte_count = 0
+        self.hit_count = 0
+        self.miss_count = 0
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._key_locks = dict()
+
+    def get(self, filepath: str, kind: str, read) -> pd.DataFrame:
+        """
+        returns the dataset of the file read by kind, calling read with the
+        filepath when it is not cached, once even for concurrent jobs.
+        """
+        stat = os.stat(filepath)
+        key = (os.path.abspath(filepath), stat.st_size, stat.st_mtime_ns, kind)
+
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        with key_lock:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    self._entries.move_to_end(key)
+                    self.hit_count += 1
+                    return entry[0]
+
+            try:
+                df = read(filepath)
+                byte_count = int(df.memory_usage(index=True, deep=True).sum())
+
+                with self._lock:
+                    self.miss_count += 1
+                    self._entries[key] = (df, byte_count)
+                    self.byte_count += byte_count
+                    self._evict()
+            finally:
+                with self._lock:
+                    self._key_locks.pop(key, None)
+
+        return df
+
+    def _evict(self):
+        # the newest dataset is kept even when it alone is over the budget
+        while self.byte_count > self.max_byte_count and len(self._entries) > 1:
+            _, (_, byte_count) = self._entries.popitem(last=False)
+            self.byte_count -= byte_count
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.byte_count = 0
+
+
+class JobSpool:
+    """
+    local job queue in a directory, one json file per job moving from
+    incoming to running and then to done or failed.
+    """
+
+    directory: str
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+        for state in spool_states:
+            os.makedirs(os.path.join(directory, state), exist_ok=True)
+
+    def get_filepath(self, state: str, job_id: str) -> str:
+        return os.path.join(self.directory, state, f"{job_id}.json")
+
+    def submit(self, job: dict) -> str:
+        job_type = job.get("job_type")
+        if job_type not in job_types:
+            raise ValueError(f"unknown job type {job_type}")
+
+        # the ids sort by submission time
+        job_id = f"{time.time_ns():020d}-{uuid.uuid4().hex[:8]}"
+        job = {**job, "job_id": job_id, "submitted": time.time()}
+
+        filepath = self.get_filepath("incoming", job_id)
+        temp_filepath = os.path.join(self.directory, f".{job_id}.tmp")
+        with open(temp_filepath, mode="w", encoding="utf8") as file:
+            json.dump(job, file, indent=2)
+        os.replace(temp_filepath, filepath)
+
+        return job_id
+
+    def get_pending_ids(self) -> list[str]:
+        return sorted(
+            filename[: -len(".json")]
+            for filename in os.listdir(os.path.join(self.directory, "incoming"))
+            if filename.endswith(".json")
+        )
+
+    def claim(self, job_id: str) -> dict | None:
+        """
+        moves the job to running, None when another worker claimed it first.
+        the job records the process claiming it as its owner.
+        """
+        running_filepath = self.get_filepath("running", job_id)
+        try:
+            os.rename(self.get_filepath("incoming", job_id), running_filepath)
+        except FileNotFoundError:
+            return None
+
+        with open(running_filepath, encoding="utf8") as file:
+            job = json.load(file)
+        job["owner"] = get_job_owner()
+
+        temp_filepath = os.path.join(self.directory, f".{job_id}.tmp")
+        with open(temp_filepath, mode="w", encoding="utf8") as file:
+            json.dump(job, file, indent=2)
+        os.replace(temp_filepath, running_filepath)
+
+        return job
+
+    def complete(self, job: dict, state: str):
+        job_id = job["job_id"]
+        running_filepath = self.get_filepath("running", job_id)
+
+        # the running file is replaced whole, a stopped worker never leaves
+        # a truncated job behind
+        temp_filepath = os.path.join(self.directory, f".{job_id}.tmp")
+        with open(temp_filepath, mode="w", encoding="utf8") as file:
+            json.dump(job, file, indent=2)
+        os.replace(temp_filepath, running_filepath)
+        os.replace(running_filepath, self.get_filepath(state, job_id))
+
+    def recover(self) -> list[str]:
+        """
+        moves the jobs left running by a stopped worker of this host back to
+        incoming. the jobs of the live workers, of other hosts and the ones
+        not owned yet stay running.
+        """
+        job_ids = list[str]()
+        for filename in sorted(os.listdir(os.path.join(self.directory, "running"))):
+            if not filename.endswith(".json"):
+                continue
+
+            job_id = filename[: -len(".json")]
+            running_filepath = self.get_filepath("running", job_id)
+            try:
+                with open(running_filepath, encoding="utf8") as file:
+                    owner = json.load(file).get("owner")
+            except (OSError, ValueError):
+                continue
+            if not is_stopped_owner(owner):
+                continue
+
+            try:
+                os.replace(running_filepath, self.get_filepath("incoming", job_id))
+            except FileNotFoundError:
+                continue
+            job_ids.append(job_id)
+
+        return job_ids
+
+    def get_job(self, job_id: str) -> tuple[str, dict] | None:
+        for state in spool_states:
+            try:
+                with open(self.get_filepath(state, job_id), encoding="utf8") as file:
+                    return state, json.load(file)
+            except (OSError, ValueError):
+                continue
+        return None
+
+    def wait(
+        self, job_id: str, poll_interval: float = 0.2, timeout: float | None = None
+    ) -> tuple[str, dict]:
+        """
+        returns the state and the job once it is done or failed, raises
+        TimeoutError when it is not finished after timeout seconds.
+        """
+        end_time = None if timeout is None else time.monotonic() + timeout
+        while True:
+            result = self.get_job(job_id)
+            if result is not None and result[0] in ("done", "failed"):
+                return result
+            if end_time is not None and time.monotonic() >= end_time:
+                raise TimeoutError(f"job {job_id} not finished after {timeout}s")
+            time.sleep(poll_interval)
+
+
+def run_report_job(cache: DatasetCache, job: dict):
+    from main_report import read_report_dataset, report_functions
+
+    report_type = job["report_type"]
+    if report_type not in report_functions:
+        raise ValueError(f"unknown report type {report_type}")
+
+    options = job.get("options") or dict()
+
+    # the chunked reports read their own chunks, the stored ones query the
+    # store and the sampled ones read their sample
+    df = None
+    if all(
+        options.get(name) is None
+        for name in ("chunk_size", "store_filepath", "sample_fraction")
+    ):
+        df = cache.get(
+            job["dataset_filepath"],
+            kind=f"report:{report_type}",
+            read=lambda filepath: read_report_dataset(report_type, filepath),
+        )
+
+    report_functions[report_type](
+        dataset_filepath=job["dataset_filepath"],
+        report_filepath=job["output_filepath"],
+        df=df,
+        **options,
+    )
+
+
+def run_categorize_job(cache: DatasetCache, job: dict):
+    from categorize import categorize, read_invoices
+
+    df = cache.get(job["dataset_filepath"], kind="invoices", read=read_invoices)
+    categorize(df).to_csv(job["output_filepath"], index=False)
+
+
+_job_functions = {
+    "report": run_report_job,
+    "categorize": run_categorize_job,
+}
+
+
+class ReportWorker:
+    """
+    long running worker taking the jobs of a spool onto a thread pool, with
+    the datasets of the previous jobs kept in memory.
+    """
+
+    spool: JobSpool
+    cache: DatasetCache
+    max_worker_count: int
+    poll_interval: float
+
+    _stop: threading.Event
+    _slots: threading.Semaphore
+
+    def __init__(
+        self,
+        spool: JobSpool,
+        cache: DatasetCache = None,
+        max_worker_count: int = 2,
+        poll_interval: float = 0.5,
+    ):
+        self.spool = spool
+        self.cache = cache if cache is not None else DatasetCache()
+        self.max_worker_count = max_worker_count
+        self.poll_interval = poll_interval
+
+        self._stop = threading.Event()
+        self._slots = threading.Semaphore(max_worker_count)
+
+    def stop(self):
+        self._stop.set()
+
+    def run_job(self, job: dict) -> dict:
+        start_time = time.perf_counter()
+        try:
+            _job_functions[job["job_type"]](self.cache, job)
+            state = "done"
+            job["error"] = None
+        except Exception:
+            state = "failed"
+            job["error"] = traceback.format_exc()
+
+        job["wall_time"] = round(time.perf_counter() - start_time, 6)
+        job["finished"] = time.time()
+        self.spool.complete(job, state)
+
+        print(f"info: job {job['job_id']} {state} in {job['wall_time']}s")
+        return job
+
+    def _run_claimed(self, job: dict):
+        try:
+            self.run_job(job)
+        finally:
+            self._slots.release()
+
+    def run(self, once: bool = False, recover: bool = True):
+        """
+        takes the incoming jobs in submission order until stopped, or until
+        the spool is empty when once is set. with recover, the jobs left
+        running by the stopped workers of this host are requeued first.
+        """
+        if recover:
+            for job_id in self.spool.recover():
+                print(f"info: job {job_id} requeued")
+
+        with ThreadPoolExecutor(max_workers=self.max_worker_count) as executor:
+            try:
+                while not self._stop.is_set():
+                    job_ids = self.spool.get_pending_ids()
+                    if not job_ids:
+                        if once:
+                            break
+                        self._stop.wait(self.poll_interval)
+                        continue
+
+                    for job_id in job_ids:
+                        # jobs stay incoming while all the threads are busy, so
+                        # other workers of the spool can take them
+                        self._slots.acquire()
+                        if self._stop.is_set():
+                            self._slots.release()
+                            break
+
+                        job = self.spool.claim(job_id)
+                        if job is None:
+                            self._slots.release()
+                            continue
+                        executor.submit(self._run_claimed, job)
+            except KeyboardInterrupt:
+                # no job is claimed anymore, the running ones finish before
+                # the executor is shut down
+                self.stop()
+                print("info: stopping after the running jobs")
@@ -0,0 +1,31 @@
+import numpy as np
+import pandas as pd
+from categorize import categorize, categorize_store, load_invoices, read_invoices
+from report_store import DatasetStore
+
+
+def test_categorize_store_equals_categorize(tmp_path):
+    # amounts in cents whose float sums land just around whole units
+    random = np.random.default_rng(7)
+    row_count = 3000
+    dates = pd.Timestamp("2020-01-01") + pd.to_timedelta(
+        random.integers(0, 3 * 365, row_count), unit="D"
+    )
+    filepath = tmp_path / "invoices.csv"
+    pd.DataFrame(
+        {
+            "Sell_to_Customer_No": random.integers(1, 60, row_count),
+            "Shipment_Date": dates.strftime("%Y-%m-%d"),
+            "Amount_Including_VAT": random.choice([0.1, 0.2, 0.3, 0.7], row_count),
+        }
+    ).to_csv(filepath, index=False)
+
+    store = DatasetStore(str(tmp_path / "store.db"))
+    load_invoices(store, str(filepath))
+
+    categorizations = categorize(read_invoices(str(filepath)))
+    store_categorizations = categorize_store(store)
+
+    pd.testing.assert_frame_equal(
+        store_categorizations, categorizations, check_dtype=False
+    )
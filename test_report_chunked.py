@@ -0,0 +1,39 @@
+import pandas as pd
+from report_chunked import generate_report_from_chunks, read_csv_chunks
+from report_generator import QualityReportGenerator
+from report_validations import is_valid_number
+
+
+def get_column_metrics(report) -> dict:
+    metrics = dict()
+    for check in ("completeness", "uniqueness", "validity", "consistency"):
+        for column_name, metric in getattr(report, f"{check}_columns").items():
+            metrics[(check, column_name)] = (metric.total_count, metric.score)
+    return metrics
+
+
+def test_chunked_report_equals_profile_on_mixed_types(tmp_path):
+    # the chunks of "a" would be read as numbers and as text, "b" is the pair
+    filepath = tmp_path / "mixed.csv"
+    filepath.write_text("a,b\n1,x\n2,y\nx1,y\n1,z\n,x\n3.5,\n")
+
+    validation_map = {"a": is_valid_number}
+    column_pairing_map = {"a": "b"}
+
+    chunked_report = generate_report_from_chunks(
+        name="mixed",
+        chunks=read_csv_chunks(filepath, chunk_size=2),
+        validation_map=validation_map,
+        column_pairing_map=column_pairing_map,
+    )
+
+    report_generator = QualityReportGenerator()
+    report_generator.set_dataframe(pd.read_csv(filepath))
+    report_generator.set_validation_map(validation_map)
+    report_generator.set_column_pairing_map(column_pairing_map)
+    report_generator.check_profile()
+    report = report_generator.generate_report()
+    report_generator.close()
+
+    assert chunked_report.uniqueness_columns["a"].unique_count == 5
+    assert get_column_metrics(chunked_report) == get_column_metrics(report)
@@ -0,0 +1,82 @@
+import numpy as np
+import pandas as pd
+from report_columnar import load_report, save_report, to_arrays
+from report_drift import ProfileStore
+from report_exporter import QualityReportExporter
+from report_generator import QualityReportGenerator
+from report_instrumentation import Instrumentation
+from report_validations import is_valid_number
+
+
+def get_report(tmp_path):
+    df = pd.DataFrame(
+        {
+            "a": [1, 2, None, 4, 4],
+            "b": ["x", "y", "y", None, "z"],
+            "date": ["2020-01-01", "2021-06-30", None, "bad", "2024-12-31"],
+        }
+    )
+    profile_store = ProfileStore(str(tmp_path / "profiles"))
+
+    report_generator = QualityReportGenerator()
+    report_generator.set_report_name("lines")
+    report_generator.set_dataframe(df)
+    report_generator.set_validation_map({"a": is_valid_number})
+    report_generator.set_column_pairing_map({"a": "b"})
+    report_generator.set_date_columns(["date"])
+    report_generator.set_unique_keys([["a", "b"]])
+    report_generator.set_population_count(50)
+    report_generator.set_instrumentation(Instrumentation())
+    report_generator.set_profile_store(profile_store)
+    report_generator.check_profile()
+    report_generator.check_timeliness()
+    report_generator.check_drift()
+    report = report_generator.generate_report()
+    report_generator.close()
+    return report
+
+
+def get_exports(report) -> tuple:
+    exporter = QualityReportExporter()
+    return (
+        exporter.to_csv(report),
+        exporter.to_key_uniqueness_csv(report),
+        exporter.to_drift_csv(report),
+    )
+
+
+def test_columnar_round_trip(tmp_path):
+    report = get_report(tmp_path)
+    filepath = str(tmp_path / "report.npz")
+
+    save_report(report, filepath)
+    loaded = load_report(filepath)
+
+    assert loaded.name == "lines"
+    assert loaded.timings
+    assert loaded.completeness.score_interval == report.completeness.score_interval
+    assert loaded.uniqueness.is_estimate
+    assert (
+        loaded.key_uniqueness["a+b"].top_duplicates
+        == report.key_uniqueness["a+b"].top_duplicates
+    )
+    assert list(loaded.drift) == list(report.drift)
+    assert get_exports(loaded) == get_exports(report)
+
+
+def test_columnar_load_report_saved_before_drift(tmp_path):
+    report = get_report(tmp_path)
+    filepath = str(tmp_path / "report.npz")
+
+    arrays = {
+        key: value
+        for key, value in to_arrays(report).items()
+        if not key.startswith("drift.")
+    }
+    with open(filepath, mode="wb") as file:
+        np.savez(file, **arrays)
+
+    loaded = load_report(filepath)
+
+    assert loaded.drift == dict()
+    assert loaded.validity_columns["a"].score == report.validity_columns["a"].score
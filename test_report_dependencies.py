@@ -0,0 +1,94 @@
+import numpy as np
+import pandas as pd
+import report_dependencies
+from report_dependencies import (
+    count_violations,
+    find_dependencies,
+    to_dataframe,
+    to_pairing_map,
+)
+
+
+def get_dataset() -> pd.DataFrame:
+    random = np.random.default_rng(3)
+    row_count = 1000
+    cities = random.integers(0, 20, row_count)
+    countries = cities % 4
+
+    # one row in a hundred breaks zip -> city
+    zips = cities * 10
+    zips[::100] = 999
+    return pd.DataFrame(
+        {
+            "id": np.arange(row_count),
+            "city": [f"city{city}" for city in cities],
+            "country": [f"country{country}" for country in countries],
+            "zip": zips,
+            "noise": random.integers(0, 50, row_count),
+        }
+    )
+
+
+def get_found(dependencies) -> dict:
+    return {
+        ("+".join(dependency.lhs), dependency.rhs): dependency.violation_count
+        for dependency in dependencies
+    }
+
+
+def test_find_dependencies_exact_and_approximate():
+    dependencies = find_dependencies(get_dataset(), max_error=0.02, max_process_count=1)
+    found = get_found(dependencies)
+
+    assert found[("city", "country")] == 0
+    # the rows of the broken zip belong to other cities than the kept one
+    assert found[("zip", "city")] == 8
+    assert found[("city", "zip")] == 10
+    # the near key is never a lhs, the noise determines nothing
+    assert not any(lhs == "id" for lhs, _ in found)
+    assert not any(lhs == "noise" for lhs, _ in found)
+
+    # the exact dependencies are ranked first
+    assert dependencies[0].violation_count == 0
+    assert list(to_dataframe(dependencies).columns) == [
+        "lhs",
+        "rhs",
+        "row_count",
+        "violation_count",
+        "violation_ratio",
+    ]
+
+
+def test_find_dependencies_parallel_equals_serial():
+    df = get_dataset()
+    serial = find_dependencies(df, max_error=0.02, max_lhs_size=2, max_process_count=1)
+    parallel = find_dependencies(
+        df, max_error=0.02, max_lhs_size=2, max_process_count=2
+    )
+
+    assert to_dataframe(parallel).equals(to_dataframe(serial))
+
+
+def test_count_violations_sorted_equals_dense(monkeypatch):
+    random = np.random.default_rng(5)
+    lhs_codes = random.integers(-1, 30, 5000)
+    rhs_codes = random.integers(-1, 7, 5000)
+
+    dense = count_violations(lhs_codes, 30, rhs_codes, 7)
+    monkeypatch.setattr(report_dependencies, "_max_dense_size", 0)
+    assert count_violations(lhs_codes, 30, rhs_codes, 7) == dense
+
+    # the rows with a null lhs are left out
+    assert dense[1] == int((lhs_codes >= 0).sum())
+
+
+def test_to_pairing_map_keeps_the_best_single_column_dependency():
+    dependencies = find_dependencies(get_dataset(), max_error=0.02, max_process_count=1)
+
+    pairing_map = to_pairing_map(dependencies, max_violation_ratio=0)
+    assert pairing_map["city"] in ("country", "zip")
+    assert all(
+        found == 0
+        for (lhs, rhs), found in get_found(dependencies).items()
+        if pairing_map.get(lhs) == rhs
+    )
@@ -0,0 +1,67 @@
+import pandas as pd
+import pytest
+from report_generator import QualityReportGenerator
+from report_history import ReportHistory, dataset_column
+from report_validations import is_valid_number
+
+
+def get_report(df: pd.DataFrame):
+    report_generator = QualityReportGenerator()
+    report_generator.set_report_name("lines")
+    report_generator.set_dataframe(df)
+    report_generator.set_validation_map({"a": is_valid_number})
+    report_generator.set_unique_keys([["a", "b"]])
+    report_generator.check_profile()
+    report = report_generator.generate_report()
+    report_generator.close()
+    return report
+
+
+def test_history_series_and_deltas(tmp_path):
+    history = ReportHistory(str(tmp_path / "history.db"))
+
+    first_run_id = history.append(
+        get_report(pd.DataFrame({"a": [1, 2, None, 4], "b": ["x", "y", "y", "z"]})),
+        run_timestamp="2026-01-01T00:00:00+00:00",
+    )
+    second_run_id = history.append(
+        get_report(pd.DataFrame({"a": [1, 2, 3, 4], "b": ["x", "y", "y", "z"]})),
+        run_timestamp="2026-01-02T00:00:00+00:00",
+    )
+
+    assert history.get_runs("lines")["run_id"].tolist() == [
+        first_run_id,
+        second_run_id,
+    ]
+
+    series = history.get_column_series("lines", "a", "completeness")
+    assert series["score"].tolist() == [75.0, 100.0]
+    assert series["failing_count"].tolist() == [1, 0]
+
+    dataset_series = history.get_dataset_series(
+        "lines", "completeness", start="2026-01-02"
+    )
+    assert dataset_series["run_id"].tolist() == [second_run_id]
+
+    deltas = history.get_run_deltas("lines").set_index(["column_name", "metric"])
+    assert deltas.loc[("a", "completeness"), "delta"] == 25.0
+    assert deltas.loc[("a", "completeness"), "previous_failing_count"] == 1
+    assert deltas.loc[("b", "completeness"), "delta"] == 0
+    assert (dataset_column, "validity") in deltas.index
+    assert ("a+b", "key_uniqueness") in deltas.index
+
+
+def test_history_deltas_of_unknown_runs(tmp_path):
+    history = ReportHistory(str(tmp_path / "history.db"))
+
+    with pytest.raises(ValueError, match="no runs"):
+        history.get_run_deltas("lines")
+
+    run_id = history.append(get_report(pd.DataFrame({"a": [1], "b": ["x"]})))
+
+    with pytest.raises(ValueError, match="no run of lines before"):
+        history.get_run_deltas("lines")
+    with pytest.raises(ValueError, match="unknown run"):
+        history.get_run_deltas("lines", run_id=run_id + 1)
+    with pytest.raises(ValueError, match="unknown run"):
+        history.get_run_deltas("lines", run_id=run_id, previous_run_id=run_id + 1)
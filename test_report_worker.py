@@ -0,0 +1,89 @@
+import os
+import json
+import subprocess
+import sys
+import pytest
+import report_worker
+from report_worker import JobSpool, ReportWorker, get_job_owner
+
+
+def get_stopped_owner() -> dict:
+    process = subprocess.Popen([sys.executable, "-c", "pass"])
+    process.wait()
+    return {**get_job_owner(), "pid": process.pid}
+
+
+def test_spool_round_trip(tmp_path):
+    spool = JobSpool(str(tmp_path / "spool"))
+
+    first_job_id = spool.submit({"job_type": "report", "dataset": "a.csv"})
+    second_job_id = spool.submit({"job_type": "categorize", "dataset": "b.csv"})
+    assert spool.get_pending_ids() == [first_job_id, second_job_id]
+
+    job = spool.claim(first_job_id)
+    assert job["dataset"] == "a.csv"
+    assert job["owner"] == get_job_owner()
+    # a job is claimed once
+    assert spool.claim(first_job_id) is None
+    assert spool.get_job(first_job_id)[0] == "running"
+
+    spool.complete({**job, "error": None, "wall_time": 0.0}, "done")
+    state, job = spool.wait(first_job_id, timeout=1)
+    assert state == "done"
+    assert job["dataset"] == "a.csv"
+    assert not [
+        filename
+        for filename in os.listdir(spool.directory)
+        if filename.endswith(".tmp")
+    ]
+
+    with pytest.raises(TimeoutError):
+        spool.wait(second_job_id, poll_interval=0.01, timeout=0.05)
+    with pytest.raises(ValueError, match="unknown job type"):
+        spool.submit({"job_type": "other"})
+
+
+def test_spool_recover_requeues_the_stopped_owners_jobs(tmp_path):
+    spool = JobSpool(str(tmp_path / "spool"))
+    job_ids = [spool.submit({"job_type": "report"}) for _ in range(3)]
+    stopped_job_id, live_job_id, ownerless_job_id = job_ids
+
+    spool.claim(stopped_job_id)
+    spool.claim(live_job_id)
+    spool.claim(ownerless_job_id)
+
+    for job_id, owner in (
+        (stopped_job_id, get_stopped_owner()),
+        (ownerless_job_id, None),
+    ):
+        filepath = spool.get_filepath("running", job_id)
+        with open(filepath, encoding="utf8") as file:
+            job = json.load(file)
+        with open(filepath, mode="w", encoding="utf8") as file:
+            json.dump({**job, "owner": owner}, file)
+
+    assert spool.recover() == [stopped_job_id]
+    assert spool.get_pending_ids() == [stopped_job_id]
+    assert spool.get_job(live_job_id)[0] == "running"
+    assert spool.get_job(ownerless_job_id)[0] == "running"
+
+
+def test_worker_runs_the_pending_jobs(tmp_path, monkeypatch):
+    def run_failing_job(cache, job):
+        raise ValueError("broken dataset")
+
+    monkeypatch.setitem(report_worker._job_functions, "report", lambda cache, job: None)
+    monkeypatch.setitem(report_worker._job_functions, "categorize", run_failing_job)
+
+    spool = JobSpool(str(tmp_path / "spool"))
+    done_job_id = spool.submit({"job_type": "report"})
+    failed_job_id = spool.submit({"job_type": "categorize"})
+
+    ReportWorker(spool).run(once=True)
+
+    state, job = spool.wait(done_job_id, timeout=1)
+    assert state == "done"
+    assert job["error"] is None
+    state, job = spool.wait(failed_job_id, timeout=1)
+    assert state == "failed"
+    assert "broken dataset" in job["error"]